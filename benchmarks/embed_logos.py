@@ -0,0 +1,106 @@
+"""
+Benchmark for generate_diagram.embed_logos_in_diagram, showing how embedding time grows with the number of tools.
+
+Generates a synthetic Graphviz-style SVG and a directory of simple logos for each tool count, so no network access or
+Graphviz binaries are needed. Run from the repository root:
+
+    python benchmarks/embed_logos.py
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logo_diagram_generator import generate_diagram, utils
+
+DEFAULT_TOOL_COUNTS = [10, 50, 100, 250, 500, 1000, 2000]
+
+LOGO_SVG_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 120 60" width="120" height="60">
+<defs><linearGradient id="a"><stop offset="0" stop-color="#{color}"/></linearGradient></defs>
+<style>.st0{{fill:url(#a)}}</style>
+<rect class="st0" x="5" y="5" width="110" height="50" rx="8"/>
+<path id="b" d="M10 30 L60 10 L110 30 L60 50 Z" fill="#{color}"/>
+<use xlink:href="#b" x="2" y="2"/>
+</svg>
+"""
+
+
+def build_synthetic_ecosystem(tool_count, logos_dir, diagram_name):
+    """
+    Builds a config dict, a Graphviz-like text SVG and one logo file per tool, for the given number of tools.
+    :return: Tuple of (config, diagram_svg_content).
+    """
+    central_tool = {"name": "Central Tool"}
+    tools = [{"name": f"Tool {i}"} for i in range(tool_count - 1)]
+
+    nodes = []
+    for i, tool in enumerate([central_tool] + tools):
+        nodes.append(
+            f'<g id="{tool["name"]}" class="node"><title>{tool["name"]}</title>'
+            f'<ellipse fill="none" stroke="black" cx="{i * 10}.5" cy="-{i * 5}.25" rx="60" ry="30"/>'
+            f'<text x="{i * 10}" y="-{i * 5}">{tool["name"]}</text></g>'
+        )
+        with open(os.path.join(logos_dir, f"{utils.slugify(tool['name'])}.svg"), "w") as file:
+            file.write(LOGO_SVG_TEMPLATE.format(color=f"{i % 0xFFFFFF:06x}"))
+
+    diagram_svg = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 1000 1000">\n'
+        f'<g id="{diagram_name}" class="graph">\n' + "\n".join(nodes) + "\n</g>\n</svg>\n"
+    )
+
+    config = {"ecosystem": {"centralTool": central_tool, "groups": [{"category": "Synthetic", "tools": tools}]}}
+    return config, diagram_svg
+
+
+def time_embed(tool_count, repeats):
+    """
+    Times embed_logos_in_diagram for a synthetic ecosystem of the given size, returning the best of `repeats` runs in seconds.
+    """
+    diagram_name = "benchmark"
+    with tempfile.TemporaryDirectory() as work_dir:
+        logos_dir = os.path.join(work_dir, "logos")
+        os.makedirs(logos_dir)
+        config, diagram_svg = build_synthetic_ecosystem(tool_count, logos_dir, diagram_name)
+
+        diagram_svg_path = os.path.join(work_dir, f"{diagram_name}_text.svg")
+        with open(diagram_svg_path, "w") as file:
+            file.write(diagram_svg)
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            generate_diagram.embed_logos_in_diagram(
+                diagram_name=diagram_name,
+                diagram_svg_path=diagram_svg_path,
+                output_svg_path=os.path.join(work_dir, f"{diagram_name}_logos.svg"),
+                config=config,
+                logos_dir=logos_dir,
+            )
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding logos into diagrams of increasing size.")
+    parser.add_argument("--tool-counts", type=lambda s: [int(n) for n in s.split(",")], default=DEFAULT_TOOL_COUNTS)
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per size; the fastest is reported (default: %(default)s).")
+    args = parser.parse_args()
+
+    # Keep per-tool logging out of the measurements
+    logging.basicConfig(level=logging.ERROR)
+
+    print(f"{'tools':>8} {'seconds':>10} {'ms/tool':>10}")
+    for tool_count in args.tool_counts:
+        seconds = time_embed(tool_count, args.repeats)
+        print(f"{tool_count:>8} {seconds:>10.3f} {seconds * 1000 / tool_count:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
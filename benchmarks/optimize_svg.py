@@ -0,0 +1,131 @@
+"""
+Checks the SVG optimizer: reports the size of each diagram before and after optimizing, and rasterizes both versions
+with cairosvg to prove the optimized diagram renders the same, exiting 1 if any pixel differs by more than the tolerance.
+
+Diagrams are the example outputs in examples/*_logos.svg, plus synthetic diagrams with generated logos embedded (see
+benchmarks/stages.py), so symbols, gradients, styles and <use> references are all covered. Rasterizing needs cairo; if it
+isn't installed, sizes are still reported and the raster diff is skipped (or fails, with --require-raster). Run from the
+repository root:
+
+    python benchmarks/optimize_svg.py
+    python benchmarks/optimize_svg.py --precision 2 --png-width 4000
+"""
+
+import io
+import os
+import sys
+import glob
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logo_diagram_generator import stream_embed, svg_optimizer, utils
+
+import stages
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+# Synthetic diagram name -> (tool count, group count, paths per logo)
+SYNTHETIC_DIAGRAMS = {
+    "synthetic-tools-50": (50, 5, 16),
+    "synthetic-complex-logos": (20, 4, 200),
+}
+
+DEFAULT_PNG_WIDTH = 3000
+
+# Largest difference allowed in any channel of any pixel; anti-aliased edges can move by a level or two when
+# coordinates are rounded, which isn't visible
+DEFAULT_PIXEL_TOLERANCE = 8
+
+
+def load_diagrams():
+    """
+    :return: A dict of diagram name -> SVG bytes, for the examples and the synthetic diagrams.
+    """
+    diagrams = {}
+    for svg_path in sorted(glob.glob(os.path.join(EXAMPLES_DIR, "*_logos.svg"))):
+        with open(svg_path, "rb") as file:
+            diagrams[os.path.basename(svg_path)] = file.read()
+
+    for diagram_name, (tool_count, group_count, logo_path_count) in SYNTHETIC_DIAGRAMS.items():
+        with tempfile.TemporaryDirectory() as work_dir:
+            config_filepath, logos_dir = stages.write_synthetic_ecosystem(work_dir, tool_count, group_count, logo_path_count)
+            config = utils.load_config(config_filepath)
+            diagram_svg = stages.render_grid_layout_svg(config, stages.DIAGRAM_NAME)
+            output_file = io.BytesIO()
+            stream_embed.embed_logos_streaming(stages.DIAGRAM_NAME, io.BytesIO(diagram_svg), output_file, config, logos_dir)
+            diagrams[diagram_name] = output_file.getvalue()
+    return diagrams
+
+
+def load_rasterizer():
+    """
+    :return: cairosvg.svg2png, or None if cairosvg or the cairo library it needs isn't installed.
+    """
+    try:
+        import cairosvg
+    except (ImportError, OSError) as e:
+        logging.warning(f"cairosvg unavailable, skipping the raster diff: {e}")
+        return None
+    return cairosvg.svg2png
+
+
+def max_pixel_difference(png_a, png_b):
+    """
+    :return: The largest difference in any channel of any pixel between two PNGs, or None if their sizes differ.
+    """
+    from PIL import Image, ImageChops
+
+    image_a = Image.open(io.BytesIO(png_a)).convert("RGBA")
+    image_b = Image.open(io.BytesIO(png_b)).convert("RGBA")
+    if image_a.size != image_b.size:
+        return None
+    return max(high for _, high in ImageChops.difference(image_a, image_b).getextrema())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report SVG optimizer savings and check optimized diagrams render identically.")
+    parser.add_argument(
+        "--precision", type=int, default=svg_optimizer.DEFAULT_PRECISION, help="Decimal places to round to (default: %(default)s)."
+    )
+    parser.add_argument("--png-width", type=int, default=DEFAULT_PNG_WIDTH, help="Width to rasterize at (default: %(default)s).")
+    parser.add_argument(
+        "--tolerance", type=int, default=DEFAULT_PIXEL_TOLERANCE, help="Allowed per-channel difference (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--require-raster", action="store_true", help="Fail if cairo isn't available, rather than skipping the raster diff."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    svg2png = load_rasterizer()
+    if svg2png is None and args.require_raster:
+        sys.exit(1)
+
+    failed = []
+    print(f"{'diagram':<40} {'bytes':>9} {'optimized':>10} {'saved':>7} {'max pixel diff':>15}")
+    for diagram_name, svg in load_diagrams().items():
+        optimized_svg = svg_optimizer.optimize_svg(svg, precision=args.precision)
+        saved = (1 - len(optimized_svg) / len(svg)) * 100
+
+        difference_text = "skipped"
+        if svg2png is not None:
+            difference = max_pixel_difference(
+                svg2png(bytestring=svg, output_width=args.png_width), svg2png(bytestring=optimized_svg, output_width=args.png_width)
+            )
+            difference_text = "size differs" if difference is None else str(difference)
+            if difference is None or difference > args.tolerance:
+                failed.append(diagram_name)
+
+        print(f"{diagram_name:<40} {len(svg):>9} {len(optimized_svg):>10} {saved:>6.1f}% {difference_text:>15}")
+
+    if failed:
+        print(f"Optimized output renders differently for: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
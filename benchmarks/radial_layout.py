@@ -0,0 +1,99 @@
+"""
+Compares the time to lay out and render the text-only diagram with the built-in radial-native engine against Graphviz's
+neato, laying out the whole diagram at once and sharded by group (diagramShardedLayout), on synthetic ecosystems of
+increasing size (see benchmarks/stages.py). Neato is skipped if Graphviz isn't installed. Each radial-native layout is
+also checked for overlapping nodes, exiting 1 if any overlap. Run from the repository root:
+
+    python benchmarks/radial_layout.py
+    python benchmarks/radial_layout.py --tools 100,1000,5000 --groups 25
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logo_diagram_generator import generate_diagram, layout_cache, radial_layout, utils
+
+import stages
+
+DEFAULT_TOOL_COUNTS = "50,200,1000"
+DEFAULT_GROUP_COUNT = 10
+
+
+def time_render(config, repeat):
+    """
+    :return: The fastest of repeat renders of the text-only diagram, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # A fresh layout cache each time, so Graphviz engines always compute the layout
+        generate_diagram.render_text_only_svg(config, stages.DIAGRAM_NAME, layout_cache=layout_cache.LayoutCache())
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def count_overlapping_nodes(config):
+    """
+    :return: The number of pairs of nodes whose bounding boxes overlap in the radial-native layout.
+    """
+    nodes, _ = radial_layout.compute_radial_layout(config)
+    boxes = sorted(node.box() for node in nodes.values())
+    overlapping = 0
+    for index, box in enumerate(boxes):
+        # Boxes are sorted by their left edge, so only those starting before this one ends can overlap it
+        for other in boxes[index + 1 :]:
+            if other[0] >= box[2]:
+                break
+            if other[1] < box[3] and box[1] < other[3]:
+                overlapping += 1
+    return overlapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare radial-native, neato and sharded neato layout and rendering times.")
+    parser.add_argument("--tools", default=DEFAULT_TOOL_COUNTS, help="Comma separated tool counts (default: %(default)s).")
+    parser.add_argument("--groups", type=int, default=DEFAULT_GROUP_COUNT, help="Groups in each ecosystem (default: %(default)s).")
+    parser.add_argument("--repeat", type=int, default=3, help="Renders per engine, keeping the fastest (default: %(default)s).")
+    args = parser.parse_args()
+
+    has_neato = shutil.which("neato") is not None
+    if not has_neato:
+        print("Graphviz's neato isn't installed, only timing radial-native")
+
+    print(f"{'tools':>6} {'radial-native ms':>17} {'neato ms':>10} {'sharded neato ms':>17} {'speedup':>8} {'overlaps':>9}")
+    any_overlapping = False
+    for tool_count in (int(tool_count) for tool_count in args.tools.split(",")):
+        with tempfile.TemporaryDirectory() as work_dir:
+            config_filepath, _ = stages.write_synthetic_ecosystem(work_dir, tool_count, min(args.groups, tool_count - 1), 1)
+            config = utils.load_config(config_filepath)
+
+        config["ecosystem"]["style"] = {"diagramEngine": radial_layout.ENGINE_NAME}
+        radial_seconds = time_render(config, args.repeat)
+        overlapping = count_overlapping_nodes(config)
+        any_overlapping = any_overlapping or overlapping > 0
+
+        neato_column, sharded_column, speedup_column = "-", "-", "-"
+        if has_neato:
+            config["ecosystem"]["style"] = {"diagramEngine": "neato"}
+            neato_seconds = time_render(config, args.repeat)
+            config["ecosystem"]["style"] = {"diagramEngine": "neato", "diagramShardedLayout": True}
+            sharded_seconds = time_render(config, args.repeat)
+            neato_column, sharded_column = f"{neato_seconds * 1000:.1f}", f"{sharded_seconds * 1000:.1f}"
+            speedup_column = f"{neato_seconds / radial_seconds:.0f}x"
+
+        print(
+            f"{tool_count:>6} {radial_seconds * 1000:>17.1f} {neato_column:>10} {sharded_column:>17} {speedup_column:>8} {overlapping:>9}"
+        )
+
+    if any_overlapping:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Benchmark suite timing every stage of generate_diagram_from_config on synthetic ecosystems of 10 to 5,000 tools, and
+comparing the results against stored baselines so scaling regressions are caught.
+
+Each scenario writes a synthetic config YAML (with a given number of groups and tools) and a generated logo SVG per tool
+(with a given number of paths, gradients and classes) to a temporary directory, so no network access is needed. Stages
+are timed with profiling.Profiler, taking the fastest of several runs with every cache cleared between runs.
+
+The full pipeline needs the Graphviz binaries and cairo. With --embed-only, the Graphviz layout is replaced by a
+synthetic grid layout and rasterization is skipped, so config loading and logo embedding can be benchmarked anywhere.
+Baselines are stored per mode in benchmarks/baselines/stages.json. Run from the repository root:
+
+    python benchmarks/stages.py                      # compare against the baselines, exit 1 on a regression or
+                                                     # if there's no baseline to compare a stage against
+    python benchmarks/stages.py --embed-only
+    python benchmarks/stages.py --embed-only --embed-engine stream
+    python benchmarks/stages.py --scenarios tools-10,tools-1000 --update-baselines
+"""
+
+import io
+import os
+import sys
+import json
+import random
+import shutil
+import logging
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logo_diagram_generator import generate_diagram, layout_cache, logo_fragments, profiling, stream_embed, utils
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "stages.json")
+
+DIAGRAM_NAME = "benchmark"
+
+# Scenario name -> (tool count, group count, paths per logo)
+SCENARIOS = {
+    "tools-10": (10, 2, 4),
+    "tools-100": (100, 8, 16),
+    "tools-250-complex-logos": (250, 10, 200),
+    "tools-1000": (1000, 20, 16),
+    "tools-5000": (5000, 50, 8),
+}
+
+# A stage has regressed if it is slower than its baseline by more than this ratio and by more than the minimum delta,
+# so sub-millisecond stages don't fail on timer noise
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_MIN_DELTA_SECONDS = 0.05
+
+
+def generate_logo_svg(rng, path_count):
+    """
+    Generates a logo SVG with the given number of random paths, plus the gradients, IDs, local references and generic
+    class names real logos (especially Illustrator exports) contain, which embedding has to namespace.
+    """
+    color = f"{rng.randrange(0x1000000):06x}"
+    paths = []
+    for i in range(path_count):
+        points = " ".join(f"L{rng.uniform(0, 120):.2f} {rng.uniform(0, 60):.2f}" for _ in range(rng.randint(3, 12)))
+        paths.append(f'<path id="p{i}" class="st{i % 4}" d="M{rng.uniform(0, 120):.2f} {rng.uniform(0, 60):.2f} {points} Z"/>')
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 120 60">\n'
+        f'<defs><linearGradient id="g"><stop offset="0" stop-color="#{color}"/><stop offset="1" stop-color="#ffffff"/></linearGradient></defs>\n'
+        f"<style>.st0{{fill:url(#g)}} .st1{{fill:#{color}}} .st2{{fill:none;stroke:#{color}}} .st3{{opacity:.5}}</style>\n"
+        + "\n".join(paths)
+        + '\n<use xlink:href="#p0" x="1" y="1"/>\n</svg>\n'
+    )
+
+
+def write_synthetic_ecosystem(work_dir, tool_count, group_count, logo_path_count, seed=0):
+    """
+    Writes a synthetic config file and a logo for every tool into work_dir.
+    :return: Tuple of (config file path, logos directory).
+    """
+    import yaml
+
+    rng = random.Random(seed)
+    logos_dir = os.path.join(work_dir, "logos")
+    os.makedirs(logos_dir)
+
+    tool_names = [f"Tool {i}" for i in range(tool_count - 1)]
+    groups = [
+        {"category": f"Group {group_index}", "tools": [{"name": name} for name in tool_names[group_index::group_count]]}
+        for group_index in range(group_count)
+    ]
+    config = {"ecosystem": {"centralTool": {"name": "Central Tool"}, "groups": groups}}
+
+    for tool_name in ["Central Tool"] + tool_names:
+        with open(os.path.join(logos_dir, f"{utils.slugify(tool_name)}.svg"), "w") as file:
+            file.write(generate_logo_svg(rng, logo_path_count))
+
+    config_filepath = os.path.join(work_dir, "config.yml")
+    with open(config_filepath, "w") as file:
+        yaml.safe_dump(config, file, sort_keys=False)
+    return config_filepath, logos_dir
+
+
+def render_grid_layout_svg(config, diagram_name):
+    """
+    Renders a Graphviz-like text-only SVG with every tool's node on a grid, standing in for the real layout in
+    --embed-only mode.
+    """
+    nodes = []
+    for index, tool_config in enumerate(utils.list_tools(config)):
+        label = tool_config.get("label", tool_config.get("name"))
+        cx, cy = (index % 100) * 150, -(index // 100) * 90
+        nodes.append(
+            f'<g id="{label}" class="node"><title>{label}</title>'
+            f'<ellipse fill="none" stroke="black" cx="{cx}" cy="{cy}" rx="60" ry="30"/>'
+            f'<text x="{cx}" y="{cy}">{label}</text></g>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 15000 5000">\n'
+        f'<g id="{diagram_name}" class="graph">\n' + "\n".join(nodes) + "\n</g>\n</svg>\n"
+    ).encode("utf-8")
+
+
+def run_stages(config_filepath, logos_dir, output_dir, embed_only, embed_engine):
+    """
+    Runs the diagram pipeline once with a fresh profiler and empty caches.
+    :return: A dict of stage name -> seconds for every top-level stage, plus "total".
+    """
+    logo_fragments.default_fragment_cache.clear()
+    profiler = profiling.Profiler()
+
+    if embed_only:
+        with profiler.stage("load_config"):
+            config = utils.load_config(config_filepath)
+        with profiler.stage("layout"):
+            diagram_svg = render_grid_layout_svg(config, DIAGRAM_NAME)
+        with profiler.stage("embed_logos"):
+            if embed_engine == "stream":
+                stream_embed.embed_logos_streaming(
+                    DIAGRAM_NAME, io.BytesIO(diagram_svg), io.BytesIO(), config, logos_dir, profiler=profiler
+                )
+            else:
+                generate_diagram.embed_logos_in_svg(DIAGRAM_NAME, diagram_svg, config, logos_dir, profiler=profiler)
+    else:
+        generate_diagram.generate_diagram_from_config(
+            config_filepath,
+            diagram_name=DIAGRAM_NAME,
+            output_dir=output_dir,
+            logos_dir=logos_dir,
+            png_width=3000,
+            override_configs=None,
+            layout_cache=layout_cache.LayoutCache(),
+            force=True,
+            profiler=profiler,
+            embed_engine=embed_engine,
+        )
+
+    report = profiler.report()
+    return dict(report["stage_seconds"], total=sum(report["stage_seconds"].values()))
+
+
+def time_scenario(scenario, repeats, embed_only, embed_engine):
+    """
+    Times each stage for a scenario, returning the fastest of `repeats` runs for every stage in seconds.
+    """
+    tool_count, group_count, logo_path_count = SCENARIOS[scenario]
+    with tempfile.TemporaryDirectory() as work_dir:
+        config_filepath, logos_dir = write_synthetic_ecosystem(work_dir, tool_count, group_count, logo_path_count)
+        runs = [run_stages(config_filepath, logos_dir, work_dir, embed_only, embed_engine) for _ in range(repeats)]
+    return {stage: round(min(run[stage] for run in runs), 6) for stage in runs[0]}
+
+
+def compare_to_baseline(results, baseline, tolerance, min_delta):
+    """
+    :return: A list of (stage, seconds, baseline seconds) for every stage which regressed.
+    """
+    regressions = []
+    for stage, seconds in results.items():
+        baseline_seconds = baseline.get(stage)
+        if baseline_seconds is None:
+            continue
+        if seconds > baseline_seconds * (1 + tolerance) and seconds - baseline_seconds > min_delta:
+            regressions.append((stage, seconds, baseline_seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every diagram generation stage against stored baselines.")
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS), help="Comma separated scenario names.")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per scenario; the fastest is reported (default: %(default)s).")
+    parser.add_argument(
+        "--embed-only", action="store_true", help="Use a synthetic layout and skip rasterization, so Graphviz and cairo aren't needed."
+    )
+    parser.add_argument("--embed-engine", choices=generate_diagram.EMBED_ENGINES, default=generate_diagram.DEFAULT_EMBED_ENGINE)
+    parser.add_argument("--update-baselines", action="store_true", help="Store these results as the new baselines.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown ratio (default: %(default)s).")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA_SECONDS, help="Ignore slowdowns under this many seconds.")
+    parser.add_argument("--output-json", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    unknown_scenarios = [scenario for scenario in args.scenarios if scenario not in SCENARIOS]
+    if unknown_scenarios:
+        parser.error(f"Unknown scenarios {unknown_scenarios}, choose from {list(SCENARIOS)}")
+    if not args.embed_only and shutil.which("dot") is None:
+        parser.error("Graphviz executables not found on PATH, install Graphviz or use --embed-only")
+
+    # Keep per-tool logging out of the measurements
+    logging.basicConfig(level=logging.ERROR)
+
+    # Baselines are kept separately for each mode and embedding engine, e.g. "embed-only" or "full-stream"
+    mode = "embed-only" if args.embed_only else "full"
+    if args.embed_engine != generate_diagram.DEFAULT_EMBED_ENGINE:
+        mode = f"{mode}-{args.embed_engine}"
+    baselines = {}
+    if os.path.exists(BASELINES_PATH):
+        with open(BASELINES_PATH, "r") as file:
+            baselines = json.load(file)
+    mode_baselines = baselines.setdefault(mode, {})
+
+    all_results = {}
+    regressions = []
+    missing_baselines = []
+    print(f"{'scenario':<26} {'stage':<14} {'seconds':>10} {'baseline':>10} {'change':>8}")
+    for scenario in args.scenarios:
+        results = all_results[scenario] = time_scenario(scenario, args.repeats, args.embed_only, args.embed_engine)
+        baseline = mode_baselines.get(scenario, {})
+        for stage, seconds in results.items():
+            baseline_seconds = baseline.get(stage)
+            change = f"{(seconds / baseline_seconds - 1) * 100:+.0f}%" if baseline_seconds else "-"
+            baseline_text = f"{baseline_seconds:.3f}" if baseline_seconds is not None else "-"
+            print(f"{scenario:<26} {stage:<14} {seconds:>10.3f} {baseline_text:>10} {change:>8}")
+        regressions.extend((scenario, *regression) for regression in compare_to_baseline(results, baseline, args.tolerance, args.min_delta))
+        missing_baselines.extend((scenario, stage) for stage in results if stage not in baseline)
+
+    if args.output_json:
+        with open(args.output_json, "w") as file:
+            json.dump({mode: all_results}, file, indent=2)
+
+    if args.update_baselines:
+        mode_baselines.update(all_results)
+        utils.ensure_directory_exists(os.path.dirname(BASELINES_PATH))
+        with open(BASELINES_PATH, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Baselines updated in {BASELINES_PATH}")
+    elif regressions or missing_baselines:
+        for scenario, stage, seconds, baseline_seconds in regressions:
+            print(f"Regression in {scenario} {stage}: {seconds:.3f}s vs baseline {baseline_seconds:.3f}s", file=sys.stderr)
+        # A stage without a baseline can't be checked, so would otherwise pass however slow it became
+        for scenario, stage in missing_baselines:
+            print(f"No {mode} baseline for {scenario} {stage}, record one with --update-baselines", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark for CLI startup time, using Python's -X importtime to measure what each entry point imports.
+
+Each scenario runs in a fresh interpreter. The cumulative import time of the package's modules is reported, along with
+which heavy dependencies (requests, graphviz, cairosvg, yaml, and slow standard library modules like urllib.request) each
+scenario loads - none of them should be imported until the stage which needs them actually runs. Run from the repository root:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --check  # exits non-zero if --help imports a heavy dependency
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_DEPENDENCIES = ("requests", "urllib3", "graphviz", "cairosvg", "yaml", "multiprocessing")
+
+# Standard library modules which are just as slow to import, e.g. xml.sax.saxutils pulls in urllib.request, and with
+# it http.client, email and ssl
+HEAVY_STANDARD_LIBRARY_MODULES = ("urllib.request", "http.client", "email", "ssl")
+
+# Scenario name -> interpreter arguments, each run with -X importtime
+SCENARIOS = {
+    "cli --help": ["-m", "logo_diagram_generator.cli", "--help"],
+    "import cli": ["-c", "import logo_diagram_generator.cli"],
+    "import generate_diagram": ["-c", "import logo_diagram_generator.generate_diagram"],
+    "import download_logos": ["-c", "import logo_diagram_generator.download_logos"],
+    "import batch": ["-c", "import logo_diagram_generator.batch"],
+}
+
+# Scenarios which must never import a heavy dependency, enforced by --check
+CHECKED_SCENARIOS = ("cli --help", "import cli")
+
+
+def run_with_importtime(interpreter_args):
+    """
+    Runs a fresh interpreter with -X importtime and parses its import timings.
+    :return: A dict of module name -> (self microseconds, cumulative microseconds), and the wall clock seconds.
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    result = subprocess.run([sys.executable, "-X", "importtime", *interpreter_args], capture_output=True, text=True, env=env, cwd=REPO_ROOT)
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        timings[module.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def summarise(timings):
+    # The outermost package module's cumulative time includes every package module and dependency it imports
+    package_us = max([cumulative for module, (_, cumulative) in timings.items() if module.startswith("logo_diagram_generator")] + [0])
+    total_us = sum(self_us for self_us, _ in timings.values())
+    heavy = sorted(module for module in timings if module in HEAVY_DEPENDENCIES + HEAVY_STANDARD_LIBRARY_MODULES)
+    return package_us, total_us, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup and report which heavy dependencies get imported.")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per scenario; the fastest is reported (default: %(default)s).")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero if --help or importing the CLI loads a heavy dependency.")
+    args = parser.parse_args()
+
+    failed = []
+    print(f"{'scenario':<26} {'package ms':>11} {'total ms':>9}  heavy dependencies imported")
+    for scenario, interpreter_args in SCENARIOS.items():
+        runs = [summarise(run_with_importtime(interpreter_args)) for _ in range(args.repeats)]
+        package_us, total_us, heavy = min(runs)
+        print(f"{scenario:<26} {package_us / 1000:>11.1f} {total_us / 1000:>9.1f}  {', '.join(heavy) or '-'}")
+        if scenario in CHECKED_SCENARIOS and heavy:
+            failed.append(scenario)
+
+    if args.check and failed:
+        print(f"Heavy dependencies imported at startup by: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Compares tiled rasterization (rasterize.render_png_tiled) against single-shot rendering (rasterize.render_png) of the
+same diagram: the peak memory and time of each, and whether the decoded pixels are identical, exiting 1 if they aren't.
+
+The diagram is synthetic (see benchmarks/stages.py) with generated logos embedded, so no Graphviz or network access is
+needed, but cairo is. Each render runs in a fresh interpreter so its peak RSS isn't inflated by the other. Run from the
+repository root:
+
+    python benchmarks/tiled_rasterize.py
+    python benchmarks/tiled_rasterize.py --width 12000 --tile-height 128
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logo_diagram_generator import profiling, rasterize, stream_embed, utils
+
+import stages
+
+DEFAULT_WIDTH = 12000
+DEFAULT_TOOL_COUNT = 200
+
+
+def write_synthetic_diagram(work_dir, tool_count):
+    """
+    :return: Path to a synthetic diagram SVG with logos embedded.
+    """
+    config_filepath, logos_dir = stages.write_synthetic_ecosystem(work_dir, tool_count, 10, 16)
+    config = utils.load_config(config_filepath)
+    diagram_svg = stages.render_grid_layout_svg(config, stages.DIAGRAM_NAME)
+    svg_path = os.path.join(work_dir, "diagram.svg")
+    with open(svg_path, "wb") as file:
+        stream_embed.embed_logos_streaming(stages.DIAGRAM_NAME, io.BytesIO(diagram_svg), file, config, logos_dir)
+    return svg_path
+
+
+def render(svg_path, png_path, width, tile_height):
+    """
+    Renders the SVG to png_path, in strips if tile_height is set, and prints the peak RSS and seconds as JSON.
+    """
+    with open(svg_path, "rb") as file:
+        svg_tree = rasterize.parse_svg(file.read())
+
+    baseline_rss = profiling.peak_rss_bytes()
+    start = time.perf_counter()
+    with open(png_path, "wb") as file:
+        if tile_height:
+            rasterize.render_png_tiled(svg_tree, width, file, tile_height)
+        else:
+            file.write(rasterize.render_png(svg_tree, width))
+    seconds = time.perf_counter() - start
+    print(json.dumps({"peak_rss_bytes": profiling.peak_rss_bytes(), "baseline_rss_bytes": baseline_rss, "seconds": seconds}))
+
+
+def run_render(svg_path, png_path, width, tile_height):
+    command = [sys.executable, os.path.abspath(__file__), "--render", svg_path, png_path, "--width", str(width)]
+    if tile_height:
+        command += ["--tile-height", str(tile_height)]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare tiled and single-shot rasterization memory, time and pixels.")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="Width to rasterize at (default: %(default)s).")
+    parser.add_argument("--tile-height", type=int, default=rasterize.DEFAULT_TILE_HEIGHT, help="Rows per strip (default: %(default)s).")
+    parser.add_argument("--tools", type=int, default=DEFAULT_TOOL_COUNT, help="Tools in the synthetic diagram (default: %(default)s).")
+    parser.add_argument("--render", nargs=2, metavar=("SVG", "PNG"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.render:
+        return render(*args.render, args.width, args.tile_height)
+
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError) as e:
+        parser.error(f"cairosvg and the cairo library are needed to rasterize: {e}")
+
+    from PIL import Image
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        svg_path = write_synthetic_diagram(work_dir, args.tools)
+        single_png_path = os.path.join(work_dir, "single.png")
+        tiled_png_path = os.path.join(work_dir, "tiled.png")
+
+        print(f"{'mode':<22} {'peak RSS MB':>12} {'rendering MB':>13} {'seconds':>8} {'PNG bytes':>10}")
+        for mode, png_path, tile_height in (
+            ("single-shot", single_png_path, None),
+            (f"tiled ({args.tile_height} rows)", tiled_png_path, args.tile_height),
+        ):
+            result = run_render(svg_path, png_path, args.width, tile_height)
+            rendering_bytes = result["peak_rss_bytes"] - result["baseline_rss_bytes"]
+            print(
+                f"{mode:<22} {result['peak_rss_bytes'] / 1e6:>12.1f} {rendering_bytes / 1e6:>13.1f} "
+                f"{result['seconds']:>8.2f} {os.path.getsize(png_path):>10}"
+            )
+
+        with Image.open(single_png_path) as single_image, Image.open(tiled_png_path) as tiled_image:
+            identical = (
+                single_image.size == tiled_image.size and single_image.convert("RGBA").tobytes() == tiled_image.convert("RGBA").tobytes()
+            )
+
+    print(f"Pixels identical: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
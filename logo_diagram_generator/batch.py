@@ -0,0 +1,250 @@
+import os
+import copy
+import time
+import logging
+
+from logo_diagram_generator import download_logos, generate_diagram, rasterize, svg_optimizer, utils
+from logo_diagram_generator.layout_cache import LayoutCache
+
+DEFAULT_PNG_WIDTH = 3000
+
+
+def parse_job_overrides(overrides):
+    """
+    Converts the overrides for a batch job into the list of override dictionaries expected by utils.override_config.
+    Overrides may be given as a mapping of key to value, or as a list of "key=value" strings like the --override option.
+    """
+    if not overrides:
+        return None
+    if isinstance(overrides, dict):
+        return [{key: str(value) for key, value in overrides.items()}]
+    return [dict([override.split("=", 1)]) for override in overrides]
+
+
+def read_manifest(manifest_filepath, image_quality=rasterize.DEFAULT_IMAGE_QUALITY):
+    """
+    Reads a batch manifest file, which lists the diagrams to render as jobs, e.g.
+
+        defaults:
+          logos_dir: logos
+          output_dir: diagrams
+        jobs:
+          - config: team-a.yml
+            theme: dark
+          - config: team-b.yml
+            name: team-b-print
+            png_width: 12000
+          - config: team-b.yml
+            name: team-b-docs
+            png_width: [1600, 3200, 400]
+            image_formats: [png, webp]
+            image_quality: 80
+            overrides:
+              style.diagramBackgroundColor: "#ffffff"
+
+    Every job key can also be set under defaults. Relative paths are resolved against the manifest's directory.
+    :param manifest_filepath: Path to the manifest YAML file.
+    :param image_quality: Quality of WebP and JPEG images for jobs which don't set image_quality (nor its default).
+    :return: A list of job dicts, each with config, name, theme, overrides, logos_dir, output_dir, png_width,
+        image_formats and image_quality keys.
+    """
+    logging.info(f"Reading batch manifest from file: {manifest_filepath}")
+    manifest = utils.read_config(manifest_filepath) or {}
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_filepath))
+
+    defaults = {
+        "logos_dir": "logos",
+        "output_dir": ".",
+        "png_width": DEFAULT_PNG_WIDTH,
+        "image_formats": list(rasterize.DEFAULT_IMAGE_FORMATS),
+        "image_quality": image_quality,
+        "theme": None,
+        "overrides": None,
+    }
+    defaults.update(manifest.get("defaults", {}))
+
+    jobs = []
+    output_paths = set()
+    for job_entry in manifest.get("jobs", []):
+        job = dict(defaults)
+        job.update(job_entry)
+
+        if "config" not in job:
+            raise ValueError(f"Batch job is missing the required config key: {job_entry}")
+        if job["theme"] is not None and job["theme"] not in utils.theme_overrides:
+            raise ValueError(f"Unknown theme {job['theme']} for batch job: {job_entry}")
+
+        for path_key in ("config", "logos_dir", "output_dir"):
+            job[path_key] = os.path.join(manifest_dir, job[path_key])
+
+        if "name" not in job:
+            config_basename = os.path.splitext(os.path.basename(job["config"]))[0]
+            job["name"] = f"{config_basename}.{job['theme']}" if job["theme"] else config_basename
+
+        output_path = os.path.join(job["output_dir"], utils.slugify(job["name"]))
+        if output_path in output_paths:
+            raise ValueError(f"More than one batch job would write the output {output_path}, give each job a unique name")
+        output_paths.add(output_path)
+
+        job["png_width"] = rasterize.parse_widths(job["png_width"])
+        job["image_formats"] = rasterize.parse_image_formats(job["image_formats"])
+        if not isinstance(job["image_quality"], int) or not 1 <= job["image_quality"] <= 100:
+            raise ValueError(f"Image quality must be an integer from 1 to 100 for batch job: {job_entry}")
+        job["override_configs"] = utils.merge_theme_overrides(parse_job_overrides(job["overrides"]), job["theme"])
+        jobs.append(job)
+
+    logging.info(f"Read {len(jobs)} jobs from batch manifest")
+    return jobs
+
+
+def render_batch_job(
+    job,
+    config,
+    layout_cache_dir,
+    write_text_svg,
+    force=False,
+    embed_engine=generate_diagram.DEFAULT_EMBED_ENGINE,
+    optimize_svg=False,
+    optimize_precision=svg_optimizer.DEFAULT_PRECISION,
+    raster_tile_height=None,
+):
+    """
+    Renders the diagram for one batch job. Runs in a worker process, so any error is returned rather than raised.
+    :return: A result dict with the job name, status, output paths and timing in seconds.
+    """
+    result = {"name": job["name"], "config": job["config"], "theme": job["theme"], "svg": None, "png": None, "error": None}
+    start = time.perf_counter()
+    try:
+        utils.ensure_directory_exists(job["output_dir"])
+        result["svg"], result["png"] = generate_diagram.generate_diagram_from_config_dict(
+            config,
+            diagram_name=job["name"],
+            output_dir=job["output_dir"],
+            logos_dir=job["logos_dir"],
+            png_width=job["png_width"],
+            image_formats=job["image_formats"],
+            image_quality=job["image_quality"],
+            layout_cache=LayoutCache(cache_dir=layout_cache_dir),
+            write_text_svg=write_text_svg,
+            force=force,
+            embed_engine=embed_engine,
+            optimize_svg=optimize_svg,
+            optimize_precision=optimize_precision,
+            raster_tile_height=raster_tile_height,
+        )
+        result["status"] = "ok"
+    except Exception as e:
+        logging.exception(f"Batch job {job['name']} failed")
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(
+    jobs,
+    workers=None,
+    skip_download=False,
+    download_concurrency=download_logos.DEFAULT_DOWNLOAD_CONCURRENCY,
+    download_timeout=download_logos.DEFAULT_DOWNLOAD_TIMEOUT,
+    logo_cache_dir=None,
+    layout_cache_dir=None,
+    write_text_svg=False,
+    force=False,
+    embed_engine=generate_diagram.DEFAULT_EMBED_ENGINE,
+    optimize_svg=False,
+    optimize_precision=svg_optimizer.DEFAULT_PRECISION,
+    raster_tile_height=None,
+    interactive=None,
+):
+    """
+    Renders every job from a batch manifest in one process tree.
+    Each config file is read once, the logos for every tool across all jobs are downloaded once per logos directory,
+    then the layout, embedding and rasterization of each job is fanned out over a pool of worker processes.
+    :param jobs: Job dicts, as returned by read_manifest.
+    :param workers: Number of worker processes (default: number of CPUs).
+    :param layout_cache_dir: Directory for the persistent layout cache, shared between workers so jobs which only differ
+        by theme can reuse each other's layout. Layouts are only cached in memory per worker if not set.
+    :param force: Rebuild every output, rather than skipping jobs whose outputs are up to date.
+    :param embed_engine: Engine for embedding logos, one of generate_diagram.EMBED_ENGINES.
+    :param optimize_svg: Optimize each output SVG after embedding, rounding coordinates to optimize_precision places.
+    :param raster_tile_height: Rasterize in strips of this many rows, bounding each worker's memory use by the strip size.
+    :param interactive: Prompt for tools whose logo could not be found, rather than using placeholder logos and listing
+        them in each logos directory's missing logos report (default: only if stdin is a terminal).
+    :return: A list of result dicts (see render_batch_job), in the same order as the jobs.
+    """
+    # multiprocessing is slow to import, so is only loaded once a batch actually runs
+    from concurrent.futures import ProcessPoolExecutor
+
+    start = time.perf_counter()
+
+    configs = {}
+    for job in jobs:
+        if job["config"] not in configs:
+            configs[job["config"]] = utils.read_config(job["config"])
+
+    download_seconds = 0.0
+    if not skip_download:
+        download_start = time.perf_counter()
+        tool_sources_by_logos_dir = {}
+        for job in jobs:
+            tool_sources = tool_sources_by_logos_dir.setdefault(job["logos_dir"], [])
+            tool_sources.extend((job["config"], tool_config) for tool_config in utils.list_tools(configs[job["config"]]))
+
+        for logos_dir, tool_sources in tool_sources_by_logos_dir.items():
+            utils.ensure_directory_exists(logos_dir)
+            download_logos.download_tool_logos(
+                tool_sources=tool_sources,
+                logos_dir=logos_dir,
+                concurrency=download_concurrency,
+                timeout=download_timeout,
+                cache_dir=logo_cache_dir,
+                interactive=interactive,
+            )
+        download_seconds = time.perf_counter() - download_start
+        logging.info(f"Downloaded logos for all batch jobs in {download_seconds:.2f}s")
+
+    logging.info(f"Rendering {len(jobs)} batch jobs with {workers or os.cpu_count()} worker processes")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for job in jobs:
+            config = copy.deepcopy(configs[job["config"]])
+            if job["override_configs"]:
+                config["ecosystem"] = utils.override_config(config=config["ecosystem"], override_configs=job["override_configs"])
+            futures.append(
+                executor.submit(
+                    render_batch_job,
+                    job,
+                    config,
+                    layout_cache_dir,
+                    write_text_svg,
+                    force,
+                    embed_engine,
+                    optimize_svg,
+                    optimize_precision,
+                    raster_tile_height,
+                )
+            )
+        results = [future.result() for future in futures]
+
+    log_batch_summary(results, download_seconds, time.perf_counter() - start)
+    return results
+
+
+def log_batch_summary(results, download_seconds, total_seconds):
+    """
+    Logs a per-job timing summary table for a completed batch.
+    """
+    name_width = max([len(result["name"]) for result in results] + [4])
+    logging.info("Batch summary:")
+    logging.info(f"  {'name'.ljust(name_width)}  {'status':<7} {'seconds':>8}")
+    for result in results:
+        logging.info(f"  {result['name'].ljust(name_width)}  {result['status']:<7} {result['seconds']:>8.2f}")
+        if result["error"]:
+            logging.error(f"  {result['name']}: {result['error']}")
+
+    failed = sum(1 for result in results if result["status"] != "ok")
+    logging.info(
+        f"Batch completed in {total_seconds:.2f}s ({download_seconds:.2f}s downloading logos): "
+        f"{len(results) - failed} succeeded, {failed} failed"
+    )
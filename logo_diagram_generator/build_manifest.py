@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import logging
+import functools
+
+from logo_diagram_generator import logo_pack, utils
+
+# Bump whenever the manifest format, the meaning of a stage's inputs, or the form of a stage's output changes
+BUILD_MANIFEST_VERSION = 3
+
+
+@functools.lru_cache(maxsize=None)
+def package_version():
+    # importlib.metadata is slow to import, and only needed once a diagram is actually built
+    from importlib import metadata
+
+    try:
+        return metadata.version("logo-diagram-generator")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def hash_inputs(*inputs):
+    """
+    Computes a content hash over any number of JSON-serializable inputs, e.g. config dicts, hashes and numbers.
+    The package version is included, so upgrading the generator always rebuilds every stage.
+    """
+    serialized = json.dumps([BUILD_MANIFEST_VERSION, package_version(), *inputs], sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def hash_logo_files(config, logos_dir, logos_metadata=None):
+    """
+    Hashes the content of the logo for every tool in the config, so embedding is redone if any logo changes. Packed
+    logos' hashes are read from the pack's index, without reading the logos themselves.
+    :param logos_dir: The logos directory, or an open logo_pack.LogoStore for it.
+    :param logos_metadata: Optional dict of tool name slug -> logo metadata from a logo_index.LogoIndex, whose hashes
+        are used rather than reading the logos again.
+    :return: A dict of tool name slug -> sha256 hex digest, or None where the logo is missing.
+    """
+    logo_store = logo_pack.open_logo_store(logos_dir)
+    logo_hashes = {}
+    for tool_config in utils.list_tools(config):
+        tool_name_slug = utils.slugify(tool_config.get("name"))
+        if logos_metadata is not None and tool_name_slug in logos_metadata:
+            metadata = logos_metadata[tool_name_slug]
+            logo_hashes[tool_name_slug] = metadata["sha256"] if metadata is not None else None
+        else:
+            logo_hashes[tool_name_slug] = logo_store.sha256(tool_name_slug)
+    return logo_hashes
+
+
+class BuildManifest:
+    """
+    Records, for each build stage of a diagram, a hash of the stage's inputs and the output file it produced.
+    Stored as a hidden JSON file next to the diagram outputs, so a stage can be skipped on the next run if its inputs
+    are unchanged and its output file hasn't been modified or removed since.
+    """
+
+    def __init__(self, output_dir, diagram_basename):
+        self.path = os.path.join(output_dir, f".{diagram_basename}.build.json")
+        self.stages = {}
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as file:
+                    manifest = json.load(file)
+                if manifest.get("version") == BUILD_MANIFEST_VERSION:
+                    self.stages = manifest.get("stages", {})
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable build manifest {self.path}: {e}")
+
+    def is_up_to_date(self, stage, inputs_hash, output_path):
+        """
+        Returns True if the stage was last built from the same inputs, and its output file is still as it was written.
+        """
+        entry = self.stages.get(stage)
+        if entry is None or entry["inputs"] != inputs_hash or entry["output"] != os.path.abspath(output_path):
+            return False
+        try:
+            output_stat = os.stat(output_path)
+        except OSError:
+            return False
+        return output_stat.st_size == entry["size"] and output_stat.st_mtime_ns == entry["mtime_ns"]
+
+    def get_output_hash(self, stage):
+        return self.stages[stage]["output_sha256"]
+
+    def record(self, stage, inputs_hash, output_path, output_content):
+        """
+        Records that the stage has just written output_content to output_path from the given inputs.
+        """
+        output_stat = os.stat(output_path)
+        self.stages[stage] = {
+            "inputs": inputs_hash,
+            "output": os.path.abspath(output_path),
+            "output_sha256": hashlib.sha256(output_content).hexdigest(),
+            "size": output_stat.st_size,
+            "mtime_ns": output_stat.st_mtime_ns,
+        }
+
+    def save(self):
+        manifest = {"version": BUILD_MANIFEST_VERSION, "stages": self.stages}
+        utils.write_file_atomically(self.path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+        logging.debug(f"Build manifest saved to {self.path}")
@@ -1,29 +1,420 @@
 import os
+import sys
 import argparse
 import logging
 
-from logo_diagram_generator import download_logos, generate_diagram, utils
+# Only lightweight modules are imported up front; each stage imports its heavier modules (and their third party
+# dependencies) when it actually runs, so --help and skipped stages stay fast. See benchmarks/startup.py.
+from logo_diagram_generator import download_logos, profiling, rasterize, utils
+from logo_diagram_generator.constants import DEFAULT_EMBED_ENGINE, DEFAULT_OPTIMIZE_PRECISION, EMBED_ENGINES
+
+
+def add_logging_arguments(parser):
+    parser.add_argument("-d", "--debug", action="store_true", help="enable debug logging, equivalent to --log_level=debug")
+    parser.add_argument("--log_level", default="info", help="log level, e.g. info, debug, warning (default: %(default)s)")
+
+
+def configure_logging(args):
+    if args.debug:
+        log_level = logging.DEBUG
+    else:
+        log_level = getattr(logging, args.log_level.upper())
+
+    logging.basicConfig(
+        format="%(asctime)s.%(msecs)03d - %(levelname)s - %(module)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S", level=log_level
+    )
+
+
+def add_raster_tile_argument(parser):
+    parser.add_argument(
+        "--raster_tile_height",
+        "--raster-tile-height",
+        type=int,
+        nargs="?",
+        const=rasterize.DEFAULT_TILE_HEIGHT,
+        default=None,
+        help=f"Rasterize PNGs in horizontal strips of this many rows (default when given without a value: {rasterize.DEFAULT_TILE_HEIGHT}),\n"
+        "so memory use is bounded by the strip size rather than the image size. The pixels are the same, but each strip redraws the SVG.",
+    )
+
+
+def add_optimize_arguments(parser):
+    parser.add_argument(
+        "--optimize_svg",
+        "--optimize-svg",
+        action="store_true",
+        help="Optimize the output SVG after embedding logos: strip editor metadata and titles, drop unreferenced defs and\n"
+        "IDs, round coordinates and collapse whitespace. The rendered output is unchanged.",
+    )
+    parser.add_argument(
+        "--optimize_precision",
+        "--optimize-precision",
+        type=int,
+        default=DEFAULT_OPTIMIZE_PRECISION,
+        help="Number of decimal places --optimize_svg rounds coordinates to (default: %(default)s).",
+    )
+
+
+def add_non_interactive_argument(parser):
+    parser.add_argument(
+        "--non_interactive",
+        "--non-interactive",
+        action="store_true",
+        help="Never prompt for logos which can't be found; use a placeholder badge showing the tool's label, and list the\n"
+        "tool in the missing logos report to resolve later with the resolve subcommand. This is the default when stdin\n"
+        "isn't a terminal, e.g. in CI.",
+    )
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="logo-diagram-generator batch",
+        description="Render every diagram listed in a batch manifest in one process, with a pool of worker processes.",
+        formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, max_help_position=80),
+    )
+    add_logging_arguments(parser)
+
+    parser.add_argument("manifest", help="Path to the batch manifest file, listing the config, name, theme and overrides of each job.")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Number of worker processes (default: number of CPUs).")
+    parser.add_argument("-s", "--skip_download", action="store_true", help="Skip downloading logos before generating.")
+    parser.add_argument(
+        "--download_concurrency",
+        "--download-concurrency",
+        type=int,
+        default=download_logos.DEFAULT_DOWNLOAD_CONCURRENCY,
+        help="Maximum number of logos to download in parallel (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--download_timeout",
+        type=float,
+        default=download_logos.DEFAULT_DOWNLOAD_TIMEOUT,
+        help="Timeout in seconds for each logo download request (default: %(default)s).",
+    )
+    parser.add_argument("--logo_cache_dir", default=None, help="Directory for the persistent logo download cache.")
+    parser.add_argument("--layout_cache_dir", default=None, help="Directory for cached graph layouts, shared by all workers.")
+    parser.add_argument("--write_text_svg", action="store_true", help="Also write the text-only diagram for each job.")
+    parser.add_argument("-f", "--force", action="store_true", help="Rebuild every output, even if its inputs are unchanged.")
+    parser.add_argument(
+        "--embed_engine",
+        choices=EMBED_ENGINES,
+        default=DEFAULT_EMBED_ENGINE,
+        help="Engine for embedding logos; stream bounds memory use for very large diagrams (default: %(default)s).",
+    )
+    add_optimize_arguments(parser)
+    parser.add_argument(
+        "--image_quality",
+        type=int,
+        default=rasterize.DEFAULT_IMAGE_QUALITY,
+        help="Quality of WebP and JPEG images, from 1 to 100, for jobs which don't set image_quality in the manifest\n"
+        "(default: %(default)s).",
+    )
+    add_raster_tile_argument(parser)
+    add_non_interactive_argument(parser)
+    parser.add_argument("--summary_json", default=None, help="Write the per-job results and timings to this JSON file.")
+
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    import json
+    from logo_diagram_generator import batch, layout_cache
+
+    jobs = batch.read_manifest(args.manifest, image_quality=args.image_quality)
+    results = batch.run_batch(
+        jobs,
+        workers=args.workers,
+        skip_download=args.skip_download,
+        download_concurrency=args.download_concurrency,
+        download_timeout=args.download_timeout,
+        logo_cache_dir=args.logo_cache_dir,
+        layout_cache_dir=args.layout_cache_dir or layout_cache.default_layout_cache_dir(),
+        write_text_svg=args.write_text_svg,
+        force=args.force,
+        embed_engine=args.embed_engine,
+        optimize_svg=args.optimize_svg,
+        optimize_precision=args.optimize_precision,
+        raster_tile_height=args.raster_tile_height,
+        interactive=False if args.non_interactive else None,
+    )
+
+    if args.summary_json:
+        with open(args.summary_json, "w") as file:
+            json.dump(results, file, indent=2)
+        logging.info(f"Batch summary written to {args.summary_json}")
+
+    if any(result["status"] != "ok" for result in results):
+        sys.exit(1)
+
+
+def pack_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="logo-diagram-generator pack",
+        description="Pack every logo in a logos directory into a single indexed file, which diagrams then read logos from.",
+        formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, max_help_position=80),
+    )
+    add_logging_arguments(parser)
+    parser.add_argument("-l", "--logos_dir", default="logos", help="Directory where logos are stored (default: %(default)s).")
+    parser.add_argument(
+        "--remove_loose",
+        "--remove-loose",
+        action="store_true",
+        help="Delete the loose logo files once they are packed. Loose files take precedence over the pack, so new or\n"
+        "refreshed logos can still be added as files, and packed again later.",
+    )
+
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    from logo_diagram_generator import logo_pack
+
+    logo_pack.pack_logos(args.logos_dir, remove_loose=args.remove_loose)
+
+
+def unpack_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="logo-diagram-generator unpack",
+        description="Write every logo in a logos directory's pack back out as loose SVG files.",
+        formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, max_help_position=80),
+    )
+    add_logging_arguments(parser)
+    parser.add_argument("-l", "--logos_dir", default="logos", help="Directory where logos are stored (default: %(default)s).")
+    parser.add_argument("--overwrite", action="store_true", help="Replace existing loose logo files with the packed logos.")
+    parser.add_argument("--remove_pack", "--remove-pack", action="store_true", help="Delete the pack once every logo is unpacked.")
+
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    from logo_diagram_generator import logo_pack
+
+    logo_pack.unpack_logos(args.logos_dir, overwrite=args.overwrite, remove_pack=args.remove_pack)
+
+
+def index_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="logo-diagram-generator index",
+        description="Index the hash, dimensions and complexity of every logo in a logos directory, warning about any\n"
+        "logos complex enough to make rendering very slow.",
+        formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, max_help_position=80),
+    )
+    add_logging_arguments(parser)
+    parser.add_argument("-l", "--logos_dir", default="logos", help="Directory where logos are stored (default: %(default)s).")
+
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    from logo_diagram_generator import logo_index
+
+    logo_index.index_logos(args.logos_dir)
+
+
+def resolve_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="logo-diagram-generator resolve",
+        description="Prompt for the logo of every tool in the missing logos report left by non-interactive runs, in one pass.",
+        formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, max_help_position=80),
+    )
+    add_logging_arguments(parser)
+    parser.add_argument("-l", "--logos_dir", default="logos", help="Directory where logos are stored (default: %(default)s).")
+    parser.add_argument(
+        "--missing_logos_report",
+        "--missing-logos-report",
+        default=None,
+        help="Path of the missing logos report (default: missing_logos.json in the logos directory).",
+    )
+    parser.add_argument(
+        "--download_timeout",
+        type=float,
+        default=download_logos.DEFAULT_DOWNLOAD_TIMEOUT,
+        help="Timeout in seconds for each logo download request (default: %(default)s).",
+    )
+    parser.add_argument("--logo_cache_dir", default=None, help="Directory for the persistent logo download cache.")
+
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    still_missing = download_logos.resolve_missing_logos(
+        args.logos_dir, missing_logos_report=args.missing_logos_report, timeout=args.download_timeout, cache_dir=args.logo_cache_dir
+    )
+    if still_missing:
+        sys.exit(1)
+
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="logo-diagram-generator serve",
+        description="Serve diagram renders over local HTTP, keeping logos, layouts and rendered diagrams cached in memory.",
+        epilog="POST a config file to /render, with the name, theme, override (repeatable), format (svg, png, webp or jpeg),\n"
+        "width, quality and optimize options as query parameters, e.g.\n"
+        "  curl --data-binary @config.yml 'http://127.0.0.1:8080/render?theme=dark&format=png&width=1200' -o diagram.png\n"
+        "GET /stats for request counts, latency percentiles and cache hit rates.",
+        formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, max_help_position=80),
+    )
+    add_logging_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: %(default)s).")
+    parser.add_argument("-p", "--port", type=int, default=8080, help="Port to listen on (default: %(default)s).")
+    parser.add_argument("-l", "--logos_dir", default="logos", help="Directory where logos are stored (default: %(default)s).")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Number of renders to run at once (default: number of CPUs).")
+    parser.add_argument(
+        "--max_pending",
+        "--max-pending",
+        type=int,
+        default=None,
+        help="Maximum renders queued or running at once, beyond which requests get a 503 response (default: 4 per worker).",
+    )
+    parser.add_argument(
+        "--max_request_bytes",
+        "--max-request-bytes",
+        type=int,
+        default=1024 * 1024,
+        help="Largest config accepted in a request body, in bytes (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--result_cache_mb",
+        "--result-cache-mb",
+        type=int,
+        default=256,
+        help="Memory for caching rendered SVGs and images, in megabytes (default: %(default)s).",
+    )
+    parser.add_argument("--layout_cache_dir", default=None, help="Directory for cached graph layouts, shared with other runs.")
+
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    from logo_diagram_generator import layout_cache, server
+
+    server.serve(
+        args.logos_dir,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        max_request_bytes=args.max_request_bytes,
+        result_cache_bytes=args.result_cache_mb * 1024 * 1024,
+        layout_cache_dir=args.layout_cache_dir or layout_cache.default_layout_cache_dir(),
+    )
+
+
+# Subcommands are dispatched on the first argument, so the original flag-only usage keeps working unchanged
+subcommands = {
+    "batch": batch_main,
+    "pack": pack_main,
+    "unpack": unpack_main,
+    "index": index_main,
+    "resolve": resolve_main,
+    "serve": serve_main,
+}
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in subcommands:
+        return subcommands[sys.argv[1]](sys.argv[2:])
+
     parser = argparse.ArgumentParser(
         description="Generate SVG diagrams of a tech ecosystem, using logos from each tool organised into groups around a central logo.",
+        epilog=f"Subcommands (run with --help for details): {', '.join(subcommands)}",
         formatter_class=lambda prog: argparse.RawTextHelpFormatter(prog, max_help_position=80),
     )
-    parser.add_argument("-d", "--debug", action="store_true", help="enable debug logging, equivalent to --log_level=debug")
-    parser.add_argument("--log_level", default="info", help="log level, e.g. info, debug, warning (default: %(default)s)")
+    add_logging_arguments(parser)
 
     parser.add_argument("-n", "--name", default="diagram", help="Base name for the output SVG files.")
     parser.add_argument("-c", "--config", default="config.yml", help="Path to the configuration file.")
     parser.add_argument("-l", "--logos_dir", default="logos", help="Directory where logos are stored.")
     parser.add_argument("-s", "--skip_download", default=False, help="Skip downloading logos before generating.")
+    parser.add_argument(
+        "--download_concurrency",
+        "--download-concurrency",
+        type=int,
+        default=download_logos.DEFAULT_DOWNLOAD_CONCURRENCY,
+        help="Maximum number of logos to download in parallel (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--download_timeout",
+        type=float,
+        default=download_logos.DEFAULT_DOWNLOAD_TIMEOUT,
+        help="Timeout in seconds for each logo download request (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--refresh_logos",
+        "--refresh-logos",
+        action="store_true",
+        help="Revalidate existing logos with their source URL using conditional requests, downloading any which changed.",
+    )
+    parser.add_argument(
+        "--logo_cache_dir",
+        default=None,
+        help="Directory for the persistent logo download cache (default: $XDG_CACHE_HOME/logo-diagram-generator).",
+    )
+    add_non_interactive_argument(parser)
+    parser.add_argument(
+        "--missing_logos_report",
+        "--missing-logos-report",
+        default=None,
+        help="Where non-interactive runs list tools given placeholder logos (default: missing_logos.json in the logos directory).",
+    )
     parser.add_argument(
         "-o",
         "--output_dir",
         default=os.getcwd(),
         help="Directory for the output SVG diagram.",
     )
-    parser.add_argument("-w", "--png_width", type=int, default=3000, help="Width of the resulting PNG image (default: 3000).")
+    parser.add_argument(
+        "--layout_cache_dir",
+        default=None,
+        help="Directory for cached graph layouts, shared between themes of the same diagram (default: $XDG_CACHE_HOME/logo-diagram-generator/layouts).",
+    )
+    parser.add_argument(
+        "--write_text_svg",
+        action="store_true",
+        help="Also write the intermediate text-only diagram (without logos) to <name>_text.svg in the output directory.",
+    )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Rebuild every output, even if the build manifest shows its inputs are unchanged since the last run.",
+    )
+    parser.add_argument(
+        "--embed_engine",
+        choices=EMBED_ENGINES,
+        default=DEFAULT_EMBED_ENGINE,
+        help="Engine for embedding logos into the diagram (default: %(default)s). Both produce the same output, but stream\n"
+        "copies each logo straight to the output instead of building a DOM, so memory use is bounded by the largest logo.",
+    )
+    add_optimize_arguments(parser)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, and update the diagram whenever the config file or a logo changes.\n"
+        "Changes which only affect logos (e.g. positionAdjustX, scale, strokeWidth) re-embed just those logos.",
+    )
+    parser.add_argument(
+        "--profile_report",
+        "--profile-report",
+        default=None,
+        help="Write the wall time, peak RSS and bytes read and written of each stage, and of each tool's download and\n"
+        "embedding, to this JSON file.",
+    )
+    parser.add_argument(
+        "-w",
+        "--png_width",
+        type=rasterize.parse_widths,
+        default=[3000],
+        help="Width of the resulting PNG image (default: 3000), or a comma separated list of widths, e.g. 3000,6000,600,\n"
+        "all rendered from a single parse of the SVG. The first is written to <name>_logos.png, the others to <name>_logos_<width>w.png.",
+    )
+    parser.add_argument(
+        "--image_formats",
+        "--image-formats",
+        type=rasterize.parse_image_formats,
+        default=list(rasterize.DEFAULT_IMAGE_FORMATS),
+        help=f"Comma separated image formats to write at each width, from {', '.join(rasterize.IMAGE_FORMATS)} (default: png).",
+    )
+    parser.add_argument(
+        "--image_quality",
+        type=int,
+        default=rasterize.DEFAULT_IMAGE_QUALITY,
+        help="Quality of WebP and JPEG images, from 1 to 100 (default: %(default)s).",
+    )
+    add_raster_tile_argument(parser)
     parser.add_argument(
         "-oc",
         "--override",
@@ -34,62 +425,95 @@ def main():
     parser.add_argument(
         "-t",
         "--theme",
-        choices=["dark", "light"],
+        choices=sorted(utils.theme_overrides),
         default=None,
         help="Theme for the diagram, either 'dark' or 'light' (default: %(default)s)",
     )
 
     args = parser.parse_args()
-
-    if args.debug:
-        log_level = logging.DEBUG
-    else:
-        log_level = getattr(logging, args.log_level.upper())
-
-    logging.basicConfig(
-        format="%(asctime)s.%(msecs)03d - %(levelname)s - %(module)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S", level=log_level
-    )
+    if args.watch and args.embed_engine != "dom":
+        parser.error("--watch re-embeds single logos into the diagram's DOM, so only supports --embed_engine dom")
+    configure_logging(args)
 
     logging.info(f"Checking logos directory exists: {args.logos_dir}")
     utils.ensure_directory_exists(args.logos_dir)
 
-    if not args.skip_download:
+    profiler = profiling.Profiler() if args.profile_report else profiling.null_profiler
+
+    def download_all_logos():
         logging.info(f"Downloading all logos to directory: {args.logos_dir}")
-        download_logos.download_all_logos(config_filepath=args.config, logos_dir=args.logos_dir)
+        download_logos.download_all_logos(
+            config_filepath=args.config,
+            logos_dir=args.logos_dir,
+            concurrency=args.download_concurrency,
+            timeout=args.download_timeout,
+            cache_dir=args.logo_cache_dir,
+            refresh=args.refresh_logos,
+            profiler=profiler,
+            interactive=False if args.non_interactive else None,
+            missing_logos_report=args.missing_logos_report,
+        )
         logging.info(f"Downloaded all logos to directory: {args.logos_dir}")
 
     # args.override is e.g. [{'style.diagramBackgroundColor': '#111111'}]
-    theme_overrides = None
-    if args.theme == "dark":
-        theme_overrides = {
-            "style.groupLabelFontcolor": "#ffffff",
-            "style.colorPalette": "aqua,purple3,maroon3,orangered,yellow,lime,fuchsia,#6495ed,peachpuff,forestgreen",
-            "style.defaultLogoStrokeColor": "white",
-            "style.defaultLogoStrokeWidth": "0.5",
-        }
-    elif args.theme == "light":
-        theme_overrides = {
-            "style.groupLabelFontcolor": "#222222",
-            "style.colorPalette": "seagreen,maroon,midnightblue,olive,red,mediumblue,darksalmon,darkgreen,orange",
-            "style.defaultLogoStrokeColor": "#333333",
-            "style.defaultLogoStrokeWidth": "0.2",
-        }
-
-    if theme_overrides is not None:
-        overrides = args.override if args.override is not None else []
-        # Merge all dictionaries in the list into a single dictionary
-        combined_overrides = {k: v for d in overrides for k, v in d.items()}
-        combined_overrides.update(theme_overrides)
-        args.override = [combined_overrides]
-
-    output_svg_path, output_png_path = generate_diagram.generate_diagram_from_config(
-        config_filepath=args.config,
-        diagram_name=args.name,
-        output_dir=args.output_dir,
-        logos_dir=args.logos_dir,
-        png_width=args.png_width,
-        override_configs=args.override,
-    )
+    args.override = utils.merge_theme_overrides(args.override, args.theme)
+
+    from logo_diagram_generator import generate_diagram, layout_cache, watch
+
+    diagram_layout_cache = layout_cache.LayoutCache(cache_dir=args.layout_cache_dir or layout_cache.default_layout_cache_dir())
+
+    if args.watch:
+        watcher = watch.DiagramWatcher(
+            config_filepath=args.config,
+            diagram_name=args.name,
+            output_dir=args.output_dir,
+            logos_dir=args.logos_dir,
+            png_width=args.png_width,
+            override_configs=args.override,
+            layout_cache=diagram_layout_cache,
+            on_config_change=None if args.skip_download else download_all_logos,
+            image_formats=args.image_formats,
+            image_quality=args.image_quality,
+            raster_tile_height=args.raster_tile_height,
+            write_text_svg=args.write_text_svg,
+            profiler=profiler,
+            optimize_svg=args.optimize_svg,
+            optimize_precision=args.optimize_precision,
+        )
+        try:
+            watcher.run()
+        finally:
+            # Covers every update made while watching, and is written when watching stops
+            if args.profile_report:
+                profiler.write_report(args.profile_report)
+        return
+
+    try:
+        if not args.skip_download:
+            download_all_logos()
+
+        output_svg_path, output_png_path = generate_diagram.generate_diagram_from_config(
+            config_filepath=args.config,
+            diagram_name=args.name,
+            output_dir=args.output_dir,
+            logos_dir=args.logos_dir,
+            png_width=args.png_width,
+            override_configs=args.override,
+            layout_cache=diagram_layout_cache,
+            write_text_svg=args.write_text_svg,
+            force=args.force,
+            profiler=profiler,
+            embed_engine=args.embed_engine,
+            optimize_svg=args.optimize_svg,
+            optimize_precision=args.optimize_precision,
+            image_formats=args.image_formats,
+            image_quality=args.image_quality,
+            raster_tile_height=args.raster_tile_height,
+        )
+    finally:
+        # Written even if a stage fails, as slow or failing runs are the ones worth looking into
+        if args.profile_report:
+            profiler.write_report(args.profile_report)
 
     logging.info(f"Logo diagram generator completed successfully! Output filenames: {output_svg_path}, {output_png_path}")
 
@@ -0,0 +1,215 @@
+import os
+import json
+import logging
+
+from logo_diagram_generator import utils
+
+
+def mapping_value_node(mapping_node, key):
+    """
+    :return: The value node for a key in a composed YAML mapping node, or None if the mapping doesn't have the key.
+    """
+    for key_node, value_node in mapping_node.value:
+        if getattr(key_node, "value", None) == key:
+            return value_node
+    return None
+
+
+def last_scalar_node(node):
+    """
+    :return: The last scalar in a composed YAML node, e.g. the last item of a tool's last nested list. Unlike the end of
+        a block collection, its end is never after any comments or blank lines following the collection.
+    """
+    while node.value and not isinstance(node.value, str):
+        node = node.value[-1][1] if isinstance(node.value[-1], tuple) else node.value[-1]
+    return node
+
+
+def format_scalar(value, flow=False):
+    """
+    Formats a value as a single line of YAML, quoted only if needed in block context (or in flow context, where e.g.
+    commas also need quoting, if flow is set).
+    """
+    import yaml
+
+    if isinstance(value, str) and ("\n" in value or "\r" in value):
+        # A JSON string is a valid double quoted YAML scalar, with its line breaks escaped onto one line
+        return json.dumps(value)
+    if flow:
+        # Dumping a one item flow sequence gives the value's flow representation, without a document end marker
+        return yaml.safe_dump([value], default_flow_style=True, width=float("inf")).strip()[1:-1]
+    return yaml.safe_dump({"key": value}, default_flow_style=False, width=float("inf")).strip()[len("key: ") :]
+
+
+class ConfigDocument:
+    """
+    In-memory model of a config file, for applying updates to its tools (e.g. the alias or svgURL a user supplies for a
+    logo) and writing them back in one go.
+
+    The file is read and parsed once, and tools are indexed by name, so looking up or updating a tool is a dict access
+    rather than a re-read and scan of the file. Updates are applied to the model immediately, and collected until
+    flush(), which patches just the changed values into the original text, so the user's comments, key order, quoting
+    and indentation are kept, then replaces the file atomically.
+    """
+
+    def __init__(self, config_filepath):
+        self.config_filepath = config_filepath
+        # Tool name -> {key: value} of updates not yet written to the file
+        self.pending_updates = {}
+        self.load()
+
+    def load(self):
+        import yaml
+
+        # Line endings are kept as they are, so patched text can be written back without converting them
+        with open(self.config_filepath, "r", newline="") as file:
+            self.text = file.read()
+        self.stat = os.stat(self.config_filepath)
+        self.config = yaml.safe_load(self.text)
+        root_node = yaml.compose(self.text, Loader=yaml.SafeLoader)
+
+        # Tool name -> (tool config dict, composed mapping node); the first tool with each name wins, as it always has
+        self.tools = {}
+        ecosystem = self.config.get("ecosystem", {})
+        ecosystem_node = mapping_value_node(root_node, "ecosystem")
+
+        central_tool = ecosystem.get("centralTool")
+        if central_tool and central_tool.get("name") is not None:
+            self.tools.setdefault(central_tool["name"], (central_tool, mapping_value_node(ecosystem_node, "centralTool")))
+
+        group_nodes = mapping_value_node(ecosystem_node, "groups")
+        for group, group_node in zip(ecosystem.get("groups") or [], group_nodes.value if group_nodes is not None else []):
+            tool_nodes = mapping_value_node(group_node, "tools")
+            for tool, tool_node in zip(group.get("tools") or [], tool_nodes.value if tool_nodes is not None else []):
+                if tool.get("name") is not None:
+                    self.tools.setdefault(tool["name"], (tool, tool_node))
+
+    def get_tool(self, tool_name):
+        """
+        :return: The config dict for the named tool, including any pending updates, or None if there is no such tool.
+        """
+        tool = self.tools.get(tool_name)
+        return tool[0] if tool is not None else None
+
+    def update_tool(self, tool_name, updates):
+        """
+        Applies updates to the named tool in the model, to be written to the file by flush().
+        :param updates: Dictionary of keys and values to set on the tool.
+        :return: True if the tool was found and updated.
+        """
+        if tool_name not in self.tools:
+            logging.error(f"Failed to update config file for tool {tool_name} with updates: {updates}")
+            return False
+
+        self.tools[tool_name][0].update(updates)
+        self.pending_updates.setdefault(tool_name, {}).update(updates)
+        logging.info(f"Updated tool {tool_name} in config with new values: {updates}")
+        return True
+
+    def content_end(self, node, minimum):
+        """
+        :return: The offset just after the last character of a node's content. Block values end at the start of the
+            next line, so trailing whitespace and line breaks are skipped back over.
+        """
+        end = node.end_mark.index
+        while end > minimum and self.text[end - 1] in " \t\r\n":
+            end -= 1
+        return end
+
+    def patched_text(self):
+        """
+        :return: The original text with every pending update patched in: existing values are replaced in place, and
+            new keys are added at the end of the tool's mapping, indented like its other keys.
+        """
+        newline = "\r\n" if "\r\n" in self.text else "\n"
+        # (start, end, replacement) spans, applied from the end of the text backwards so earlier offsets stay valid
+        edits = []
+        for tool_name, updates in self.pending_updates.items():
+            tool_node = self.tools[tool_name][1]
+            for key, value in updates.items():
+                value_node = mapping_value_node(tool_node, key)
+                formatted_value = format_scalar(value, flow=tool_node.flow_style)
+                if value_node is not None and value_node.end_mark.index > value_node.start_mark.index:
+                    start = value_node.start_mark.index
+                    edits.append((start, self.content_end(value_node, start), formatted_value))
+                elif value_node is not None:
+                    # An empty (null) value, e.g. "alias:", is filled in after its key
+                    key_end = self.content_end(value_node, 0)
+                    edits.append((key_end, key_end, f" {formatted_value}"))
+                elif tool_node.flow_style:
+                    closing_brace = self.text.rindex("}", 0, tool_node.end_mark.index)
+                    edits.append((closing_brace, closing_brace, f", {key}: {formatted_value}"))
+                else:
+                    indent = " " * tool_node.value[0][0].start_mark.column
+                    line_end = self.text.find("\n", self.content_end(last_scalar_node(tool_node), 0))
+                    if line_end == -1:
+                        edits.append((len(self.text), len(self.text), f"{newline}{indent}{key}: {formatted_value}"))
+                    else:
+                        edits.append((line_end + 1, line_end + 1, f"{indent}{key}: {formatted_value}{newline}"))
+
+        text = self.text
+        for start, end, replacement in sorted(edits, key=lambda edit: edit[0], reverse=True):
+            text = text[:start] + replacement + text[end:]
+        return text
+
+    def flush(self):
+        """
+        Writes every pending update to the config file at once, atomically via a temporary file and rename. If the file
+        was changed by something else since it was read, it is re-read and the updates applied to its new content.
+        The file's permissions are kept, and if the config path is a symlink, the file it points to is updated.
+        """
+        import yaml
+
+        if not self.pending_updates:
+            return
+
+        stat = os.stat(self.config_filepath)
+        if (stat.st_mtime_ns, stat.st_size) != (self.stat.st_mtime_ns, self.stat.st_size):
+            logging.info(f"Config file {self.config_filepath} changed since it was read, re-reading it before writing updates")
+            pending_updates = self.pending_updates
+            self.pending_updates = {}
+            self.load()
+            for tool_name, updates in pending_updates.items():
+                self.update_tool(tool_name, updates)
+
+        text = self.patched_text()
+        try:
+            patched_correctly = yaml.safe_load(text) == self.config
+        except yaml.YAMLError:
+            patched_correctly = False
+        if not patched_correctly:
+            # e.g. YAML anchors or unusual layouts the patching can't follow; the updates matter more than the layout
+            logging.warning(f"Couldn't update {self.config_filepath} in place, rewriting it without its comments and formatting")
+            text = yaml.safe_dump(self.config, sort_keys=False)
+
+        # The rename would replace a symlinked config with a regular file, so the file it points to is replaced instead,
+        # keeping its permissions
+        utils.write_file_atomically(os.path.realpath(self.config_filepath), text.encode("utf-8"), mode=self.stat.st_mode)
+        logging.info(f"Successfully wrote updates for {len(self.pending_updates)} tools back to config file: {self.config_filepath}")
+        self.pending_updates = {}
+        self.load()
+
+
+class ConfigEditor:
+    """
+    Collects tool updates across any number of config files, each loaded once as a ConfigDocument on first use, and
+    writes them all back with flush().
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def document(self, config_filepath):
+        if config_filepath not in self.documents:
+            self.documents[config_filepath] = ConfigDocument(config_filepath)
+        return self.documents[config_filepath]
+
+    def get_tool(self, config_filepath, tool_name):
+        return self.document(config_filepath).get_tool(tool_name)
+
+    def update_tool(self, config_filepath, tool_name, updates):
+        return self.document(config_filepath).update_tool(tool_name, updates)
+
+    def flush(self):
+        for document in self.documents.values():
+            document.flush()
@@ -0,0 +1,12 @@
+# Constants shared by the CLI and the modules implementing them. This module has no imports, so the CLI can use them
+# for its arguments without importing the (slower to import) implementations up front. See benchmarks/startup.py.
+
+# Engines for embedding logos into the rendered diagram, which produce the same output:
+# - dom parses the diagram and every logo into a minidom document, which watch mode needs to update single logos
+# - stream copies the diagram and each logo straight to the output, so memory scales with the largest single logo
+EMBED_ENGINES = ("dom", "stream")
+DEFAULT_EMBED_ENGINE = "dom"
+
+# Number of decimal places --optimize_svg rounds coordinates to by default; a thousandth of a unit is well below a pixel
+# for both the diagram (in points) and the logos (at their nominal 120x60 size)
+DEFAULT_OPTIMIZE_PRECISION = 3
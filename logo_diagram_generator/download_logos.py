@@ -1,8 +1,50 @@
 import os
+import sys
 import logging
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
-from logo_diagram_generator import utils
+from logo_diagram_generator import logo_pack, missing_logos, profiling, utils
+from logo_diagram_generator.config_editor import ConfigEditor
+from logo_diagram_generator.logo_cache import LogoCache
+
+# Base URL for guessed logo URLs; point this at a local stand-in server to exercise downloads without network access
+VECTORLOGOZONE_BASE_URL = "https://www.vectorlogo.zone"
+
+DEFAULT_DOWNLOAD_CONCURRENCY = 8
+DEFAULT_DOWNLOAD_TIMEOUT = 10
+DEFAULT_DOWNLOAD_RETRIES = 3
+DEFAULT_DOWNLOAD_BACKOFF_FACTOR = 0.5
+
+
+def create_session(
+    pool_size=DEFAULT_DOWNLOAD_CONCURRENCY, retries=DEFAULT_DOWNLOAD_RETRIES, backoff_factor=DEFAULT_DOWNLOAD_BACKOFF_FACTOR
+):
+    """
+    Creates a requests Session with a keep-alive connection pool large enough for `pool_size` concurrent downloads,
+    which retries connection errors and transient server errors a bounded number of times with exponential backoff.
+    :param pool_size: Maximum number of pooled connections per host.
+    :param retries: Maximum number of retries per request.
+    :param backoff_factor: Backoff factor between retries, in seconds (0.5 sleeps 0.5s, 1s, 2s, ...).
+    :return: The configured requests.Session.
+    """
+    # requests is imported where it's used throughout this module, so runs which skip downloading never import it
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 def generate_vectorlogozone_urls(tool_config):
@@ -17,28 +59,53 @@ def generate_vectorlogozone_urls(tool_config):
     tool_name = tool_config.get("name", None)
     if tool_name is not None:
         tool_name_slug = utils.slugify(tool_name)
-        urls_to_try.append(f"https://www.vectorlogo.zone/logos/{tool_name_slug}/{tool_name_slug}-ar21.svg")
+        urls_to_try.append(f"{VECTORLOGOZONE_BASE_URL}/logos/{tool_name_slug}/{tool_name_slug}-ar21.svg")
 
     tool_alias = tool_config.get("alias", None)
     if tool_alias is not None:
         tool_alias_slug = utils.slugify(tool_alias)
-        urls_to_try.append(f"https://www.vectorlogo.zone/logos/{tool_alias_slug}/{tool_alias_slug}-ar21.svg")
+        urls_to_try.append(f"{VECTORLOGOZONE_BASE_URL}/logos/{tool_alias_slug}/{tool_alias_slug}-ar21.svg")
 
     tool_label = tool_config.get("label", None)
     if tool_label is not None:
         tool_label_slug = utils.slugify(tool_label)
-        urls_to_try.append(f"https://www.vectorlogo.zone/logos/{tool_label_slug}/{tool_label_slug}-ar21.svg")
+        urls_to_try.append(f"{VECTORLOGOZONE_BASE_URL}/logos/{tool_label_slug}/{tool_label_slug}-ar21.svg")
 
     return urls_to_try
 
 
-def handle_logo_not_found(config_filepath, tool_config, tool_name, logos_dir):
+def handle_logo_not_found(
+    config_filepath,
+    tool_config,
+    tool_name,
+    logos_dir,
+    session=None,
+    timeout=DEFAULT_DOWNLOAD_TIMEOUT,
+    cache=None,
+    replace_placeholder=False,
+    config_editor=None,
+):
     """
     Handles cases where the logo cannot be found automatically.
     Prompts the user for alternative actions.
     :param tool_name: The name of the tool.
     :param logos_dir: The path where logos should be saved.
+    :param session: Optional requests Session to reuse for any further download attempts.
+    :param timeout: Timeout in seconds for each download attempt.
+    :param cache: Optional LogoCache to record the outcome of further download attempts in.
+    :param replace_placeholder: The tool's existing logo is a placeholder, so download a logo regardless.
+    :param config_editor: Optional ConfigEditor to collect the alias or svgURL the user supplies in, so the config files
+        are written once after every tool has been handled. If not set, the config file is updated straight away.
     """
+    if config_editor is None:
+        config_editor = ConfigEditor()
+        try:
+            return handle_logo_not_found(
+                config_filepath, tool_config, tool_name, logos_dir, session, timeout, cache, replace_placeholder, config_editor
+            )
+        finally:
+            config_editor.flush()
+
     logging.warning(f"Could not find a logo for {tool_name}.")
     vectorlogozone_search_url = f"https://www.vectorlogo.zone/?q={tool_name}"
     logging.info(f"Try searching VectorLogoZone first: {vectorlogozone_search_url}")
@@ -48,10 +115,18 @@ def handle_logo_not_found(config_filepath, tool_config, tool_name, logos_dir):
         if found_with_alias == "y":
             alias = input("Enter the alias name found in the VectorLogoZone URL: ").strip()
             # Update the alias in config.yml
-            utils.update_config(config_filepath, tool_name, {"alias": alias})
-            tool_config = get_latest_config_for_tool(config_filepath, tool_name)
+            config_editor.update_tool(config_filepath, tool_name, {"alias": alias})
+            tool_config = config_editor.get_tool(config_filepath, tool_name)
             # Attempt to download the logo using the new alias
-            download_svg(config_filepath=config_filepath, tool_config=tool_config, logos_dir=logos_dir)
+            download_svg(
+                config_filepath=config_filepath,
+                tool_config=tool_config,
+                logos_dir=logos_dir,
+                session=session,
+                timeout=timeout,
+                cache=cache,
+                replace_placeholder=replace_placeholder,
+            )
             break
         elif found_with_alias == "n":
             search_url = f"https://logosear.ch/search.html?q={tool_name}"
@@ -60,11 +135,19 @@ def handle_logo_not_found(config_filepath, tool_config, tool_name, logos_dir):
             user_url = input("Once you find an SVG URL for your tool, enter the URL here: ")
             if user_url:
                 # Update the svgURL in config.yml
-                utils.update_config(config_filepath, tool_name, {"svgURL": user_url})
-                tool_config = get_latest_config_for_tool(config_filepath, tool_name)
-
-                # Attempt to download the logo using the user-provided URL now that has been saved to the config file
-                download_svg(config_filepath=config_filepath, tool_config=tool_config, logos_dir=logos_dir)
+                config_editor.update_tool(config_filepath, tool_name, {"svgURL": user_url})
+                tool_config = config_editor.get_tool(config_filepath, tool_name)
+
+                # Attempt to download the logo using the user-provided URL now that has been saved to the config
+                download_svg(
+                    config_filepath=config_filepath,
+                    tool_config=tool_config,
+                    logos_dir=logos_dir,
+                    session=session,
+                    timeout=timeout,
+                    cache=cache,
+                    replace_placeholder=replace_placeholder,
+                )
             else:
                 logging.info("No URL provided. Skipping download.")
             break
@@ -72,24 +155,80 @@ def handle_logo_not_found(config_filepath, tool_config, tool_name, logos_dir):
             logging.info("Invalid input. Please enter 'y' for yes or 'n' for no.")
 
 
-def download_svg(config_filepath, tool_config, logos_dir):
+def revalidate_svg(tool_config, output_path, url, http, timeout, cache):
     """
-    Attempt to download an SVG logo for the given tool
-    Test various URLs (using the tool name, label or alias) to find a working URL.
-    If all attempts fail, prompt the user for an alternative URL.
-    If the logo already exists at the output path, do not download it again.
+    Revalidates an existing logo against the URL it was downloaded from, using a conditional GET with the cached
+    ETag / Last-Modified validators, and overwrites the logo only if the server returns new content.
     """
+    import requests
+
+    tool_name = tool_config.get("name")
+    try:
+        response = http.get(url, headers=cache.conditional_headers(url), timeout=timeout)
+        if response.status_code == 304:
+            logging.info(f"Logo for {tool_name} is up to date.")
+        elif response.status_code == 200:
+            with open(output_path, "wb") as f:
+                f.write(response.content)
+            cache.store(url, response)
+            logging.info(f"Refreshed logo for {tool_name} from {url}.")
+        else:
+            logging.warning(
+                f"Failed to refresh logo for {tool_name} from {url}, keeping existing logo. Status code: {response.status_code}"
+            )
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Error refreshing logo from {url}, keeping existing logo: {e}")
+
+
+def fetch_svg(
+    tool_config,
+    logos_dir,
+    session=None,
+    timeout=DEFAULT_DOWNLOAD_TIMEOUT,
+    cache=None,
+    refresh=False,
+    logo_store=None,
+    replace_placeholder=False,
+):
+    """
+    Attempt to download an SVG logo for the given tool, without any user interaction.
+    Test various URLs (using the svgURL, tool name, alias or label) to find a working URL.
+    If the logo already exists at the output path or in the logos directory's pack, do not download it again, unless
+    `refresh` is set and the logo cache knows where it came from, in which case it is revalidated with a conditional GET
+    (a changed logo is written to the output path, which takes precedence over the pack).
+    :param tool_config: The config dict for the tool.
+    :param logos_dir: The directory where logos should be saved.
+    :param session: Optional requests Session to reuse pooled connections; a plain requests.get is used if not set.
+    :param timeout: Timeout in seconds for each request.
+    :param cache: Optional LogoCache, used to restore previously downloaded logos and skip URLs known to 404.
+    :param refresh: Revalidate cached and existing logos with the server rather than trusting them.
+    :param logo_store: Optional logo_pack.LogoStore for logos_dir, to check for existing logos without listing the
+        directory again for every tool.
+    :param replace_placeholder: The tool's existing logo is a placeholder (see missing_logos), so try to download a real
+        logo over it rather than treating it as already downloaded.
+    :return: True if the logo exists or was downloaded, False if every URL failed.
+    """
+    import requests
 
     tool_name = tool_config.get("name")
     tool_name_slug = utils.slugify(tool_name)
     output_path = os.path.join(logos_dir, f"{tool_name_slug}.svg")
 
-    logging.debug(f"Download SVG called with tool_config: {tool_config}, logos_dir: {logos_dir}")
+    logging.debug(f"Fetch SVG called with tool_config: {tool_config}, logos_dir: {logos_dir}")
+
+    http = session if session is not None else requests
+
+    if logo_store is None:
+        logo_store = logo_pack.LogoStore(logos_dir)
 
     # Check if the logo already exists
-    if os.path.exists(output_path):
-        logging.info(f"Logo for {tool_name} already exists. Skipping download.")
-        return
+    if tool_name_slug in logo_store and not replace_placeholder:
+        source_url = cache.get_logo_url(tool_name_slug) if cache is not None else None
+        if refresh and source_url is not None:
+            revalidate_svg(tool_config, output_path, source_url, http, timeout, cache)
+        else:
+            logging.info(f"Logo for {tool_name} already exists. Skipping download.")
+        return True
 
     urls_to_try = generate_vectorlogozone_urls(tool_config)
 
@@ -99,38 +238,91 @@ def download_svg(config_filepath, tool_config, logos_dir):
         urls_to_try.insert(0, tool_svg_url)
 
     for url in urls_to_try:
+        cached_body = None
+        headers = {}
+        if cache is not None:
+            if cache.is_known_missing(url):
+                logging.debug(f"Skipping {url}, which returned 404 recently")
+                continue
+
+            cached_body = cache.get_body(url)
+            if cached_body is not None:
+                if not refresh:
+                    with open(output_path, "wb") as f:
+                        f.write(cached_body)
+                    cache.record_logo_url(tool_name_slug, url)
+                    logging.info(f"Restored logo for {tool_name} from cache.")
+                    return True
+                headers = cache.conditional_headers(url)
+
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
+            response = http.get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304 and cached_body is not None:
+                with open(output_path, "wb") as f:
+                    f.write(cached_body)
+                cache.record_logo_url(tool_name_slug, url)
+                logging.info(f"Restored logo for {tool_name} from cache after revalidation.")
+                return True
+            elif response.status_code == 200:
                 with open(output_path, "wb") as f:
                     f.write(response.content)
+                if cache is not None:
+                    cache.store(url, response)
+                    cache.record_logo_url(tool_name_slug, url)
                 logging.info(f"Downloaded VectorLogoZone logo for {tool_name}.")
-                return
+                return True
             else:
+                if response.status_code in (404, 410) and cache is not None:
+                    cache.record_missing(url)
                 logging.warning(f"Failed to download logo from {url}. Status code: {response.status_code}")
         except requests.exceptions.RequestException as e:
             logging.error(f"Error downloading logo from {url}: {e}")
 
+    return False
+
+
+def download_svg(
+    config_filepath,
+    tool_config,
+    logos_dir,
+    session=None,
+    timeout=DEFAULT_DOWNLOAD_TIMEOUT,
+    cache=None,
+    refresh=False,
+    replace_placeholder=False,
+    config_editor=None,
+):
+    """
+    Attempt to download an SVG logo for the given tool
+    Test various URLs (using the tool name, label or alias) to find a working URL.
+    If all attempts fail, prompt the user for an alternative URL.
+    If the logo already exists at the output path, do not download it again.
+    """
+
+    if fetch_svg(
+        tool_config=tool_config, logos_dir=logos_dir, session=session, timeout=timeout, cache=cache, replace_placeholder=replace_placeholder
+    ):
+        return
+
     # If we reach this point, the logo was not found on VectorLogoZone using the name or alias
-    handle_logo_not_found(config_filepath=config_filepath, tool_config=tool_config, tool_name=tool_name, logos_dir=logos_dir)
+    handle_logo_not_found(
+        config_filepath=config_filepath,
+        tool_config=tool_config,
+        tool_name=tool_config.get("name"),
+        logos_dir=logos_dir,
+        session=session,
+        timeout=timeout,
+        cache=cache,
+        replace_placeholder=replace_placeholder,
+        config_editor=config_editor,
+    )
 
 
 def read_tools_from_config(config_filepath):
     logging.info(f"Reading configuration from file: {config_filepath}")
     config = utils.read_config(config_filepath)
 
-    ecosystem = config.get("ecosystem", {})
-    tools = []
-
-    central_tool = ecosystem.get("centralTool", {})
-    if central_tool.get("name"):
-        tools.append(central_tool)
-
-    for group in ecosystem.get("groups", []):
-        for tool in group.get("tools", []):
-            tools.append(tool)
-
-    return tools
+    return utils.list_tools(config)
 
 
 def get_latest_config_for_tool(config_filepath, tool_name):
@@ -141,14 +333,224 @@ def get_latest_config_for_tool(config_filepath, tool_name):
     return None
 
 
-def download_all_logos(config_filepath, logos_dir):
+def download_all_logos(
+    config_filepath,
+    logos_dir,
+    concurrency=DEFAULT_DOWNLOAD_CONCURRENCY,
+    timeout=DEFAULT_DOWNLOAD_TIMEOUT,
+    cache_dir=None,
+    refresh=False,
+    profiler=None,
+    interactive=None,
+    missing_logos_report=None,
+):
     """
     Attempt to download an SVG logo for all tools in the ecosystem.
+    Logos are fetched in parallel over a shared connection pool; tools for which no logo could be found are collected
+    and handled interactively one at a time once every parallel download has finished, or given placeholder logos and
+    listed in a report if the run isn't interactive (see download_tool_logos).
     :param config: The ecosystem configuration.
     :param logos_dir: The directory where logos should be saved (should already exist)
+    :param concurrency: Maximum number of logos to download at the same time.
+    :param timeout: Timeout in seconds for each download request.
+    :param cache_dir: Directory for the persistent logo cache (default: the user cache directory).
+    :param refresh: Revalidate existing and cached logos with conditional GETs instead of trusting them.
+    :param profiler: Optional profiling.Profiler to record the download stage and each tool's download in.
+    :param interactive: Prompt for tools whose logo could not be found (default: only if stdin is a terminal).
+    :param missing_logos_report: Path of the missing logos report for non-interactive runs (default: in logos_dir).
     """
 
     tools = read_tools_from_config(config_filepath)
 
-    for tool_config in tools:
-        download_svg(config_filepath=config_filepath, tool_config=tool_config, logos_dir=logos_dir)
+    download_tool_logos(
+        tool_sources=[(config_filepath, tool_config) for tool_config in tools],
+        logos_dir=logos_dir,
+        concurrency=concurrency,
+        timeout=timeout,
+        cache_dir=cache_dir,
+        refresh=refresh,
+        profiler=profiler,
+        interactive=interactive,
+        missing_logos_report=missing_logos_report,
+    )
+
+
+def has_real_logo(logos_dir, tool_name_slug):
+    """
+    :return: True if the tool has a logo which isn't a placeholder, loose or packed.
+    """
+    logo_store = logo_pack.LogoStore(logos_dir)
+    try:
+        return not missing_logos.is_placeholder_svg(logo_store.read(tool_name_slug))
+    except OSError:
+        return False
+    finally:
+        logo_store.close()
+
+
+def download_tool_logos(
+    tool_sources,
+    logos_dir,
+    concurrency=DEFAULT_DOWNLOAD_CONCURRENCY,
+    timeout=DEFAULT_DOWNLOAD_TIMEOUT,
+    cache_dir=None,
+    refresh=False,
+    profiler=None,
+    interactive=None,
+    missing_logos_report=None,
+):
+    """
+    Attempt to download an SVG logo for each of the given tools, which may come from several config files.
+    Each logo is only downloaded once, even if the same tool appears in more than one config.
+
+    Tools whose logo could not be found are prompted for one at a time if the run is interactive. Otherwise, so a batch
+    or CI run never blocks on stdin, each is given a placeholder badge showing its label, and listed in the missing
+    logos report to be resolved later with the `resolve` subcommand. Tools in the report are retried on every run (e.g.
+    after an svgURL is added to the config), and removed from it once a real logo is downloaded.
+    :param tool_sources: List of (config_filepath, tool_config) tuples; the config file is updated if the user supplies
+        an alias or svgURL for a tool whose logo could not be found.
+    :param logos_dir: The directory where logos should be saved (should already exist)
+    :param concurrency: Maximum number of logos to download at the same time.
+    :param timeout: Timeout in seconds for each download request.
+    :param cache_dir: Directory for the persistent logo cache (default: the user cache directory).
+    :param refresh: Revalidate existing and cached logos with conditional GETs instead of trusting them.
+    :param profiler: Optional profiling.Profiler to record the download stage and each tool's download in.
+    :param interactive: Prompt for tools whose logo could not be found (default: only if stdin is a terminal).
+    :param missing_logos_report: Path of the missing logos report (default: missing_logos.json in logos_dir).
+    """
+    if profiler is None:
+        profiler = profiling.null_profiler
+    if interactive is None:
+        interactive = sys.stdin is not None and sys.stdin.isatty()
+
+    # Logos are stored by tool name slug, so that is what makes two tools share a logo
+    unique_tool_sources = {}
+    for config_filepath, tool_config in tool_sources:
+        unique_tool_sources.setdefault(utils.slugify(tool_config.get("name")), (config_filepath, tool_config))
+    tool_sources = list(unique_tool_sources.values())
+
+    concurrency = max(1, int(concurrency))
+    cache = LogoCache(cache_dir=cache_dir)
+    logo_store = logo_pack.LogoStore(logos_dir)
+    report = missing_logos.MissingLogoReport(missing_logos_report or missing_logos.default_report_path(logos_dir))
+    # Aliases and svgURLs supplied for tools are written back to each config file once, after every tool is handled
+    config_editor = ConfigEditor()
+
+    def fetch_tool_svg(source):
+        tool_name_slug = utils.slugify(source[1].get("name"))
+        with profiler.stage("download_logo", tool=tool_name_slug):
+            return fetch_svg(
+                source[1],
+                logos_dir,
+                session=session,
+                timeout=timeout,
+                cache=cache,
+                refresh=refresh,
+                logo_store=logo_store,
+                replace_placeholder=tool_name_slug in report,
+            )
+
+    with profiler.stage("download_logos", tools=len(tool_sources)):
+        logging.info(f"Downloading logos for {len(tool_sources)} tools with concurrency {concurrency}")
+        with create_session(pool_size=concurrency) as session:
+            try:
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    results = list(executor.map(profiler.wrap(fetch_tool_svg), tool_sources))
+                cache.save()
+
+                sources_not_found = []
+                for (config_filepath, tool_config), found in zip(tool_sources, results):
+                    if found:
+                        report.remove(utils.slugify(tool_config.get("name")))
+                    else:
+                        sources_not_found.append((config_filepath, tool_config))
+                if sources_not_found:
+                    tool_names = [tool_config.get("name") for _, tool_config in sources_not_found]
+                    logging.warning(f"Could not find logos for {len(sources_not_found)} tools: {tool_names}")
+
+                for config_filepath, tool_config in sources_not_found:
+                    tool_name_slug = utils.slugify(tool_config.get("name"))
+                    if interactive:
+                        handle_logo_not_found(
+                            config_filepath=config_filepath,
+                            tool_config=tool_config,
+                            tool_name=tool_config.get("name"),
+                            logos_dir=logos_dir,
+                            session=session,
+                            timeout=timeout,
+                            cache=cache,
+                            replace_placeholder=tool_name_slug in report,
+                            config_editor=config_editor,
+                        )
+                        if has_real_logo(logos_dir, tool_name_slug):
+                            report.remove(tool_name_slug)
+                    else:
+                        urls_tried = [tool_config["svgURL"]] if tool_config.get("svgURL") else []
+                        report.add(config_filepath, tool_config, urls_tried + generate_vectorlogozone_urls(tool_config))
+                        missing_logos.write_placeholder_logo(logos_dir, tool_config)
+
+                if not interactive and sources_not_found:
+                    logging.warning(
+                        f"Using placeholder logos for {len(sources_not_found)} tools, listed in {report.path}. "
+                        "Run `logo-diagram-generator resolve` to find their logos."
+                    )
+            finally:
+                config_editor.flush()
+                cache.save()
+                report.save()
+                logo_store.close()
+
+
+def resolve_missing_logos(logos_dir, missing_logos_report=None, timeout=DEFAULT_DOWNLOAD_TIMEOUT, cache_dir=None):
+    """
+    Walks through every tool in the missing logos report, prompting for each one's logo as an interactive run would,
+    in a single pass. Tools which now have a real logo (resolved here, or since the report was written) are removed from
+    the report; any which are still missing keep their placeholder and stay in it.
+    :param logos_dir: The directory where logos are saved.
+    :param missing_logos_report: Path of the missing logos report (default: missing_logos.json in logos_dir).
+    :return: The number of tools still missing a logo.
+    """
+    report = missing_logos.MissingLogoReport(missing_logos_report or missing_logos.default_report_path(logos_dir))
+    if not report.tools:
+        logging.info(f"No missing logos to resolve in {report.path}")
+        return 0
+
+    logging.info(f"Resolving {len(report)} missing logos from {report.path}")
+    cache = LogoCache(cache_dir=cache_dir)
+    config_editor = ConfigEditor()
+    with create_session() as session:
+        try:
+            for tool_name_slug, entry in list(report.tools.items()):
+                if has_real_logo(logos_dir, tool_name_slug):
+                    logging.info(f"{entry['name']} already has a logo")
+                    report.remove(tool_name_slug)
+                    continue
+
+                tool_config = config_editor.get_tool(entry["config"], entry["name"])
+                if tool_config is None:
+                    logging.info(f"{entry['name']} is no longer in {entry['config']}, removing it from the report")
+                    report.remove(tool_name_slug)
+                    continue
+
+                download_svg(
+                    config_filepath=entry["config"],
+                    tool_config=tool_config,
+                    logos_dir=logos_dir,
+                    session=session,
+                    timeout=timeout,
+                    cache=cache,
+                    replace_placeholder=True,
+                    config_editor=config_editor,
+                )
+                if has_real_logo(logos_dir, tool_name_slug):
+                    report.remove(tool_name_slug)
+                else:
+                    logging.warning(f"Still no logo for {entry['name']}, keeping its placeholder")
+        finally:
+            config_editor.flush()
+            cache.save()
+            report.save()
+
+    if report.tools:
+        logging.warning(f"{len(report)} tools are still missing logos: {[entry['name'] for entry in report.tools.values()]}")
+    return len(report)
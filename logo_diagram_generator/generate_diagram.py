@@ -1,56 +1,157 @@
+import io
 import os
-import re
+import json
+import math
 import logging
-import shutil
 import xml.dom.minidom
-import graphviz
-import cairosvg
 
-from logo_diagram_generator import utils
-
-
-def generate_text_only_svg_diagram_from_config(config, diagram_name, output_svg_path):
-    logging.info("Generating text-only SVG diagram from config")
+from logo_diagram_generator import build_manifest
+from logo_diagram_generator import layout_cache as layout_cache_module
+from logo_diagram_generator import logo_fragments, logo_index, logo_pack, profiling, radial_layout
+from logo_diagram_generator import rasterize, stream_embed, svg_optimizer, utils
+from logo_diagram_generator.constants import DEFAULT_EMBED_ENGINE, EMBED_ENGINES
+
+# Tool and style keys which only affect logo downloading or how each logo is embedded, never the text-only diagram
+LOGO_ONLY_TOOL_KEYS = ("alias", "svgURL", "scale", "positionAdjustX", "positionAdjustY", "strokeColor", "strokeWidth")
+LOGO_ONLY_STYLE_KEYS = ("defaultLogoScale", "defaultLogoStrokeColor", "defaultLogoStrokeWidth")
+
+
+def text_diagram_config(config):
+    """
+    Returns a copy of the config without any keys that only affect logos, i.e. just the inputs of the text-only diagram.
+    Two configs with equal text diagram configs render the same text-only diagram, so only need their logos re-embedded.
+    """
+    ecosystem = config["ecosystem"]
+    logo_only_tool_keys, logo_only_style_keys = LOGO_ONLY_TOOL_KEYS, LOGO_ONLY_STYLE_KEYS
+    if ecosystem.get("style", {}).get("diagramEngine") == radial_layout.ENGINE_NAME or sizes_nodes_to_logos(config):
+        # The radial-native layout (or sizeNodesToLogos, for Graphviz layouts) sizes each tool's node to its logo, so
+        # logo scales are inputs of the text-only diagram
+        logo_only_tool_keys = tuple(k for k in LOGO_ONLY_TOOL_KEYS if k not in radial_layout.LAYOUT_TOOL_KEYS)
+        logo_only_style_keys = tuple(k for k in LOGO_ONLY_STYLE_KEYS if k not in radial_layout.LAYOUT_STYLE_KEYS)
+
+    text_ecosystem = dict(ecosystem)
+    text_ecosystem["style"] = {k: v for k, v in ecosystem.get("style", {}).items() if k not in logo_only_style_keys}
+    if "centralTool" in ecosystem:
+        text_ecosystem["centralTool"] = {k: v for k, v in ecosystem["centralTool"].items() if k not in logo_only_tool_keys}
+    text_ecosystem["groups"] = [
+        dict(group, tools=[{k: v for k, v in tool.items() if k not in logo_only_tool_keys} for tool in group.get("tools", [])])
+        for group in ecosystem.get("groups", [])
+    ]
+    return dict(config, ecosystem=text_ecosystem)
+
+
+def layout_attributes(ecosystem_style):
+    """
+    :return: The graph attributes which control how Graphviz lays out the diagram (or a group's graph, for a sharded
+        layout), from the ecosystem style.
+    """
+    return {
+        "overlap": str(ecosystem_style.get("diagramOverlap", "false")),
+        "overlap_scaling": str(ecosystem_style.get("diagramOverlapScaling", "1.0")),
+        "overlap_shrink": str(ecosystem_style.get("diagramOverlapShrink", "true")),
+        "rankdir": ecosystem_style.get("diagramRankdir", "TB"),
+    }
+
+
+def group_label_attributes(ecosystem_style):
+    """
+    :return: The Graphviz attributes of every group's label node, from the ecosystem style.
+    """
+    return {
+        "shape": ecosystem_style.get("groupLabelShape", "box"),
+        "style": ecosystem_style.get("groupLabelStyle", "rounded"),
+        "fontsize": str(ecosystem_style.get("groupLabelFontsize", "25")),
+        "fontname": ecosystem_style.get("groupLabelFontname", "Helvetica"),
+        "fontcolor": ecosystem_style.get("groupLabelFontcolor", "#333333"),
+        "margin": str(ecosystem_style.get("groupLabelMargin", "0.2")),
+    }
+
+
+def sizes_nodes_to_logos(config):
+    return str(config["ecosystem"].get("style", {}).get("sizeNodesToLogos", "false")).lower() == "true"
+
+
+def logo_node_size_attributes(tool_config, ecosystem_style, logo_sizes):
+    """
+    :param logo_sizes: A dict of tool name slug -> (width, height) each logo is drawn at before scaling, from
+        logo_index.fitted_logo_sizes, or None to leave nodes sized to their labels.
+    :return: Graphviz attributes giving a tool's node at least the size of its logo at the tool's scale, if known.
+    """
+    logo_size = logo_sizes.get(utils.slugify(tool_config.get("name"))) if logo_sizes is not None else None
+    if logo_size is None:
+        return {}
+    logo_scale = float(logo_fragments.resolve_logo_style(tool_config, ecosystem_style)[0])
+    return {
+        "width": f"{logo_size[0] * logo_scale / radial_layout.POINTS_PER_INCH:.3f}",
+        "height": f"{logo_size[1] * logo_scale / radial_layout.POINTS_PER_INCH:.3f}",
+    }
+
+
+def add_group_nodes(graph, group, label_node_name, group_color, label_attributes, ecosystem_style=None, logo_sizes=None):
+    """
+    Adds a group's label node, its tools, and an edge from the label to each tool to a graph: the group's cluster in
+    the whole diagram, or the group's own graph for a sharded layout.
+    :param logo_sizes: Optional dict of logo sizes to size tool nodes to, see logo_node_size_attributes.
+    """
+    group_label = group["category"]
+    if len(group_label) > 15:
+        group_label = group_label.replace(" ", "\n", 1)
+
+    graph.node(label_node_name, id=label_node_name, label=group_label, **label_attributes, color=group_color)
+
+    for tool in group["tools"]:
+        tool_label = tool.get("label", tool["name"])
+        graph.node(
+            tool_label,
+            id=tool_label,
+            label=tool_label,
+            shape="ellipse",
+            margin="0.3",
+            color=group_color,
+            **logo_node_size_attributes(tool, ecosystem_style or {}, logo_sizes),
+        )
+        graph.edge(
+            label_node_name,
+            tool_label,
+            color=group_color,
+            id=f"{label_node_name}-{tool_label}-edge",
+        )
+
+
+def build_diagram_graph(config, diagram_name, logo_sizes=None):
+    """
+    Builds the Graphviz graph for the diagram: the central tool, a label node per group, and the tools in each group.
+    :param logo_sizes: Optional dict of logo sizes to size tool nodes to, see logo_node_size_attributes.
+    :return: Tuple of (graphviz.Digraph, layout engine name).
+    """
+    # Heavy dependencies are imported by the stage which uses them, keeping CLI startup and skipped stages fast
+    import graphviz
 
     ecosystem_style = config["ecosystem"].get("style", {})
 
     diagram_engine = ecosystem_style.get("diagramEngine", "neato")
-    diagram_overlap = str(ecosystem_style.get("diagramOverlap", "false"))
-    diagram_overlap_scaling = str(ecosystem_style.get("diagramOverlapScaling", "1.0"))
-    diagram_overlap_shrink = str(ecosystem_style.get("diagramOverlapShrink", "true"))
+    diagram_layout_attributes = layout_attributes(ecosystem_style)
     diagram_padding = str(ecosystem_style.get("diagramPadding", "0.5"))
-    diagram_rankdir = ecosystem_style.get("diagramRankdir", "TB")
     diagram_background_color = ecosystem_style.get("diagramBackgroundColor", "#ffffff")
 
-    group_label_shape = ecosystem_style.get("groupLabelShape", "box")
-    group_label_style = ecosystem_style.get("groupLabelStyle", "rounded")
-    group_label_fontname = ecosystem_style.get("groupLabelFontname", "Helvetica")
-    group_label_fontcolor = ecosystem_style.get("groupLabelFontcolor", "#333333")
-    group_label_fontsize = str(ecosystem_style.get("groupLabelFontsize", "25"))
-    group_label_margin = str(ecosystem_style.get("groupLabelMargin", "0.2"))
+    label_attributes = group_label_attributes(ecosystem_style)
 
     color_palette = ecosystem_style.get("colorPalette", utils.visually_distinct_colors)
 
     dot = graphviz.Digraph(engine=diagram_engine, format="svg")
     dot.attr(id=diagram_name)
-    dot.attr(overlap=diagram_overlap)
-    dot.attr(overlap_scaling=diagram_overlap_scaling)
-    dot.attr(overlap_shrink=diagram_overlap_shrink)
-    dot.attr(rankdir=diagram_rankdir)
+    for attribute_name, attribute_value in diagram_layout_attributes.items():
+        dot.attr(**{attribute_name: attribute_value})
     dot.attr(pad=diagram_padding)
     dot.attr(bgcolor=diagram_background_color)
 
     logging.info(
-        f"Diagram level attributes set: id={diagram_name}, engine={diagram_engine}, overlap={diagram_overlap}, "
-        f"overlap_scaling={diagram_overlap_scaling}, overlap_shrink={diagram_overlap_shrink}, "
-        f"rankdir={diagram_rankdir}, padding={diagram_padding}, background_color={diagram_background_color}, "
+        f"Diagram level attributes set: id={diagram_name}, engine={diagram_engine}, overlap={diagram_layout_attributes['overlap']}, "
+        f"overlap_scaling={diagram_layout_attributes['overlap_scaling']}, overlap_shrink={diagram_layout_attributes['overlap_shrink']}, "
+        f"rankdir={diagram_layout_attributes['rankdir']}, padding={diagram_padding}, background_color={diagram_background_color}, "
     )
 
-    logging.info(
-        f"Group attributes set: group_label_shape={group_label_shape}, group_label_style={group_label_style}, "
-        f"group_label_fontname={group_label_fontname}, group_label_fontcolor={group_label_fontcolor}, "
-        f"group_label_fontsize={group_label_fontsize}, group_label_margin={group_label_margin}"
-    )
+    logging.info("Group attributes set: " + ", ".join(f"group_label_{name}={value}" for name, value in label_attributes.items()))
 
     logging.info("Color palette for groups: ")
     logging.info(color_palette)
@@ -68,6 +169,7 @@ def generate_text_only_svg_diagram_from_config(config, diagram_name, output_svg_
         label=central_tool_label,
         shape="ellipse",
         margin=central_tool_margin,
+        **logo_node_size_attributes(central_tool, ecosystem_style, logo_sizes),
     )
 
     for i, group in enumerate(config["ecosystem"]["groups"], start=0):
@@ -75,9 +177,15 @@ def generate_text_only_svg_diagram_from_config(config, diagram_name, output_svg_
         group_color = group.get("color", color_palette[i % len(color_palette)])
         logging.debug(f"Processing group: {group['category']} with color {group_color}")
 
-        group_label = group["category"]
-        if len(group_label) > 15:
-            group_label = group_label.replace(" ", "\n", 1)
+        label_node_name = f"label_{group_slug}"
+        # Added to the top level graph ahead of the group's cluster, which is only added once its block ends
+        dot.edge(
+            central_tool_name,
+            label_node_name,
+            arrowsize="0.0",
+            color=group_color,
+            id=f"{central_tool_name}-{label_node_name}-edge",
+        )
 
         group_cluster_name = f"cluster_{group_slug}"
         with dot.subgraph(name=group_cluster_name) as c:
@@ -86,51 +194,219 @@ def generate_text_only_svg_diagram_from_config(config, diagram_name, output_svg_
             # Comment this out to see the cluster boundaries if debugging layout issues
             c.attr(style="invis")
 
-            label_node_name = f"label_{group_slug}"
-            c.node(
-                label_node_name,
-                id=label_node_name,
-                label=group_label,
-                shape=group_label_shape,
-                style=group_label_style,
-                fontsize=group_label_fontsize,
-                fontname=group_label_fontname,
-                fontcolor=group_label_fontcolor,
-                margin=group_label_margin,
-                color=group_color,
-            )
+            add_group_nodes(c, group, label_node_name, group_color, label_attributes, ecosystem_style, logo_sizes)
 
-            dot.edge(
-                central_tool_name,
-                label_node_name,
-                arrowsize="0.0",
-                color=group_color,
-                id=f"{central_tool_name}-{label_node_name}-edge",
-            )
+    return dot, diagram_engine
 
-            for tool in group["tools"]:
-                tool_label = tool.get("label", tool["name"])
-                c.node(
-                    tool_label,
-                    id=tool_label,
-                    label=tool_label,
-                    shape="ellipse",
-                    margin="0.3",
-                    color=group_color,
-                )
-                c.edge(
-                    label_node_name,
-                    tool_label,
-                    color=group_color,
-                    id=f"{label_node_name}-{tool_label}-edge",
-                )
+
+def build_group_graph(config, group_index, logo_sizes=None):
+    """
+    Builds the Graphviz graph of a single group for a sharded layout: the group's label node and tools, with the
+    diagram's layout attributes, but without the central tool.
+    :param logo_sizes: Optional dict of logo sizes to size tool nodes to, see logo_node_size_attributes.
+    :return: Tuple of (graphviz.Digraph, layout engine name).
+    """
+    import graphviz
+
+    ecosystem_style = config["ecosystem"].get("style", {})
+    diagram_engine = ecosystem_style.get("diagramEngine", "neato")
+    color_palette = ecosystem_style.get("colorPalette", utils.visually_distinct_colors)
+    group = config["ecosystem"]["groups"][group_index]
+
+    group_dot = graphviz.Digraph(engine=diagram_engine)
+    group_dot.attr(**layout_attributes(ecosystem_style))
+    add_group_nodes(
+        group_dot,
+        group,
+        f"label_{utils.slugify(group['category'])}",
+        group.get("color", color_palette[group_index % len(color_palette)]),
+        group_label_attributes(ecosystem_style),
+        ecosystem_style,
+        logo_sizes,
+    )
+    return group_dot, diagram_engine
+
+
+def compute_layout(dot, diagram_engine):
+    """
+    Runs the Graphviz layout engine over the graph, without rendering it.
+    :return: A JSON-serializable layout dict, holding the graph and cluster bounding boxes and every node position.
+    """
+    logging.info(f"Computing graph layout with engine {diagram_engine}")
+    laid_out_graph = json.loads(dot.pipe(format="json", engine=diagram_engine))
+
+    layout = {"bb": laid_out_graph.get("bb"), "clusters": {}, "nodes": {}}
+    for graph_object in laid_out_graph.get("objects", []):
+        if "pos" in graph_object:
+            layout["nodes"][graph_object["name"]] = graph_object["pos"]
+        elif graph_object.get("bb"):
+            layout["clusters"][graph_object["name"]] = graph_object["bb"]
+    return layout
+
+
+def apply_layout(dot, layout):
+    """
+    Pins every node of the graph at the position from a previously computed layout, so it can be rendered with
+    neato -n2 (no layout, edges routed between the given positions) while using the graph's current styles.
+    """
+    if layout["bb"]:
+        dot.attr(bb=layout["bb"])
+    for cluster_name, cluster_bb in layout["clusters"].items():
+        with dot.subgraph(name=cluster_name) as c:
+            c.attr(bb=cluster_bb)
+    for node_name, node_pos in layout["nodes"].items():
+        dot.node(node_name, pos=node_pos)
+
+
+def cached_layout(dot, diagram_engine, layout_cache):
+    """
+    :return: The layout of the graph from the layout cache, computing and caching it if it isn't cached yet.
+    """
+    # Layouts are cached on everything except colors, so each theme of the same diagram reuses one layout
+    layout_key = layout_cache_module.compute_layout_key(dot.source, diagram_engine)
+    layout = layout_cache.get(layout_key)
+    if layout is None:
+        layout = compute_layout(dot, diagram_engine)
+        layout_cache.put(layout_key, layout)
+    else:
+        logging.info(f"Reusing cached layout {layout_key}, only restyling the diagram")
+    return layout
+
+
+def compose_group_layouts(config, group_layouts):
+    """
+    Places each group's separately computed layout around the central tool, the way the radial-native engine places
+    nodes: each group's bounding box is given a direction in proportion to its size, starting at the top, and is pushed
+    outwards from the central tool until it doesn't overlap the central tool or any group already placed.
+    :param group_layouts: The layout of each group's graph (see build_group_graph), in the order of the config's groups.
+    :return: A layout dict for the whole diagram, like compute_layout's.
+    """
+    central_tool = config["ecosystem"]["centralTool"]
+    central_tool_name = central_tool["name"]
+    central_tool_label = central_tool.get("label", central_tool_name)
+
+    # The central tool's ellipse is sized by Graphviz when the diagram is rendered, so its size is estimated from its
+    # label and margin, as an ellipse through the corners of the label's box
+    central_tool_margin = float(central_tool.get("margin", 0.5)) * radial_layout.POINTS_PER_INCH
+    central_node = radial_layout.Node(
+        central_tool_name,
+        central_tool_label,
+        "central",
+        (len(central_tool_label) * radial_layout.CHARACTER_WIDTH * radial_layout.NODE_FONTSIZE / 2 + central_tool_margin) * math.sqrt(2),
+        (radial_layout.LINE_HEIGHT * radial_layout.NODE_FONTSIZE / 2 + central_tool_margin) * math.sqrt(2),
+        "ellipse",
+        None,
+    )
+
+    group_nodes = []
+    for group, group_layout in zip(config["ecosystem"]["groups"], group_layouts):
+        min_x, min_y, max_x, max_y = (float(value) for value in group_layout["bb"].split(","))
+        group_node = radial_layout.Node(
+            f"cluster_{utils.slugify(group['category'])}", group["category"], "group", (max_x - min_x) / 2, (max_y - min_y) / 2, "box", None
+        )
+        group_nodes.append((group_node, group_layout, (min_x + max_x) / 2, (min_y + max_y) / 2))
+
+    group_radii = [math.hypot(group_node.rx, group_node.ry) for group_node, _, _, _ in group_nodes]
+    grid = radial_layout.SpatialGrid(2 * max(group_radii + [radial_layout.NODE_GAP]) + radial_layout.NODE_GAP)
+    grid.insert(central_node.box(radial_layout.NODE_GAP))
+    central_radius = math.hypot(central_node.rx, central_node.ry)
+
+    nodes = {central_tool_name: (0.0, 0.0)}
+    clusters = {}
+    angle = math.pi / 2
+    for (group_node, group_layout, center_x, center_y), group_radius in zip(group_nodes, group_radii):
+        group_angle = 2 * math.pi * group_radius / sum(group_radii)
+        radial_layout.place_node(grid, group_node, central_radius + radial_layout.NODE_GAP + group_radius, angle - group_angle / 2)
+        angle -= group_angle
+
+        # A tool in more than one group is a single node, placed with the first group it's in
+        offset_x, offset_y = group_node.x - center_x, group_node.y - center_y
+        for node_name, node_pos in group_layout["nodes"].items():
+            x, y = (float(value) for value in node_pos.split(",")[:2])
+            nodes.setdefault(node_name, (x + offset_x, y + offset_y))
+        clusters[group_node.name] = group_node.box()
+
+    # Moved so the diagram's bounding box starts at the origin, like Graphviz's layouts
+    boxes = [central_node.box()] + list(clusters.values())
+    min_x, min_y = min(box[0] for box in boxes), min(box[1] for box in boxes)
+    max_x, max_y = max(box[2] for box in boxes), max(box[3] for box in boxes)
+
+    def format_box(box):
+        return ",".join(radial_layout.format_number(value) for value in (box[0] - min_x, box[1] - min_y, box[2] - min_x, box[3] - min_y))
+
+    return {
+        "bb": format_box((min_x, min_y, max_x, max_y)),
+        "clusters": {cluster_name: format_box(box) for cluster_name, box in clusters.items()},
+        "nodes": {node_name: radial_layout.format_points([(x - min_x, y - min_y)]) for node_name, (x, y) in nodes.items()},
+    }
+
+
+def compute_sharded_layout(config, layout_cache, max_workers=None, logo_sizes=None):
+    """
+    Lays out each group's graph on its own, all at once, then composes them into one layout with compose_group_layouts.
+    Graphviz layout time grows faster than linearly with the number of nodes, so many small layouts are much quicker
+    than one large one, and each runs in its own Graphviz process on its own core. Each group's layout is cached
+    separately, so changing one group only lays out that group again.
+    :param max_workers: Maximum number of groups to lay out at once (default: the CPU count).
+    :param logo_sizes: Optional dict of logo sizes to size tool nodes to, see logo_node_size_attributes.
+    :return: A layout dict for the whole diagram, like compute_layout's.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    group_count = len(config["ecosystem"]["groups"])
+    logging.info(f"Computing sharded layout of {group_count} groups")
+
+    def layout_group(group_index):
+        group_dot, diagram_engine = build_group_graph(config, group_index, logo_sizes)
+        return cached_layout(group_dot, diagram_engine, layout_cache)
+
+    # Threads are enough, as the layouts themselves run in Graphviz subprocesses
+    with ThreadPoolExecutor(max_workers=max_workers or max(min(group_count, os.cpu_count() or 1), 1)) as executor:
+        group_layouts = list(executor.map(layout_group, range(group_count)))
+    return compose_group_layouts(config, group_layouts)
+
+
+def render_text_only_svg(config, diagram_name, layout_cache=None, logo_sizes=None):
+    """
+    Lays out and renders the text-only diagram in memory, without writing any files.
+    :param logo_sizes: Optional dict of tool name slug -> (width, height) each logo is drawn at before scaling, from
+        logo_index.fitted_logo_sizes, to size tool nodes to their actual logos rather than the nominal logo box.
+    :return: The rendered SVG, as bytes.
+    """
+    logging.info("Generating text-only SVG diagram from config")
+
+    if config["ecosystem"].get("style", {}).get("diagramEngine") == radial_layout.ENGINE_NAME:
+        # Laid out and rendered without Graphviz, in linear time, so there's nothing worth caching
+        return radial_layout.render_radial_svg(config, diagram_name, logo_sizes=logo_sizes)
+
+    if layout_cache is None:
+        layout_cache = layout_cache_module.default_layout_cache
+
+    dot, diagram_engine = build_diagram_graph(config, diagram_name, logo_sizes)
+
+    if str(config["ecosystem"].get("style", {}).get("diagramShardedLayout", "false")).lower() == "true":
+        # The composed layout only exists as node positions, so is always rendered pinned with neato -n2
+        layout = compute_sharded_layout(config, layout_cache, logo_sizes=logo_sizes)
+    elif diagram_engine != "neato":
+        # Pinned rendering routes edges the way neato does, so other engines (e.g. dot, fdp, circo) lay out and route
+        # the graph themselves, without the layout cache
+        logging.info(f"Rendering the graph to SVG with engine {diagram_engine}")
+        return dot.pipe(format="svg", engine=diagram_engine)
+    else:
+        layout = cached_layout(dot, diagram_engine, layout_cache)
+
+    apply_layout(dot, layout)
 
     logging.info("Rendering the graph to SVG")
-    dot.render(diagram_name, cleanup=True)
+    return dot.pipe(format="svg", engine="neato", neato_no_op=2)
+
 
-    # Move the file from the default diagram name to the specified output path
-    shutil.move(f"{diagram_name}.svg", output_svg_path)
-    logging.info(f"Diagram moved to {output_svg_path}")
+def generate_text_only_svg_diagram_from_config(config, diagram_name, output_svg_path, layout_cache=None):
+    diagram_svg = render_text_only_svg(config, diagram_name, layout_cache=layout_cache)
+
+    with open(output_svg_path, "wb") as file:
+        file.write(diagram_svg)
+    logging.info(f"Text-only diagram written to {output_svg_path}")
 
 
 def find_svg_element_by_id(element, id):
@@ -147,147 +423,282 @@ def find_svg_element_by_id(element, id):
     return None
 
 
-def embed_logos_in_diagram(diagram_name, diagram_svg_path, output_svg_path, config, logos_dir):
-    logging.info(f"Embedding logos into diagram from {diagram_svg_path}")
+def index_svg_elements_by_id(element):
+    """
+    Builds a mapping of id attribute -> element for the given element and all of its descendants, in a single traversal.
+    Where an id appears more than once, the first element in document order wins, matching find_svg_element_by_id.
+    :param element: The root element to index.
+    :return: A dict of id string to minidom element.
+    """
+    elements_by_id = {}
+    stack = [element]
+    while stack:
+        current = stack.pop()
+        element_id = current.getAttribute("id")
+        if element_id and element_id not in elements_by_id:
+            elements_by_id[element_id] = current
+
+        # Push children in reverse so they are popped (and indexed) in document order
+        stack.extend(child for child in reversed(current.childNodes) if child.nodeType == child.ELEMENT_NODE)
+    return elements_by_id
+
+
+def create_logo_element(diagram_svg_dom, tool_node, tool_config, ecosystem_style, logos_dir, fragment_cache, symbols=None):
+    """
+    Builds the <g> element holding a tool's logo, scaled and positioned over the tool's node in the rendered diagram.
+    :param diagram_svg_dom: The diagram document the element is created in.
+    :param tool_node: The tool's node in the rendered diagram, containing the ellipse the logo is centred on.
+    :param tool_config: The config dict for the tool.
+    :param ecosystem_style: The ecosystem style config, providing the default logo scale and stroke.
+    :param logos_dir: The directory containing each tool's logo SVG, or an open logo_pack.LogoStore for it.
+    :param fragment_cache: LogoFragmentCache of prepared logos.
+    :param symbols: Optional (LogoSymbolTable, <defs> element) pair. If given, the logo is added to the <defs> element
+        as a <symbol> the first time it is used, and the <g> element places it with <use>; otherwise the <g> element
+        holds a complete copy of the logo.
+    :return: The new <g> element, not yet attached to the document.
+    """
+    tool_name = tool_config.get("name")
+    logo_scale, logo_position_adjust_x, logo_position_adjust_y, logo_stroke_color, logo_stroke_width = logo_fragments.resolve_logo_style(
+        tool_config, ecosystem_style
+    )
 
-    default_logo_scale = config["ecosystem"].get("style", {}).get("defaultLogoScale", 1.5)
-    default_logo_stroke_color = config["ecosystem"].get("style", {}).get("defaultLogoStrokeColor", None)
-    default_logo_stroke_width = config["ecosystem"].get("style", {}).get("defaultLogoStrokeWidth", 0)
+    tool_name_slug = utils.slugify(tool_name)
 
-    with open(diagram_svg_path, "r") as file:
-        diagram_svg = file.read()
+    ellipse_node = tool_node.getElementsByTagName("ellipse")[0]
+    cx = ellipse_node.getAttribute("cx")
+    cy = ellipse_node.getAttribute("cy")
+    logging.debug(f"Found ellipse with cx: {cx} and cy: {cy}")
 
-    tools = []
-    central_tool = config["ecosystem"].get("centralTool", {})
-    if central_tool.get("name"):
-        tools.append(central_tool)
+    logging.debug(f"Preparing logo SVG with {tool_name_slug}- prefix to add transform and embed")
+    logo_svg_bytes = logo_pack.open_logo_store(logos_dir).read(tool_name_slug)
 
-    for group in config["ecosystem"].get("groups", []):
-        for tool in group.get("tools", []):
-            tools.append(tool)
+    transform_attr = logo_fragments.logo_transform(cx, cy, logo_scale, logo_position_adjust_x, logo_position_adjust_y)
 
-    for tool_config in tools:
-        tool_name = tool_config.get("name")
-        tool_label = tool_config.get("label", tool_name)
+    # Create a new <g> element for grouping and applying the transform
+    logo_parent_g_element_id = f"{tool_name_slug}-logo-parent"
+    logo_parent_g_element = diagram_svg_dom.createElement("g")
+    logo_parent_g_element.setAttribute("id", logo_parent_g_element_id)
+    logo_parent_g_element.setAttribute("transform", transform_attr)
 
-        logo_scale = tool_config.get("scale", default_logo_scale)
-        logo_position_adjust_x = tool_config.get("positionAdjustX", 0)
-        logo_position_adjust_y = tool_config.get("positionAdjustY", 0)
+    if symbols is None:
+        logo_prefix, new_logo = tool_name_slug, True
+    else:
+        symbol_table, defs_element = symbols
+        logo_prefix, new_logo = symbol_table.get_symbol(tool_name_slug, logo_svg_bytes, logo_stroke_color, logo_stroke_width)
+
+    if new_logo:
+        # The namespaced, parsed logo is shared via the cache, so take a copy owned by this diagram before modifying it
+        cached_logo_node = fragment_cache.get_logo_node(logo_svg_bytes, logo_prefix)
+        logo_node = diagram_svg_dom.importNode(cached_logo_node, True)
+
+        if logo_fragments.has_stroke(logo_stroke_color, logo_stroke_width):
+            logging.debug(f"Adding stroke to logo with color {logo_stroke_color} and width {logo_stroke_width}")
+            logo_fragments.apply_stroke(logo_node, logo_stroke_color, logo_stroke_width)
+
+    if symbols is None:
+        # Append the logo_node to the newly created <g> element
+        logo_parent_g_element.appendChild(logo_node)
+    else:
+        if new_logo:
+            defs_element.appendChild(logo_fragments.create_logo_symbol(diagram_svg_dom, logo_node))
+        logo_parent_g_element.appendChild(logo_fragments.create_logo_use(diagram_svg_dom, logo_prefix))
+    return logo_parent_g_element
+
+
+def embed_logos_in_dom(diagram_name, diagram_svg_dom, config, logos_dir, fragment_cache=None, profiler=None, use_symbols=True):
+    """
+    Replaces the node for each tool in a parsed diagram document with that tool's logo, modifying it in place.
+    Each distinct logo is added once as a <symbol> in a <defs> element and placed over every tool using it with <use>,
+    unless use_symbols is False, in which case every tool gets a complete copy of its logo (as watch mode needs, to
+    replace single logos in place).
+    :param diagram_name: The diagram name, which is the ID of the top level graph element in the SVG.
+    :param diagram_svg_dom: The parsed text-only diagram document.
+    :param config: The ecosystem configuration.
+    :param logos_dir: The directory containing each tool's logo SVG (loose or in its pack), or an open
+        logo_pack.LogoStore for it.
+    :param fragment_cache: Optional LogoFragmentCache of prepared logos (default: shared process-wide cache).
+    :param profiler: Optional profiling.Profiler to record each tool's embedding in.
+    :return: A dict of tool label -> (removed tool node, embedded logo <g> element), for updating single logos later.
+    """
+    logging.info(f"Embedding logos into diagram {diagram_name}")
+
+    if fragment_cache is None:
+        fragment_cache = logo_fragments.default_fragment_cache
+    if profiler is None:
+        profiler = profiling.null_profiler
 
-        logo_stroke_color = tool_config.get("strokeColor", default_logo_stroke_color)
-        logo_stroke_width = tool_config.get("strokeWidth", default_logo_stroke_width)
+    ecosystem_style = config["ecosystem"].get("style", {})
+    logo_store = logo_pack.open_logo_store(logos_dir)
 
-        tool_name_slug = utils.slugify(tool_name)
-        logo_svg_path = os.path.join(logos_dir, f"{tool_name_slug}.svg")
+    # Index every element by ID in one traversal, so each tool lookup below is a dict access
+    diagram_elements_by_id = index_svg_elements_by_id(diagram_svg_dom.documentElement)
+    diagram_graph_node = diagram_elements_by_id.get(diagram_name)
 
-        # Parse the diagram SVG content to find the node with the right ID for this tool label
-        diagram_svg_dom = xml.dom.minidom.parseString(diagram_svg)
-        tool_node = find_svg_element_by_id(diagram_svg_dom.documentElement, tool_label)
-        diagram_graph_node = find_svg_element_by_id(diagram_svg_dom.documentElement, diagram_name)
+    symbols = (logo_fragments.LogoSymbolTable(), diagram_svg_dom.createElement("defs")) if use_symbols else None
+    logo_elements = []
+    embedded_logos = {}
+    for tool_config in utils.list_tools(config):
+        tool_name = tool_config.get("name")
+        tool_label = tool_config.get("label", tool_name)
+
+        # Nodes are removed from the index once replaced, so a repeated label is reported as missing just like before
+        tool_node = diagram_elements_by_id.pop(tool_label, None)
 
         if tool_node is not None:
             logging.info(f"Found node in diagram for tool: {tool_label}, processing and embedding logo SVG")
+            with profiler.stage("embed_logo", tool=utils.slugify(tool_name)):
+                logo_parent_g_element = create_logo_element(
+                    diagram_svg_dom, tool_node, tool_config, ecosystem_style, logo_store, fragment_cache, symbols=symbols
+                )
 
-            ellipse_node = tool_node.getElementsByTagName("ellipse")[0]
-            cx = ellipse_node.getAttribute("cx")
-            cy = ellipse_node.getAttribute("cy")
-            logging.debug(f"Found ellipse with cx: {cx} and cy: {cy}")
-
-            logging.debug(f"Parsing logo SVG content to add transform and embed")
-            with open(logo_svg_path, "r") as file:
-                logo_svg_content = file.read()
-
-            logging.debug(f"Performing find/replace to add {tool_name_slug}- prefix to generic classes, IDs, and hrefs")
-            class_search_1 = re.search(r'class="st\d+"', logo_svg_content)
-            if class_search_1:
-                logging.debug(f"Adding {tool_name_slug}- prefix to generic class {class_search_1.group()}")
-                logo_svg_content = re.sub(r"(st\d+)", f"{tool_name_slug}-\\1", logo_svg_content)
-
-            class_search_2 = re.search(r'class="cls-\d+"', logo_svg_content)
-            if class_search_2:
-                logging.debug(f"Adding {tool_name_slug}- prefix to generic class {class_search_2.group()}")
-                logo_svg_content = re.sub(r"(cls-\d+)", f"{tool_name_slug}-\\1", logo_svg_content)
-
-            id_search = re.findall(r'id="([^"]+)"', logo_svg_content)
-            href_search = re.findall(r'xlink:href="#([^"]+)"', logo_svg_content)
-
-            for id_match in id_search:
-                logging.debug(f"Adding {tool_name_slug}- prefix to ID {id_match}")
-                logo_svg_content = re.sub(f'id="{id_match}"', f'id="{tool_name_slug}-{id_match}"', logo_svg_content)
-
-            for href_match in href_search:
-                logging.debug(f"Adding {tool_name_slug}- prefix to href #{href_match}")
-                logo_svg_content = re.sub(f'xlink:href="#{href_match}"', f'xlink:href="#{tool_name_slug}-{href_match}"', logo_svg_content)
-
-            css_url_search = re.findall(r"url\(#([^)]+)\)", logo_svg_content)
-            for css_url_match in css_url_search:
-                logging.debug(f"Adding {tool_name_slug}- prefix to CSS URL reference #{css_url_match}")
-                logo_svg_content = re.sub(f"url\(#{css_url_match}\)", f"url(#{tool_name_slug}-{css_url_match})", logo_svg_content)
-
-            logo_svg_dom = xml.dom.minidom.parseString(logo_svg_content)
-            logo_node = logo_svg_dom.documentElement
-
-            logo_orig_width = 120
-            logo_orig_height = 60
-
-            logo_scaled_width = logo_orig_width * logo_scale
-            logo_scaled_height = logo_orig_height * logo_scale
-
-            transform_x = float(cx) - (logo_scaled_width / 2) + logo_position_adjust_x
-            transform_y = float(cy) - (logo_scaled_height / 2) + logo_position_adjust_y
-            logging.debug(f"Translating logo to the position ({transform_x}, {transform_y})")
-            transform_attr = f"translate({transform_x}, {transform_y}) scale({logo_scale})"
-
-            # Create a new <g> element for grouping and applying the transform
-            logo_parent_g_element_id = f"{tool_name_slug}-logo-parent"
-            logo_parent_g_element = diagram_svg_dom.createElement("g")
-            logo_parent_g_element.setAttribute("id", logo_parent_g_element_id)
-            logo_parent_g_element.setAttribute("transform", transform_attr)
-
-            logo_node_id = f"{tool_name_slug}-logo"
-            logo_node.setAttribute("id", logo_node_id)
-            logo_node.setAttribute("width", str(logo_orig_width))
-            logo_node.setAttribute("height", str(logo_orig_height))
-
-            if logo_stroke_color is not None and float(logo_stroke_width) > 0:
-                logging.debug(f"Adding stroke to logo with color {logo_stroke_color} and width {logo_stroke_width}")
-                
-                # List of SVG shape tags to add strokes to
-                shape_tags = ["path", "rect", "circle", "ellipse", "line", "polyline", "polygon"]
-
-                for tag in shape_tags:
-                    elements = logo_svg_dom.getElementsByTagName(tag)
-                    for element in elements:
-                        element.setAttribute("stroke", logo_stroke_color)
-                        element.setAttribute("stroke-width", str(logo_stroke_width))
-
-            # Append the logo_node to the newly created <g> element
-            logo_parent_g_element.appendChild(logo_node)
-
-            # Remove the tool node completely and insert the logo node at the end of the diagram documentElement
+            # Remove the tool node completely, the logo is inserted at the end of the diagram documentElement below
             tool_node.parentNode.removeChild(tool_node)
-            diagram_graph_node.appendChild(logo_parent_g_element)
-
-            # Update the diagram SVG with the modified DOM
-            diagram_svg = diagram_svg_dom.toxml()
+            logo_elements.append(logo_parent_g_element)
+            embedded_logos[tool_label] = (tool_node, logo_parent_g_element)
         else:
             logging.warning(f"No node found in diagram for tool: {tool_name}")
 
-    with open(output_svg_path, "w") as file:
-        file.write(diagram_svg)
+    # The symbols are defined ahead of every logo which uses them
+    if symbols is not None and symbols[1].hasChildNodes():
+        diagram_graph_node.appendChild(symbols[1])
+    for logo_parent_g_element in logo_elements:
+        diagram_graph_node.appendChild(logo_parent_g_element)
 
     logging.info("Logos embedded into diagram")
+    return embedded_logos
+
+
+def embed_logos_in_svg(diagram_name, diagram_svg, config, logos_dir, fragment_cache=None, profiler=None):
+    """
+    Replaces the node for each tool in a rendered diagram with that tool's logo.
+    :param diagram_svg: The rendered text-only diagram SVG, as bytes or a string.
+    :return: The diagram SVG with embedded logos, as a string.
+    """
+    # Parse the diagram once, graft every logo into it, then serialize it once
+    diagram_svg_dom = xml.dom.minidom.parseString(diagram_svg)
+    embed_logos_in_dom(diagram_name, diagram_svg_dom, config, logos_dir, fragment_cache=fragment_cache, profiler=profiler)
+    return diagram_svg_dom.toxml()
+
+
+def embed_logos_with_engine(
+    diagram_name, diagram_svg, config, logos_dir, engine=DEFAULT_EMBED_ENGINE, fragment_cache=None, symbol_cache=None, profiler=None
+):
+    """
+    Replaces the node for each tool in a rendered diagram with that tool's logo, using either embedding engine.
+    :param diagram_svg: The rendered text-only diagram SVG, as bytes.
+    :param engine: One of EMBED_ENGINES.
+    :param fragment_cache: Optional LogoFragmentCache of prepared logos, for the dom engine.
+    :param symbol_cache: Optional stream_embed.LogoSymbolCache of prepared logos, for the stream engine.
+    :return: The diagram SVG with embedded logos, as bytes.
+    """
+    if engine == "stream":
+        output_svg_file = io.BytesIO()
+        stream_embed.embed_logos_streaming(
+            diagram_name, io.BytesIO(diagram_svg), output_svg_file, config, logos_dir, profiler=profiler, symbol_cache=symbol_cache
+        )
+        return output_svg_file.getvalue()
+    output_svg = embed_logos_in_svg(diagram_name, diagram_svg, config, logos_dir, fragment_cache=fragment_cache, profiler=profiler)
+    return output_svg.encode("utf-8")
+
+
+def embed_logos_in_diagram(
+    diagram_name, diagram_svg_path, output_svg_path, config, logos_dir, fragment_cache=None, engine=DEFAULT_EMBED_ENGINE
+):
+    logging.info(f"Embedding logos into diagram from {diagram_svg_path}")
 
+    if engine == "stream":
+        with open(diagram_svg_path, "rb") as diagram_svg_file, open(output_svg_path, "wb") as output_file:
+            stream_embed.embed_logos_streaming(diagram_name, diagram_svg_file, output_file, config, logos_dir)
+        return
 
-def generate_diagram_from_config(config_filepath, diagram_name, output_dir, logos_dir, png_width, override_configs):
-    logging.info(f"Reading configuration from file: {config_filepath}")
-    config = utils.read_config(config_filepath)
+    with open(diagram_svg_path, "rb") as file:
+        diagram_svg = file.read()
 
-    if override_configs:
-        logging.info(f"Override configuration provided, replacing config keys as specified")
-        config["ecosystem"] = utils.override_config(config=config["ecosystem"], override_configs=override_configs)
-    else:
-        logging.info(f"No configuration overrides set, using values from specified config file")
+    output_svg = embed_logos_in_svg(diagram_name, diagram_svg, config, logos_dir, fragment_cache=fragment_cache)
+
+    with open(output_svg_path, "w", encoding="utf-8") as file:
+        file.write(output_svg)
+
+
+def generate_diagram_from_config(
+    config_filepath,
+    diagram_name,
+    output_dir,
+    logos_dir,
+    png_width,
+    override_configs,
+    layout_cache=None,
+    write_text_svg=False,
+    force=False,
+    profiler=None,
+    embed_engine=DEFAULT_EMBED_ENGINE,
+    optimize_svg=False,
+    optimize_precision=svg_optimizer.DEFAULT_PRECISION,
+    image_formats=rasterize.DEFAULT_IMAGE_FORMATS,
+    image_quality=rasterize.DEFAULT_IMAGE_QUALITY,
+    raster_tile_height=None,
+):
+    if profiler is None:
+        profiler = profiling.null_profiler
+
+    with profiler.stage("load_config"):
+        config = utils.load_config(config_filepath, override_configs)
+
+    return generate_diagram_from_config_dict(
+        config,
+        diagram_name=diagram_name,
+        output_dir=output_dir,
+        logos_dir=logos_dir,
+        png_width=png_width,
+        layout_cache=layout_cache,
+        write_text_svg=write_text_svg,
+        force=force,
+        profiler=profiler,
+        embed_engine=embed_engine,
+        optimize_svg=optimize_svg,
+        optimize_precision=optimize_precision,
+        image_formats=image_formats,
+        image_quality=image_quality,
+        raster_tile_height=raster_tile_height,
+    )
+
+
+def generate_diagram_from_config_dict(
+    config,
+    diagram_name,
+    output_dir,
+    logos_dir,
+    png_width,
+    layout_cache=None,
+    write_text_svg=False,
+    force=False,
+    profiler=None,
+    embed_engine=DEFAULT_EMBED_ENGINE,
+    optimize_svg=False,
+    optimize_precision=svg_optimizer.DEFAULT_PRECISION,
+    image_formats=rasterize.DEFAULT_IMAGE_FORMATS,
+    image_quality=rasterize.DEFAULT_IMAGE_QUALITY,
+    raster_tile_height=None,
+):
+    """
+    Generates the diagram SVG (with logos) and raster images from an already loaded configuration dictionary.
+    Each stage (text-only SVG, logos SVG, each image) is skipped if the build manifest next to the outputs shows it was
+    last built from identical inputs and its output is untouched, unless force is set.
+    :param png_width: The width of the raster image in pixels, or a list of widths (e.g. [3000, 6000, 400]) which are
+        all rendered from a single parse of the SVG. The first width is written to <name>_logos.png, and the others to
+        <name>_logos_<width>w.png.
+    :param profiler: Optional profiling.Profiler to record the layout, embedding and rasterization stages in.
+    :param embed_engine: One of EMBED_ENGINES; use stream for very large diagrams or logos to bound memory use.
+    :param optimize_svg: Run the output SVG through svg_optimizer.optimize_svg after embedding, before rasterizing.
+    :param optimize_precision: Number of decimal places the optimizer rounds coordinates to.
+    :param image_formats: Formats to write each width in, from rasterize.IMAGE_FORMATS, e.g. ["png", "webp"].
+    :param image_quality: Quality of the lossy image formats, from 1 to 100.
+    :param raster_tile_height: If set, rasterize in horizontal strips of this many rows, so memory use is bounded by the
+        strip size rather than the image size (e.g. for 12,000 pixel wide print renders on small machines).
+    :return: Tuple of (output SVG path, path of the image at the first width in the first format).
+    """
+    if profiler is None:
+        profiler = profiling.null_profiler
 
     text_diagram_basename = utils.slugify(diagram_name)
     logging.info(f"Filesystem safe diagram name: {text_diagram_basename}")
@@ -296,30 +707,197 @@ def generate_diagram_from_config(config_filepath, diagram_name, output_dir, logo
     logging.info(f"Output directory: {output_dir}")
 
     text_diagram_svg_path = os.path.join(output_dir, f"{text_diagram_basename}_text.svg")
-    logging.info(f"Text only diagram SVG output path: {text_diagram_svg_path}")
 
     # Determining the output path for the SVG diagram with logos
     output_svg_path = os.path.join(output_dir, f"{text_diagram_basename}_logos.svg")
     logging.info(f"Logos diagram SVG output path: {output_svg_path}")
 
-    # Generating the text-only SVG diagram based on the configuration
-    generate_text_only_svg_diagram_from_config(config, diagram_name=text_diagram_basename, output_svg_path=text_diagram_svg_path)
-    logging.info("Generated text-only SVG diagram from configuration.")
-
-    # Embedding logos into the text-only SVG diagram
-    embed_logos_in_diagram(
-        diagram_name=text_diagram_basename,
-        diagram_svg_path=text_diagram_svg_path,
-        output_svg_path=output_svg_path,
-        config=config,
-        logos_dir=logos_dir,
+    # Every raster image, keyed by (width, image format)
+    png_widths = rasterize.parse_widths(png_width)
+    image_formats = rasterize.parse_image_formats(image_formats)
+    image_paths = {
+        (width, image_format): rasterize.image_output_path(output_svg_path, width, image_format, png_widths[0])
+        for width in png_widths
+        for image_format in image_formats
+    }
+
+    # Open the logos once, for indexing, hashing and embedding them
+    logo_store = logo_pack.open_logo_store(logos_dir)
+    logos_metadata = None
+    logo_sizes = None
+    if sizes_nodes_to_logos(config):
+        # The index is only needed to size nodes; otherwise logo hashes are read from the logo store
+        with profiler.stage("index_logos"):
+            logos_metadata = logo_index.index_config_logos(config, logo_store)
+        logo_sizes = logo_index.fitted_logo_sizes(logos_metadata)
+
+    manifest = build_manifest.BuildManifest(output_dir, text_diagram_basename)
+    text_svg_inputs = build_manifest.hash_inputs(text_diagram_basename, text_diagram_config(config), logo_sizes)
+    logos_svg_inputs = build_manifest.hash_inputs(
+        text_svg_inputs,
+        config,
+        build_manifest.hash_logo_files(config, logo_store, logos_metadata),
+        embed_engine,
+        optimize_precision if optimize_svg else None,
     )
 
-    # Convert SVG content to PNG
-    png_output_path = output_svg_path.replace(".svg", ".png")
-    cairosvg.svg2png(url=output_svg_path, write_to=png_output_path, output_width=png_width)
-    logging.info(f"PNG version of the diagram saved to {png_output_path}, with width set to {png_width} pixels")
+    text_diagram_svg = None
+    if write_text_svg and not force and manifest.is_up_to_date("text_svg", text_svg_inputs, text_diagram_svg_path):
+        logging.info(f"Text-only diagram SVG is up to date, skipping layout: {text_diagram_svg_path}")
+        with open(text_diagram_svg_path, "rb") as file:
+            text_diagram_svg = file.read()
+
+    output_svg = None
+    logos_svg_up_to_date = manifest.is_up_to_date("logos_svg", logos_svg_inputs, output_svg_path)
+    if not force and logos_svg_up_to_date and (text_diagram_svg is not None or not write_text_svg):
+        logging.info(f"Logos diagram SVG is up to date, skipping layout and embedding: {output_svg_path}")
+    else:
+        if text_diagram_svg is None:
+            # Generating the text-only SVG diagram based on the configuration, in memory
+            with profiler.stage("layout"):
+                text_diagram_svg = render_text_only_svg(
+                    config, diagram_name=text_diagram_basename, layout_cache=layout_cache, logo_sizes=logo_sizes
+                )
+            logging.info("Generated text-only SVG diagram from configuration.")
+
+            if write_text_svg:
+                with open(text_diagram_svg_path, "wb") as file:
+                    file.write(text_diagram_svg)
+                manifest.record("text_svg", text_svg_inputs, text_diagram_svg_path, text_diagram_svg)
+                logging.info(f"Text only diagram SVG written to: {text_diagram_svg_path}")
+
+        # Embedding logos into the text-only SVG diagram
+        with profiler.stage("embed_logos", engine=embed_engine):
+            output_svg = embed_logos_with_engine(
+                text_diagram_basename, text_diagram_svg, config, logo_store, engine=embed_engine, profiler=profiler
+            )
+
+        if optimize_svg:
+            with profiler.stage("optimize_svg", precision=optimize_precision):
+                output_svg = svg_optimizer.optimize_svg(output_svg, precision=optimize_precision)
+
+        with open(output_svg_path, "wb") as file:
+            file.write(output_svg)
+        manifest.record("logos_svg", logos_svg_inputs, output_svg_path, output_svg)
+
+    image_inputs = {
+        (width, image_format): build_manifest.hash_inputs(
+            manifest.get_output_hash("logos_svg"), width, image_format, None if image_format == "png" else image_quality
+        )
+        for width, image_format in image_paths
+    }
+    stale_images = [
+        image
+        for image, image_path in image_paths.items()
+        if force or not manifest.is_up_to_date(f"image_{image[0]}_{image[1]}", image_inputs[image], image_path)
+    ]
+    if not stale_images:
+        logging.info(f"Images are up to date, skipping rasterization: {', '.join(image_paths.values())}")
+    else:
+        if output_svg is None:
+            with open(output_svg_path, "rb") as file:
+                output_svg = file.read()
+
+        # Every stale image is rendered from one parse of the in-memory SVG, rather than reading the file back
+        stale_widths = list(dict.fromkeys(width for width, _ in stale_images))
+        stale_formats = list(dict.fromkeys(image_format for _, image_format in stale_images))
+        with profiler.stage("rasterize", widths=stale_widths, formats=stale_formats, tile_height=raster_tile_height):
+            images = rasterize.rasterize_svg(
+                output_svg, stale_widths, stale_formats, quality=image_quality, tile_height=raster_tile_height, profiler=profiler
+            )
+
+        for width, image_format in stale_images:
+            image_path = image_paths[(width, image_format)]
+            with open(image_path, "wb") as file:
+                file.write(images[(width, image_format)])
+            manifest.record(f"image_{width}_{image_format}", image_inputs[(width, image_format)], image_path, images[(width, image_format)])
+            logging.info(f"{image_format.upper()} version of the diagram saved to {image_path}, with width set to {width} pixels")
+
+    manifest.save()
 
     logging.info(f"Final diagram with embedded logos generated")
 
-    return output_svg_path, png_output_path
+    return output_svg_path, image_paths[(png_widths[0], image_formats[0])]
+
+
+def render_diagram(
+    config,
+    diagram_name,
+    logos,
+    png_width=None,
+    override_configs=None,
+    layout_cache=None,
+    profiler=None,
+    embed_engine=DEFAULT_EMBED_ENGINE,
+    optimize_svg=False,
+    optimize_precision=svg_optimizer.DEFAULT_PRECISION,
+    image_formats=rasterize.DEFAULT_IMAGE_FORMATS,
+    image_quality=rasterize.DEFAULT_IMAGE_QUALITY,
+    raster_tile_height=None,
+    output_dir=None,
+):
+    """
+    Renders a diagram entirely in memory, from a configuration already held by the caller, and returns the results as
+    bytes. Nothing is read from or written to disk except the logos (when read from a directory or pack) and the
+    optional output_dir, so many diagrams can be rendered in one process without temporary files. There's no build
+    manifest, so every stage is always run.
+    :param config: The configuration, as a mapping (e.g. a dict loaded from YAML) or a parsed model; see
+        utils.copy_config. It's copied before any overrides are applied, so it's never changed.
+    :param logos: Where to read logos from: a logos directory, a pack file, a function of the tool name slug returning
+        its logo SVG content, or an open logo_pack.LogoStore.
+    :param png_width: The width of the raster image in pixels, or a list of widths, as for
+        generate_diagram_from_config_dict; None to only render the SVG.
+    :param override_configs: A list of override configuration dictionaries for the ecosystem section, or None.
+    :param output_dir: If set, also write the text-only SVG, logos SVG and images here, named as by
+        generate_diagram_from_config_dict.
+    :return: A dict with the text-only SVG ("text_svg") and the SVG with logos ("svg") as bytes, and the raster images
+        ("images") as a dict of (width, image format) -> image bytes.
+    """
+    if profiler is None:
+        profiler = profiling.null_profiler
+
+    config = utils.copy_config(config)
+    if override_configs:
+        config["ecosystem"] = utils.override_config(config=config["ecosystem"], override_configs=override_configs)
+
+    text_diagram_basename = utils.slugify(diagram_name)
+    logo_store = logo_pack.open_logo_store(logos)
+    logo_sizes = None
+    if sizes_nodes_to_logos(config):
+        with profiler.stage("index_logos"):
+            logo_sizes = logo_index.fitted_logo_sizes(logo_index.index_config_logos(config, logo_store))
+
+    with profiler.stage("layout"):
+        text_diagram_svg = render_text_only_svg(
+            config, diagram_name=text_diagram_basename, layout_cache=layout_cache, logo_sizes=logo_sizes
+        )
+
+    with profiler.stage("embed_logos", engine=embed_engine):
+        output_svg = embed_logos_with_engine(
+            text_diagram_basename, text_diagram_svg, config, logo_store, engine=embed_engine, profiler=profiler
+        )
+
+    if optimize_svg:
+        with profiler.stage("optimize_svg", precision=optimize_precision):
+            output_svg = svg_optimizer.optimize_svg(output_svg, precision=optimize_precision)
+
+    images = {}
+    if png_width is not None:
+        png_widths = rasterize.parse_widths(png_width)
+        image_formats = rasterize.parse_image_formats(image_formats)
+        with profiler.stage("rasterize", widths=png_widths, formats=image_formats, tile_height=raster_tile_height):
+            images = rasterize.rasterize_svg(
+                output_svg, png_widths, image_formats, quality=image_quality, tile_height=raster_tile_height, profiler=profiler
+            )
+
+    if output_dir is not None:
+        output_svg_path = os.path.join(output_dir, f"{text_diagram_basename}_logos.svg")
+        output_paths = {os.path.join(output_dir, f"{text_diagram_basename}_text.svg"): text_diagram_svg, output_svg_path: output_svg}
+        for (width, image_format), image in images.items():
+            output_paths[rasterize.image_output_path(output_svg_path, width, image_format, png_widths[0])] = image
+        for output_path, content in output_paths.items():
+            with open(output_path, "wb") as file:
+                file.write(content)
+            logging.info(f"Diagram output written to: {output_path}")
+
+    return {"text_svg": text_diagram_svg, "svg": output_svg, "images": images}
@@ -0,0 +1,99 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from logo_diagram_generator import utils
+
+DEFAULT_MAX_CACHED_LAYOUTS = 64
+
+# Graphviz attributes which only change how the diagram is painted, never where anything is placed.
+# IDs are included as they only name elements, and the graph ID changes with the diagram name (e.g. per theme).
+STYLE_ONLY_ATTRIBUTES = ("id", "color", "fontcolor", "bgcolor")
+
+STYLE_ONLY_ATTRIBUTE_PATTERN = re.compile(r"(?<![\w-])(?:%s)=(?:\"(?:[^\"\\]|\\.)*\"|[^\s\]]+)" % "|".join(STYLE_ONLY_ATTRIBUTES))
+
+
+def compute_layout_key(dot_source, engine):
+    """
+    Computes a canonical hash of everything in a Graphviz graph which can affect its layout: the nodes, edges, engine
+    and every attribute except those in STYLE_ONLY_ATTRIBUTES. Two graphs which only differ in colors (e.g. dark and
+    light themes of the same diagram) therefore share a layout key.
+    :param dot_source: The DOT source of the graph.
+    :param engine: The Graphviz layout engine, e.g. neato.
+    :return: A hex digest identifying the layout.
+    """
+    layout_source = STYLE_ONLY_ATTRIBUTE_PATTERN.sub("", dot_source)
+    layout_source = "\n".join(line.strip() for line in layout_source.splitlines() if line.strip())
+    return hashlib.sha256(f"{engine}\n{layout_source}".encode("utf-8")).hexdigest()
+
+
+class LayoutCache:
+    """
+    Cache of computed Graphviz layouts (node positions and bounding boxes), keyed by compute_layout_key.
+    Layouts are always kept in a bounded in-memory LRU, and also persisted as JSON files if a cache directory is set,
+    so separate runs for each theme of a diagram only pay for one layout between them.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=DEFAULT_MAX_CACHED_LAYOUTS):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _layout_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns the cached layout for the key, or None if it hasn't been computed yet.
+        """
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None:
+                self._layouts.move_to_end(key)
+                self.hits += 1
+                return layout
+
+        if self.cache_dir is not None and os.path.exists(self._layout_path(key)):
+            try:
+                with open(self._layout_path(key), "r") as file:
+                    layout = json.load(file)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable cached layout {self._layout_path(key)}: {e}")
+
+        with self._lock:
+            if layout is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, layout)
+        return layout
+
+    def put(self, key, layout):
+        with self._lock:
+            self._remember(key, layout)
+
+        if self.cache_dir is not None:
+            utils.ensure_directory_exists(self.cache_dir)
+            utils.write_file_atomically(self._layout_path(key), json.dumps(layout).encode("utf-8"))
+            logging.debug(f"Layout {key} saved to {self._layout_path(key)}")
+
+    def _remember(self, key, layout):
+        self._layouts[key] = layout
+        self._layouts.move_to_end(key)
+        while len(self._layouts) > self.max_entries:
+            self._layouts.popitem(last=False)
+
+
+def default_layout_cache_dir():
+    return os.path.join(utils.default_cache_dir(), "layouts")
+
+
+# Shared by every diagram rendered in this process unless a specific cache is passed in
+default_layout_cache = LayoutCache()
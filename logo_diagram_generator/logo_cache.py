@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from logo_diagram_generator import utils
+
+DEFAULT_NOT_FOUND_TTL = 7 * 24 * 60 * 60
+
+
+class LogoCache:
+    """
+    Persistent on-disk cache of downloaded logos, shared between runs and between logos directories.
+
+    For every URL which returned a logo, the response body is stored along with its ETag and Last-Modified headers,
+    so it can be restored without any network access if the logos directory is cleared, or revalidated cheaply with
+    a conditional GET when a refresh is requested.
+    URLs which returned 404 are remembered for `not_found_ttl` seconds, so known-bad VectorLogoZone slugs are skipped.
+
+    Layout of the cache directory:
+        index.json       - URL metadata, negative cache entries and the URL each logo slug was last downloaded from
+        bodies/<sha256>  - response bodies, keyed by content hash
+    """
+
+    def __init__(self, cache_dir=None, not_found_ttl=DEFAULT_NOT_FOUND_TTL):
+        self.cache_dir = cache_dir if cache_dir is not None else utils.default_cache_dir()
+        self.bodies_dir = os.path.join(self.cache_dir, "bodies")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.not_found_ttl = not_found_ttl
+        self._lock = threading.Lock()
+        self._index = {"urls": {}, "not_found": {}, "logos": {}}
+        self._dirty = False
+
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as file:
+                    self._index.update(json.load(file))
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable logo cache index {self.index_path}: {e}")
+
+        logging.debug(f"Logo cache loaded from {self.cache_dir} with {len(self._index['urls'])} URLs")
+
+    def is_known_missing(self, url):
+        """
+        Returns True if the URL returned 404 within the negative cache TTL.
+        """
+        with self._lock:
+            missing_since = self._index["not_found"].get(url)
+            if missing_since is None:
+                return False
+            if time.time() - missing_since > self.not_found_ttl:
+                del self._index["not_found"][url]
+                self._dirty = True
+                return False
+            return True
+
+    def record_missing(self, url):
+        with self._lock:
+            self._index["not_found"][url] = time.time()
+            self._dirty = True
+
+    def get_body(self, url):
+        """
+        Returns the cached response body for the URL, or None if it has never been downloaded successfully.
+        """
+        with self._lock:
+            entry = self._index["urls"].get(url)
+        if entry is None:
+            return None
+
+        body_path = os.path.join(self.bodies_dir, entry["sha256"])
+        try:
+            with open(body_path, "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def conditional_headers(self, url):
+        """
+        Returns the If-None-Match / If-Modified-Since headers to revalidate the cached copy of the URL, if any.
+        """
+        with self._lock:
+            entry = self._index["urls"].get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, response):
+        """
+        Stores a successful (200) response body and its validators for the URL.
+        """
+        body = response.content
+        sha256 = hashlib.sha256(body).hexdigest()
+        os.makedirs(self.bodies_dir, exist_ok=True)
+
+        body_path = os.path.join(self.bodies_dir, sha256)
+        if not os.path.exists(body_path):
+            utils.write_file_atomically(body_path, body)
+
+        with self._lock:
+            self._index["urls"][url] = {
+                "sha256": sha256,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            }
+            self._index["not_found"].pop(url, None)
+            self._dirty = True
+
+    def get_logo_url(self, slug):
+        """
+        Returns the URL the logo with this slug was last downloaded from, or None if it was never downloaded.
+        """
+        with self._lock:
+            return self._index["logos"].get(slug)
+
+    def record_logo_url(self, slug, url):
+        with self._lock:
+            if self._index["logos"].get(slug) != url:
+                self._index["logos"][slug] = url
+                self._dirty = True
+
+    def save(self):
+        """
+        Writes the cache index back to disk, if it has changed since it was loaded.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            utils.write_file_atomically(self.index_path, json.dumps(self._index, indent=1, sort_keys=True).encode("utf-8"))
+            self._dirty = False
+        logging.debug(f"Logo cache index saved to {self.index_path}")
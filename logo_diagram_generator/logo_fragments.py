@@ -0,0 +1,202 @@
+import re
+import hashlib
+import logging
+import threading
+import xml.dom.minidom
+from collections import OrderedDict
+
+DEFAULT_MAX_CACHED_FRAGMENTS = 1024
+
+# Every logo is embedded into the diagram at this nominal size, before scaling
+LOGO_WIDTH = 120
+LOGO_HEIGHT = 60
+
+# SVG shape tags which get a stroke added when a stroke override is set
+SHAPE_TAGS = frozenset(["path", "rect", "circle", "ellipse", "line", "polyline", "polygon"])
+
+# Matches everything in a logo which needs a namespace prefix, so all of them can be rewritten in a single pass:
+# id attributes, local (#) href / xlink:href references, CSS url(#...) references and generic Illustrator class names
+LOGO_REFERENCE_PATTERN = re.compile(
+    r"(?<![\w:.-])(?P<attribute>id|xlink:href|href)=(?P<quote>[\"'])(?P<hash>#?)(?P<value>.*?)(?P=quote)"
+    r"|url\(#(?P<url>[^)]+)\)"
+    r"|(?<![\w-])(?P<class>st\d+|cls-\d+)(?![\w-])"
+)
+
+
+def namespace_logo_svg(logo_svg_content, prefix):
+    """
+    Adds a prefix to every ID, local reference and generic class name in a logo SVG, so logos can be combined into
+    one document without their IDs or styles clashing. All rewrites happen in a single pass over the content.
+    :param logo_svg_content: The logo SVG markup, as a string.
+    :param prefix: The prefix to add, e.g. the tool name slug.
+    :return: The namespaced SVG markup.
+    """
+
+    def add_prefix(match):
+        if match.group("attribute") is not None:
+            # href values without a leading # point at external resources, so are left alone
+            if match.group("attribute") != "id" and not match.group("hash"):
+                return match.group(0)
+            quote = match.group("quote")
+            return f"{match.group('attribute')}={quote}{match.group('hash')}{prefix}-{match.group('value')}{quote}"
+        if match.group("url") is not None:
+            return f"url(#{prefix}-{match.group('url')})"
+        return f"{prefix}-{match.group('class')}"
+
+    return LOGO_REFERENCE_PATTERN.sub(add_prefix, logo_svg_content)
+
+
+def resolve_logo_style(tool_config, ecosystem_style):
+    """
+    Resolves how a tool's logo is drawn, from the tool's config with the ecosystem style's defaults as fallback.
+    :return: Tuple of (scale, position adjust x, position adjust y, stroke color, stroke width).
+    """
+    return (
+        tool_config.get("scale", ecosystem_style.get("defaultLogoScale", 1.5)),
+        tool_config.get("positionAdjustX", 0),
+        tool_config.get("positionAdjustY", 0),
+        tool_config.get("strokeColor", ecosystem_style.get("defaultLogoStrokeColor", None)),
+        tool_config.get("strokeWidth", ecosystem_style.get("defaultLogoStrokeWidth", 0)),
+    )
+
+
+def logo_transform(cx, cy, logo_scale, logo_position_adjust_x, logo_position_adjust_y):
+    """
+    Builds the transform attribute which scales a logo and centres it on a node's ellipse at (cx, cy).
+    """
+    logo_scaled_width = LOGO_WIDTH * logo_scale
+    logo_scaled_height = LOGO_HEIGHT * logo_scale
+
+    transform_x = float(cx) - (logo_scaled_width / 2) + logo_position_adjust_x
+    transform_y = float(cy) - (logo_scaled_height / 2) + logo_position_adjust_y
+    logging.debug(f"Translating logo to the position ({transform_x}, {transform_y})")
+    return f"translate({transform_x}, {transform_y}) scale({logo_scale})"
+
+
+def has_stroke(stroke_color, stroke_width):
+    return stroke_color is not None and float(stroke_width) > 0
+
+
+def apply_stroke(logo_node, stroke_color, stroke_width):
+    """
+    Sets the stroke color and width on every shape element within a logo node, in a single traversal.
+    """
+    stroke_width = str(stroke_width)
+    stack = [logo_node]
+    while stack:
+        element = stack.pop()
+        if element.tagName in SHAPE_TAGS:
+            element.setAttribute("stroke", stroke_color)
+            element.setAttribute("stroke-width", stroke_width)
+        stack.extend(child for child in element.childNodes if child.nodeType == child.ELEMENT_NODE)
+
+
+def create_logo_symbol(document, logo_node):
+    """
+    Converts a prepared logo <svg> node into a <symbol> with the same attributes and children, for placing with <use>.
+    """
+    symbol_element = document.createElement("symbol")
+    for name, value in logo_node.attributes.items():
+        symbol_element.setAttribute(name, value)
+    while logo_node.firstChild is not None:
+        symbol_element.appendChild(logo_node.firstChild)
+    return symbol_element
+
+
+def create_logo_use(document, prefix):
+    """
+    Creates a <use> element placing the logo symbol with the given namespace prefix at the nominal logo size.
+    """
+    use_element = document.createElement("use")
+    for name, value in logo_use_attributes(prefix):
+        use_element.setAttribute(name, value)
+    return use_element
+
+
+def logo_use_attributes(prefix):
+    return [("xlink:href", f"#{prefix}-logo"), ("width", str(LOGO_WIDTH)), ("height", str(LOGO_HEIGHT))]
+
+
+class LogoSymbolTable:
+    """
+    Tracks the distinct logos used in one diagram, so each is emitted once as a <symbol> in <defs> and every tool
+    using it is placed with <use>. Logos are distinct by tool name slug, content hash and stroke override, as the
+    stroke is set on the logo's own shapes (where it overrides their stroke), so can't be applied per <use> instead.
+
+    The first variant of a tool's logo is namespaced with the tool name slug as before, and any further variants (e.g.
+    the same tool drawn with and without a stroke) with `<slug>--<n>`, so the IDs within each symbol stay unique.
+    """
+
+    def __init__(self):
+        self._prefixes = {}
+        self._variant_counts = {}
+
+    def get_symbol(self, tool_name_slug, logo_svg_bytes, stroke_color, stroke_width):
+        """
+        :return: Tuple of (namespace prefix of the logo's symbol, True if this is the symbol's first use and it still
+            needs to be emitted).
+        """
+        stroke = (stroke_color, str(stroke_width)) if has_stroke(stroke_color, stroke_width) else None
+        key = (tool_name_slug, hashlib.sha256(logo_svg_bytes).hexdigest(), stroke)
+        prefix = self._prefixes.get(key)
+        if prefix is not None:
+            return prefix, False
+
+        variant = self._variant_counts.get(tool_name_slug, 0) + 1
+        self._variant_counts[tool_name_slug] = variant
+        prefix = self._prefixes[key] = tool_name_slug if variant == 1 else f"{tool_name_slug}--{variant}"
+        return prefix, True
+
+
+class LogoFragmentCache:
+    """
+    In-memory LRU cache of logo SVGs which have already been namespaced, parsed and normalized, keyed by the hash of
+    the raw logo content and the namespace prefix.
+
+    Rendering the same logos into several diagrams or themes in one process only pays for the rewrite and parse once;
+    every later use is a deep copy of the cached node, with stroke overrides applied to the copy.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_CACHED_FRAGMENTS):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_logo_node(self, logo_svg_bytes, prefix):
+        """
+        Returns the normalized, namespaced root <svg> node for the given logo, parsing it only on first use.
+        The returned node is shared by every caller, so must be copied (e.g. with importNode) before modification.
+        :param logo_svg_bytes: The raw logo SVG file content.
+        :param prefix: The namespace prefix for IDs and classes, also used to set the root node ID to `<prefix>-logo`.
+        """
+        key = (hashlib.sha256(logo_svg_bytes).hexdigest(), prefix)
+        with self._lock:
+            logo_node = self._fragments.get(key)
+            if logo_node is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return logo_node
+            self.misses += 1
+
+        logging.debug(f"Preparing logo fragment with prefix {prefix}")
+        logo_svg_content = namespace_logo_svg(logo_svg_bytes.decode("utf-8"), prefix)
+        logo_node = xml.dom.minidom.parseString(logo_svg_content).documentElement
+        logo_node.setAttribute("id", f"{prefix}-logo")
+        logo_node.setAttribute("width", str(LOGO_WIDTH))
+        logo_node.setAttribute("height", str(LOGO_HEIGHT))
+
+        with self._lock:
+            self._fragments[key] = logo_node
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return logo_node
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+
+# Shared by every diagram rendered in this process unless a specific cache is passed in
+default_fragment_cache = LogoFragmentCache()
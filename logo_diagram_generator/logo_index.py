@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import xml.parsers.expat
+
+from logo_diagram_generator import logo_fragments, logo_pack, utils
+
+# Name of the index file inside a logos directory; hidden, and not an .svg, so it's never taken for a logo
+INDEX_FILENAME = ".logo-index.json"
+INDEX_VERSION = 1
+
+# Logos beyond any of these are warned about before embedding, as they can make rasterization take minutes
+DEFAULT_MAX_LOGO_PATHS = 5000
+DEFAULT_MAX_LOGO_ELEMENTS = 20000
+DEFAULT_MAX_LOGO_BYTES = 2 * 1024 * 1024
+
+# Lengths in an SVG's width and height attributes, with the number of pixels per unit
+LENGTH_PATTERN = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(px|pt|pc|mm|cm|in)?\s*$")
+PIXELS_PER_UNIT = {None: 1, "px": 1, "pt": 4 / 3, "pc": 16, "mm": 96 / 25.4, "cm": 96 / 2.54, "in": 96}
+
+
+def parse_length(value):
+    """
+    :return: An SVG length attribute value in pixels, or None if it's missing, relative (e.g. 100%) or invalid.
+    """
+    match = LENGTH_PATTERN.match(value or "")
+    if match is None:
+        return None
+    return float(match.group(1)) * PIXELS_PER_UNIT[match.group(2)]
+
+
+def parse_view_box(value):
+    """
+    :return: An SVG viewBox attribute value as [min x, min y, width, height], or None if it's missing or invalid.
+    """
+    try:
+        view_box = [float(number) for number in (value or "").replace(",", " ").split()]
+    except ValueError:
+        return None
+    if len(view_box) != 4 or view_box[2] <= 0 or view_box[3] <= 0:
+        return None
+    return view_box
+
+
+def measure_logo(logo_svg_bytes):
+    """
+    Measures a logo SVG in a single streaming pass, without building a document.
+    :param logo_svg_bytes: The logo SVG content.
+    :return: A dict of the logo's sha256 hex digest, size in bytes, viewBox (or None), intrinsic width and height in
+        pixels (from its width and height attributes, falling back to its viewBox; None if it has neither), and its
+        number of elements and <path> elements. A logo which isn't valid XML has None for everything but the hash
+        and size.
+    """
+    metadata = {
+        "sha256": hashlib.sha256(logo_svg_bytes).hexdigest(),
+        "bytes": len(logo_svg_bytes),
+        "viewBox": None,
+        "width": None,
+        "height": None,
+        "elements": 0,
+        "paths": 0,
+    }
+
+    def start_element(name, attributes):
+        if metadata["elements"] == 0:
+            view_box = parse_view_box(attributes.get("viewBox"))
+            metadata["viewBox"] = view_box
+            metadata["width"] = parse_length(attributes.get("width")) or (view_box[2] if view_box else None)
+            metadata["height"] = parse_length(attributes.get("height")) or (view_box[3] if view_box else None)
+        metadata["elements"] += 1
+        # Prefixed tags (e.g. svg:path) are counted too, as namespaces aren't resolved
+        if name == "path" or name.endswith(":path"):
+            metadata["paths"] += 1
+
+    parser = xml.parsers.expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    try:
+        parser.Parse(logo_svg_bytes, True)
+    except xml.parsers.expat.ExpatError as e:
+        logging.warning(f"Logo with hash {metadata['sha256']} isn't valid SVG, so can't be measured: {e}")
+        metadata.update(elements=None, paths=None)
+    return metadata
+
+
+def fitted_logo_size(metadata):
+    """
+    Every logo is embedded into a LOGO_WIDTH x LOGO_HEIGHT box, which a logo with a viewBox is scaled to fit while
+    keeping its aspect ratio, so e.g. a square logo only covers the middle LOGO_HEIGHT x LOGO_HEIGHT of it.
+    :param metadata: The logo's metadata, from measure_logo.
+    :return: Tuple of (width, height) the logo is actually drawn at within the box, before the tool's scale.
+    """
+    width, height = logo_fragments.LOGO_WIDTH, logo_fragments.LOGO_HEIGHT
+    if metadata is None or metadata["viewBox"] is None:
+        # Without a viewBox the logo isn't scaled at all, so it covers its intrinsic size, clipped to the box
+        if metadata is not None and metadata["width"] and metadata["height"]:
+            return min(metadata["width"], width), min(metadata["height"], height)
+        return width, height
+
+    aspect_ratio = metadata["viewBox"][2] / metadata["viewBox"][3]
+    if aspect_ratio >= width / height:
+        return width, width / aspect_ratio
+    return height * aspect_ratio, height
+
+
+class LogoIndex:
+    """
+    Metadata of every logo in a logos directory (see measure_logo), keyed by tool name slug, so a logo's hash,
+    dimensions and complexity are known without reading or parsing it again.
+
+    The index is persisted as INDEX_FILENAME in the logos directory and updated incrementally: a loose logo file is
+    only read again if its modification time or size has changed, and only measured again if its hash has too; a
+    packed logo is only read if its hash in the pack's index has changed. Logos from a pack file on its own or from a
+    function are indexed in memory only.
+    """
+
+    def __init__(self, logos_dir):
+        self.logo_store = logo_pack.open_logo_store(logos_dir)
+        is_directory = isinstance(self.logo_store, logo_pack.LogoStore) and not self.logo_store.pack_only
+        self.path = os.path.join(self.logo_store.logos_dir, INDEX_FILENAME) if is_directory else None
+        self.logos = {}
+        self._dirty = False
+
+        if self.path is not None and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as file:
+                    index = json.load(file)
+                if index.get("version") == INDEX_VERSION:
+                    self.logos = index["logos"]
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Ignoring unreadable logo index {self.path}: {e}")
+
+    def get(self, slug):
+        """
+        :return: The metadata of the logo for the given tool name slug, or None if it hasn't been indexed.
+        """
+        return self.logos.get(slug)
+
+    def _logo_file_stat(self, slug):
+        if self.path is None or self.logo_store.is_packed(slug):
+            return None
+        try:
+            stat = os.stat(self.logo_store.logo_path(slug))
+        except FileNotFoundError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def update_logo(self, slug):
+        """
+        Brings the metadata of one logo up to date, reading and measuring it only if it has changed.
+        :return: The logo's metadata, or None if there is no logo for the slug.
+        """
+        entry = self.logos.get(slug)
+        stat = self._logo_file_stat(slug)
+        if entry is not None and stat is not None and entry.get("stat") == stat:
+            return entry
+
+        is_packed = isinstance(self.logo_store, logo_pack.LogoStore) and self.logo_store.is_packed(slug)
+        # Packed logos' hashes are in the pack's index, so an unchanged packed logo isn't read at all
+        if is_packed and entry is not None and entry["sha256"] == self.logo_store.sha256(slug):
+            return entry
+
+        try:
+            logo_svg_bytes = self.logo_store.read(slug)
+        except OSError:
+            if entry is not None:
+                del self.logos[slug]
+                self._dirty = True
+            return None
+
+        if entry is None or entry["sha256"] != hashlib.sha256(logo_svg_bytes).hexdigest():
+            logging.debug(f"Measuring logo {slug}")
+            entry = measure_logo(logo_svg_bytes)
+        entry = dict(entry, stat=stat)
+        self.logos[slug] = entry
+        self._dirty = True
+        return entry
+
+    def update(self, slugs=None):
+        """
+        Brings the index up to date with the logos.
+        :param slugs: The tool name slugs of the logos to update, e.g. only those in a diagram; by default every logo
+            in the store, in which case logos which no longer exist are also removed from the index.
+        :return: A dict of tool name slug -> metadata of each logo updated, or None where there is no logo.
+        """
+        if slugs is None:
+            slugs = self.logo_store.slugs()
+            for removed_slug in set(self.logos).difference(slugs):
+                del self.logos[removed_slug]
+                self._dirty = True
+        return {slug: self.update_logo(slug) for slug in slugs}
+
+    def save(self):
+        """
+        Writes the index back to the logos directory, if anything in it has changed.
+        """
+        if self.path is None or not self._dirty:
+            return
+        index_content = json.dumps({"version": INDEX_VERSION, "logos": self.logos}, sort_keys=True)
+        try:
+            utils.write_file_atomically(self.path, index_content.encode("utf-8"))
+            self._dirty = False
+        except OSError as e:
+            # The index only saves work, so e.g. a read-only logos directory shouldn't stop a diagram being generated
+            logging.warning(f"Couldn't save logo index {self.path}: {e}")
+
+
+def find_pathological_logos(
+    logos_metadata, max_paths=DEFAULT_MAX_LOGO_PATHS, max_elements=DEFAULT_MAX_LOGO_ELEMENTS, max_bytes=DEFAULT_MAX_LOGO_BYTES
+):
+    """
+    :param logos_metadata: A dict of tool name slug -> logo metadata (or None), as returned by LogoIndex.update.
+    :return: A dict of tool name slug -> list of reasons, for each logo over any of the limits.
+    """
+    pathological_logos = {}
+    for slug, metadata in logos_metadata.items():
+        if metadata is None:
+            continue
+        reasons = []
+        if metadata["paths"] is not None and metadata["paths"] > max_paths:
+            reasons.append(f"{metadata['paths']} paths")
+        if metadata["elements"] is not None and metadata["elements"] > max_elements:
+            reasons.append(f"{metadata['elements']} elements")
+        if metadata["bytes"] > max_bytes:
+            reasons.append(f"{metadata['bytes']} bytes")
+        if reasons:
+            pathological_logos[slug] = reasons
+    return pathological_logos
+
+
+def warn_about_pathological_logos(logos_metadata):
+    for slug, reasons in find_pathological_logos(logos_metadata).items():
+        logging.warning(f"Logo {slug} has {', '.join(reasons)}, so may make embedding and rasterization very slow")
+
+
+def index_config_logos(config, logos_dir):
+    """
+    Brings the index of the logos used by every tool in the config up to date and saves it, warning about any
+    pathological logos among them.
+    :param logos_dir: A logos directory, a pack file, a logo function or an open logo store, as for
+        logo_pack.open_logo_store.
+    :return: A dict of tool name slug -> logo metadata, or None where the logo is missing.
+    """
+    logo_index = LogoIndex(logos_dir)
+    logos_metadata = logo_index.update([utils.slugify(tool_config.get("name")) for tool_config in utils.list_tools(config)])
+    logo_index.save()
+    warn_about_pathological_logos(logos_metadata)
+    return logos_metadata
+
+
+def index_logos(logos_dir):
+    """
+    Brings the index of every logo in a logos directory up to date and saves it, warning about any pathological logos.
+    :return: The number of logos indexed.
+    """
+    logo_index = LogoIndex(logos_dir)
+    logos_metadata = logo_index.update()
+    logo_index.save()
+    warn_about_pathological_logos(logos_metadata)
+    logging.info(f"Indexed {len(logos_metadata)} logos in {logos_dir}")
+    return len(logos_metadata)
+
+
+def fitted_logo_sizes(logos_metadata):
+    """
+    :param logos_metadata: A dict of tool name slug -> logo metadata (or None), as returned by LogoIndex.update.
+    :return: A dict of tool name slug -> (width, height) each logo is drawn at, from fitted_logo_size, for every logo
+        which exists.
+    """
+    return {slug: fitted_logo_size(metadata) for slug, metadata in logos_metadata.items() if metadata is not None}
@@ -0,0 +1,286 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import logging
+import tempfile
+
+from logo_diagram_generator import utils
+
+# Name of the pack file inside a logos directory
+PACK_FILENAME = "logos.pack"
+
+PACK_MAGIC = b"LDGPACK\x00"
+PACK_VERSION = 1
+
+# A pack starts with this header: the magic bytes, the format version, and the offset and length of the JSON index,
+# which follows the logo data. The index maps each tool name slug to [offset, length, sha256 hex digest].
+PACK_HEADER = struct.Struct(">8sIQQ")
+
+
+class LogoPack:
+    """
+    Read-only view of a pack file, which holds many logo SVGs back to back plus an index of where each one is.
+    The file is memory mapped, so reading a logo is a slice of the mapping rather than a file open, and only the pages
+    holding logos which are actually used are read from disk.
+    """
+
+    def __init__(self, pack_path):
+        self.path = pack_path
+        with open(pack_path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, index_offset, index_length = PACK_HEADER.unpack_from(self._mmap, 0)
+            if magic != PACK_MAGIC:
+                raise ValueError("not a logo pack")
+            if version != PACK_VERSION:
+                raise ValueError(f"unsupported pack version {version}")
+            index = json.loads(self._mmap[index_offset : index_offset + index_length])
+        except (struct.error, ValueError) as e:
+            self._mmap.close()
+            raise ValueError(f"Invalid logo pack {pack_path}: {e}")
+
+        self.index = {slug: tuple(entry) for slug, entry in index.items()}
+
+    def __contains__(self, slug):
+        return slug in self.index
+
+    def slugs(self):
+        return list(self.index)
+
+    def read(self, slug):
+        """
+        :return: The logo SVG content for the given tool name slug.
+        :raises KeyError: If the pack has no logo for the slug.
+        """
+        offset, length, _ = self.index[slug]
+        return self._mmap[offset : offset + length]
+
+    def sha256(self, slug):
+        return self.index[slug][2]
+
+    def close(self):
+        self._mmap.close()
+
+
+def write_pack(pack_path, logos):
+    """
+    Writes a pack file atomically, via a temporary file in the same directory which is renamed over pack_path.
+    :param logos: Iterable of (tool name slug, logo SVG content) tuples. Each logo is written as soon as it is produced,
+        so a generator lets thousands of logos be packed without holding them all in memory.
+    :return: The number of logos written.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(pack_path) or ".", prefix=".tmp-")
+    try:
+        index = {}
+        with os.fdopen(fd, "wb") as file:
+            file.write(b"\0" * PACK_HEADER.size)
+            for slug, content in logos:
+                index[slug] = [file.tell(), len(content), hashlib.sha256(content).hexdigest()]
+                file.write(content)
+
+            index_offset = file.tell()
+            index_content = json.dumps(index, sort_keys=True).encode("utf-8")
+            file.write(index_content)
+            file.seek(0)
+            file.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, index_offset, len(index_content)))
+        os.replace(temp_path, pack_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(index)
+
+
+class LogoStore:
+    """
+    Reads tool logos by name slug from a logos directory: from loose <slug>.svg files, and from the directory's pack
+    file (see PACK_FILENAME) if it has one. A loose file takes precedence over a packed logo with the same slug, so logos
+    downloaded, refreshed or edited since the pack was written are used as they are.
+
+    The directory is listed once when the store is opened, rather than checking for every tool's file separately, and
+    packed logos are read from the memory mapped pack without any per-logo file system calls. This avoids the metadata
+    round trips which dominate on network file systems and in container layers with thousands of logos.
+
+    logos_dir may also be the path of a pack file on its own, e.g. one shipped with an application, in which case only
+    the packed logos are available.
+    """
+
+    def __init__(self, logos_dir):
+        self.logos_dir = logos_dir
+        self.pack = None
+        self.pack_only = os.path.isfile(logos_dir)
+        if self.pack_only:
+            self.loose_slugs = set()
+            self.pack = LogoPack(logos_dir)
+            return
+
+        try:
+            with os.scandir(logos_dir) as entries:
+                filenames = {entry.name for entry in entries}
+        except FileNotFoundError:
+            filenames = set()
+
+        self.loose_slugs = {filename[: -len(".svg")] for filename in filenames if filename.endswith(".svg")}
+        if PACK_FILENAME in filenames:
+            self.pack = LogoPack(os.path.join(logos_dir, PACK_FILENAME))
+            logging.debug(f"Opened logo pack with {len(self.pack.index)} logos in {logos_dir}")
+
+    def logo_path(self, slug):
+        return os.path.join(self.logos_dir, f"{slug}.svg")
+
+    def is_packed(self, slug):
+        return self.pack is not None and slug in self.pack and slug not in self.loose_slugs
+
+    def __contains__(self, slug):
+        return slug in self.loose_slugs or (self.pack is not None and slug in self.pack)
+
+    def slugs(self):
+        return sorted(self.loose_slugs.union(self.pack.slugs() if self.pack is not None else []))
+
+    def read(self, slug):
+        """
+        :return: The logo SVG content for the given tool name slug.
+        :raises FileNotFoundError: If there is no logo for the slug.
+        """
+        if self.is_packed(slug):
+            return self.pack.read(slug)
+        if self.pack_only:
+            raise FileNotFoundError(f"No logo for {slug} in logo pack {self.logos_dir}")
+        # Also used for logos not seen when the directory was listed, e.g. downloaded since
+        with open(self.logo_path(slug), "rb") as file:
+            return file.read()
+
+    def sha256(self, slug):
+        """
+        :return: The sha256 hex digest of the logo for the given slug (from the pack's index for packed logos, without
+            reading the logo), or None if there is no logo for the slug.
+        """
+        if self.is_packed(slug):
+            return self.pack.sha256(slug)
+        try:
+            return hashlib.sha256(self.read(slug)).hexdigest()
+        except OSError:
+            return None
+
+    def close(self):
+        if self.pack is not None:
+            self.pack.close()
+            self.pack = None
+
+
+class CallableLogoStore:
+    """
+    Reads tool logos from a function of the tool name slug, which returns the logo SVG content (as bytes or a string),
+    or None if there is no logo for the slug; e.g. the get method of a dict of logos held in memory, or a lookup in a
+    database. Each logo is requested once and kept for the life of the store, as it's read both for hashing and for
+    embedding.
+    """
+
+    def __init__(self, read_logo):
+        self.read_logo = read_logo
+        self.logos = {}
+
+    def __contains__(self, slug):
+        return self.get(slug) is not None
+
+    def slugs(self):
+        return sorted(slug for slug, logo_svg_bytes in self.logos.items() if logo_svg_bytes is not None)
+
+    def get(self, slug):
+        if slug not in self.logos:
+            logo_svg_bytes = self.read_logo(slug)
+            self.logos[slug] = logo_svg_bytes.encode("utf-8") if isinstance(logo_svg_bytes, str) else logo_svg_bytes
+        return self.logos[slug]
+
+    def read(self, slug):
+        """
+        :return: The logo SVG content for the given tool name slug.
+        :raises FileNotFoundError: If there is no logo for the slug.
+        """
+        logo_svg_bytes = self.get(slug)
+        if logo_svg_bytes is None:
+            raise FileNotFoundError(f"No logo for {slug} from {self.read_logo}")
+        return logo_svg_bytes
+
+    def sha256(self, slug):
+        logo_svg_bytes = self.get(slug)
+        return hashlib.sha256(logo_svg_bytes).hexdigest() if logo_svg_bytes is not None else None
+
+    def close(self):
+        self.logos = {}
+
+
+def open_logo_store(logos_dir):
+    """
+    :param logos_dir: A logos directory, a pack file, a function of the tool name slug returning its logo (see
+        CallableLogoStore), or an already open LogoStore or CallableLogoStore, which is returned as is.
+    """
+    if isinstance(logos_dir, (LogoStore, CallableLogoStore)):
+        return logos_dir
+    if callable(logos_dir):
+        return CallableLogoStore(logos_dir)
+    return LogoStore(logos_dir)
+
+
+def pack_logos(logos_dir, remove_loose=False):
+    """
+    Packs every logo in a logos directory (loose files, plus any logos already in its pack) into the directory's pack.
+    :param remove_loose: Delete the loose logo files once they are packed.
+    :return: The number of logos in the pack.
+    """
+    store = LogoStore(logos_dir)
+    loose_paths = [store.logo_path(slug) for slug in store.loose_slugs]
+
+    def read_logos():
+        try:
+            for slug in store.slugs():
+                yield slug, store.read(slug)
+        finally:
+            # The old pack must be unmapped before the new one replaces it, as Windows can't replace a mapped file
+            store.close()
+
+    pack_path = os.path.join(logos_dir, PACK_FILENAME)
+    logo_count = write_pack(pack_path, read_logos())
+    logging.info(f"Packed {logo_count} logos into {pack_path}")
+
+    if remove_loose:
+        for loose_path in loose_paths:
+            os.remove(loose_path)
+        logging.info(f"Removed {len(loose_paths)} loose logo files from {logos_dir}")
+    return logo_count
+
+
+def unpack_logos(logos_dir, overwrite=False, remove_pack=False):
+    """
+    Writes every logo in a logos directory's pack out as a loose <slug>.svg file, verifying each against its hash.
+    :param overwrite: Replace existing loose files; by default they are kept, as they take precedence over the pack.
+    :param remove_pack: Delete the pack once every logo has been written.
+    :return: The number of logo files written.
+    :raises ValueError: If a packed logo doesn't match its hash.
+    """
+    pack_path = os.path.join(logos_dir, PACK_FILENAME)
+    pack = LogoPack(pack_path)
+    written = 0
+    try:
+        for slug in pack.slugs():
+            content = pack.read(slug)
+            if hashlib.sha256(content).hexdigest() != pack.sha256(slug):
+                raise ValueError(f"Logo {slug} in {pack_path} is corrupt, its content doesn't match its hash")
+
+            logo_path = os.path.join(logos_dir, f"{slug}.svg")
+            if not overwrite and os.path.exists(logo_path):
+                logging.info(f"Keeping existing logo file {logo_path}")
+                continue
+            utils.write_file_atomically(logo_path, content)
+            written += 1
+    finally:
+        pack.close()
+
+    logging.info(f"Unpacked {written} logos from {pack_path}")
+    if remove_pack:
+        os.remove(pack_path)
+        logging.info(f"Removed {pack_path}")
+    return written
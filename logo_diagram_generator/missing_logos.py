@@ -0,0 +1,113 @@
+import os
+import html
+import json
+import logging
+
+from logo_diagram_generator import logo_fragments, utils
+
+# Name of the missing logos report inside a logos directory, unless another path is given
+MISSING_LOGOS_REPORT_FILENAME = "missing_logos.json"
+
+# Attribute on the root element of every placeholder logo, so they can be told apart from real logos
+PLACEHOLDER_ATTRIBUTE = "data-logo-diagram-generator-placeholder"
+
+PLACEHOLDER_FILL_COLOR = "#f4f4f4"
+PLACEHOLDER_BORDER_COLOR = "#9a9a9a"
+PLACEHOLDER_TEXT_COLOR = "#333333"
+PLACEHOLDER_MAX_FONT_SIZE = 18
+PLACEHOLDER_PADDING = 8
+
+# Average width of a character relative to the font size, to shrink long labels until they fit the badge
+PLACEHOLDER_CHARACTER_WIDTH = 0.6
+
+
+def default_report_path(logos_dir):
+    return os.path.join(logos_dir, MISSING_LOGOS_REPORT_FILENAME)
+
+
+def create_placeholder_svg(label):
+    """
+    Renders a placeholder badge for a tool without a logo: the tool's label in a dashed, rounded box, at the nominal
+    logo size so it's scaled and positioned in the diagram like any other logo.
+    :return: The placeholder SVG, as bytes.
+    """
+    text_width = logo_fragments.LOGO_WIDTH - 2 * PLACEHOLDER_PADDING
+    font_size = min(PLACEHOLDER_MAX_FONT_SIZE, text_width / (max(len(label), 1) * PLACEHOLDER_CHARACTER_WIDTH))
+    width, height = logo_fragments.LOGO_WIDTH, logo_fragments.LOGO_HEIGHT
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" width="{width}" height="{height}" '
+        f'{PLACEHOLDER_ATTRIBUTE}="true">'
+        f'<rect x="2" y="2" width="{width - 4}" height="{height - 4}" rx="8" fill="{PLACEHOLDER_FILL_COLOR}" '
+        f'stroke="{PLACEHOLDER_BORDER_COLOR}" stroke-width="2" stroke-dasharray="6 4"/>'
+        f'<text x="{width / 2}" y="{height / 2}" font-family="Helvetica, Arial, sans-serif" font-size="{font_size:.1f}" '
+        f'fill="{PLACEHOLDER_TEXT_COLOR}" text-anchor="middle" dominant-baseline="central">{html.escape(label, quote=True)}</text>'
+        "</svg>"
+    ).encode("utf-8")
+
+
+def is_placeholder_svg(logo_svg_bytes):
+    return PLACEHOLDER_ATTRIBUTE.encode("utf-8") in logo_svg_bytes
+
+
+def write_placeholder_logo(logos_dir, tool_config):
+    """
+    Writes a placeholder badge as the logo for a tool, labelled with the tool's label (or name).
+    """
+    tool_name_slug = utils.slugify(tool_config.get("name"))
+    placeholder_path = os.path.join(logos_dir, f"{tool_name_slug}.svg")
+    utils.write_file_atomically(placeholder_path, create_placeholder_svg(tool_config.get("label", tool_config.get("name"))))
+    logging.debug(f"Placeholder logo written to {placeholder_path}")
+
+
+class MissingLogoReport:
+    """
+    Report of the tools whose logos couldn't be found in a non-interactive run, and so were given placeholder logos.
+    Each entry records the config file the tool came from and the URLs which were tried, so every missing logo can be
+    resolved interactively later, in one pass, with the `resolve` subcommand.
+
+    Stored as JSON, keyed by tool name slug; the file is removed once every logo in it has been resolved.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tools = {}
+        self._dirty = False
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as file:
+                    self.tools = json.load(file).get("tools", {})
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable missing logos report {path}: {e}")
+
+    def __contains__(self, tool_name_slug):
+        return tool_name_slug in self.tools
+
+    def __len__(self):
+        return len(self.tools)
+
+    def add(self, config_filepath, tool_config, urls_tried):
+        tool_name = tool_config.get("name")
+        self.tools[utils.slugify(tool_name)] = {
+            "name": tool_name,
+            "label": tool_config.get("label", tool_name),
+            "config": config_filepath,
+            "urls_tried": urls_tried,
+        }
+        self._dirty = True
+
+    def remove(self, tool_name_slug):
+        if self.tools.pop(tool_name_slug, None) is not None:
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        if self.tools:
+            content = json.dumps({"tools": self.tools}, indent=2, sort_keys=True)
+            utils.write_file_atomically(self.path, content.encode("utf-8"))
+            logging.info(f"Missing logos report with {len(self.tools)} tools written to {self.path}")
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+            logging.info(f"Every missing logo is resolved, removed {self.path}")
+        self._dirty = False
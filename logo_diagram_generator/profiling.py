@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextlib
+
+from logo_diagram_generator import utils
+
+PROFILE_REPORT_VERSION = 1
+
+
+def peak_rss_bytes():
+    """
+    Returns the peak resident set size of this process so far, in bytes, or None where the platform doesn't report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, but kilobytes everywhere else
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def read_io_counters(per_thread=False):
+    """
+    Returns (bytes read, bytes written) by this process or the calling thread so far, counting every read and write
+    call (files and sockets alike), or (None, None) where /proc isn't available.
+    :param per_thread: Count only the calling thread, so concurrent stages in other threads don't skew the numbers.
+    """
+    try:
+        with open("/proc/thread-self/io" if per_thread else "/proc/self/io", "r") as file:
+            counters = dict(line.split(":", 1) for line in file.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def subtract(end, start):
+    return None if end is None or start is None else end - start
+
+
+class Profiler:
+    """
+    Records the wall time, peak RSS and bytes read and written for each stage of a run, e.g. config load, downloading,
+    layout, embedding and rasterization, plus each tool within downloading and embedding.
+
+    Stages are recorded with the stage() context manager and can be nested; nested stages name their parent stage.
+    Top-level stages count the I/O of the whole process, while nested stages count only their own thread's I/O, so
+    per-tool numbers stay accurate when tools are downloaded concurrently. Peak RSS is the process high-water mark at
+    the end of the stage.
+
+    A disabled profiler records nothing, so stages can be instrumented unconditionally at negligible cost.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.records = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def stage(self, name, **attributes):
+        """
+        Records one stage, e.g. `with profiler.stage("embed_logo", tool="kubernetes"):`.
+        :param name: The stage name.
+        :param attributes: Extra JSON-serializable fields to include in the stage's record, e.g. the tool name.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        parent_stack = getattr(self._local, "stack", None)
+        if parent_stack is None:
+            parent_stack = self._local.stack = []
+        # Stages started in a worker thread belong to the stage which was running when the worker was started
+        parent = parent_stack[-1] if parent_stack else getattr(self._local, "inherited_parent", None)
+
+        record = {"stage": name, **attributes, "parent": parent, "status": "ok"}
+        per_thread = parent is not None
+        start_read, start_written = read_io_counters(per_thread=per_thread)
+        start = time.perf_counter()
+        parent_stack.append(name)
+        try:
+            yield
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            parent_stack.pop()
+            end_read, end_written = read_io_counters(per_thread=per_thread)
+            record["start_seconds"] = round(start - self._start, 6)
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            record["peak_rss_bytes"] = peak_rss_bytes()
+            record["read_bytes"] = subtract(end_read, start_read)
+            record["written_bytes"] = subtract(end_written, start_written)
+            with self._lock:
+                self.records.append(record)
+            logging.debug(f"Stage {name} took {record['seconds']:.3f}s")
+
+    def current_stage(self):
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else getattr(self._local, "inherited_parent", None)
+
+    def wrap(self, function):
+        """
+        Wraps a function to be run in another thread (e.g. by an executor), so stages it records are nested under the
+        stage which is current in the calling thread.
+        """
+        if not self.enabled:
+            return function
+        parent = self.current_stage()
+
+        def run_in_parent_stage(*args, **kwargs):
+            self._local.inherited_parent = parent
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._local.inherited_parent = None
+
+        return run_in_parent_stage
+
+    def report(self):
+        """
+        Returns the recorded stages as a JSON-serializable dict, with the stages ordered by start time and a total per
+        top-level stage name.
+        """
+        with self._lock:
+            stages = sorted(self.records, key=lambda record: record["start_seconds"])
+
+        totals = {}
+        for record in stages:
+            if record["parent"] is None:
+                totals[record["stage"]] = round(totals.get(record["stage"], 0.0) + record["seconds"], 6)
+
+        return {
+            "version": PROFILE_REPORT_VERSION,
+            "pid": os.getpid(),
+            "total_seconds": round(time.perf_counter() - self._start, 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "stage_seconds": totals,
+            "stages": stages,
+        }
+
+    def write_report(self, report_path):
+        utils.write_file_atomically(report_path, json.dumps(self.report(), indent=2).encode("utf-8"))
+        logging.info(f"Profile report written to {report_path}")
+
+
+# Used wherever no profiler is passed in, so instrumented code never has to check for one
+null_profiler = Profiler(enabled=False)
@@ -0,0 +1,399 @@
+import html
+import math
+import logging
+
+from logo_diagram_generator import logo_fragments, utils
+
+# Value of the diagramEngine style option which selects this layout instead of a Graphviz engine
+ENGINE_NAME = "radial-native"
+
+# Tool and style keys which only affect logos with the Graphviz engines, but size each tool's node in this layout
+LAYOUT_TOOL_KEYS = ("scale",)
+LAYOUT_STYLE_KEYS = ("defaultLogoScale",)
+
+POINTS_PER_INCH = 72
+
+# Minimum space between any two nodes, in points
+NODE_GAP = 18
+
+# Average width of a character and height of a line of text, relative to the font size, for sizing group labels
+# without measuring the text with a font
+CHARACTER_WIDTH = 0.6
+LINE_HEIGHT = 1.2
+
+# Graphviz's defaults for node labels and arrowheads, so the text-only diagram looks like one Graphviz rendered
+NODE_FONTNAME = "Times,serif"
+NODE_FONTSIZE = 14
+ARROW_LENGTH = 10
+ARROW_HALF_WIDTH = 3.5
+
+# Group label shapes drawn as an ellipse, rather than a box
+ELLIPSE_SHAPES = ("ellipse", "oval", "circle")
+
+
+# html.escape rather than xml.sax.saxutils, which imports urllib.request (and with it http.client, email and ssl)
+def escape(value):
+    return html.escape(value, quote=False)
+
+
+def quoteattr(value):
+    return f'"{html.escape(value, quote=True)}"'
+
+
+class Node:
+    """
+    A node of the diagram: its kind (central, label or tool), its centre, the half width and half height of its
+    bounding box, and whether its outline, where edges meet it, is an ellipse or a box.
+    """
+
+    def __init__(self, name, label, kind, rx, ry, outline, color):
+        self.name = name
+        self.label = label
+        self.kind = kind
+        self.rx = rx
+        self.ry = ry
+        self.outline = outline
+        self.color = color
+        self.x = 0.0
+        self.y = 0.0
+
+    def box(self, gap=0):
+        return (self.x - self.rx - gap / 2, self.y - self.ry - gap / 2, self.x + self.rx + gap / 2, self.y + self.ry + gap / 2)
+
+    def boundary_point(self, towards_x, towards_y):
+        """
+        :return: The point where a straight line from the node's centre towards the given point crosses its outline.
+        """
+        dx, dy = towards_x - self.x, towards_y - self.y
+        if dx == 0 and dy == 0:
+            return self.x, self.y
+        if self.outline == "ellipse":
+            t = 1 / math.hypot(dx / self.rx, dy / self.ry)
+        else:
+            t = min(self.rx / abs(dx) if dx else math.inf, self.ry / abs(dy) if dy else math.inf)
+        return self.x + dx * t, self.y + dy * t
+
+
+class SpatialGrid:
+    """
+    Uniform grid over the diagram, holding the bounding box of every placed node in each cell the box overlaps.
+    Checking a new node for collisions then only compares it with the nodes in the few cells it covers, rather than
+    with every node, so placing n nodes takes O(n) time rather than O(n^2).
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cells_covering(self, box):
+        min_x, min_y, max_x, max_y = box
+        for i in range(math.floor(min_x / self.cell_size), math.floor(max_x / self.cell_size) + 1):
+            for j in range(math.floor(min_y / self.cell_size), math.floor(max_y / self.cell_size) + 1):
+                yield i, j
+
+    def collides(self, box):
+        for cell in self.cells_covering(box):
+            for other in self.cells.get(cell, ()):
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    return True
+        return False
+
+    def insert(self, box):
+        for cell in self.cells_covering(box):
+            self.cells.setdefault(cell, []).append(box)
+
+
+def place_node(grid, node, radius, angle):
+    """
+    Places a node at the given polar position around the central tool, then moves it outwards along the same angle
+    until it no longer overlaps any node already in the grid, and adds it to the grid.
+    :return: The radius the node was placed at.
+    """
+    step = max(min(node.rx, node.ry), NODE_GAP)
+    while True:
+        node.x, node.y = radius * math.cos(angle), radius * math.sin(angle)
+        if not grid.collides(node.box(NODE_GAP)):
+            grid.insert(node.box(NODE_GAP))
+            return radius
+        radius += step
+
+
+def extent_along(node, angle):
+    """
+    :return: Tuple of (radial, tangential) extent of the node's bounding box, at the given angle around the centre.
+    """
+    cos_angle, sin_angle = abs(math.cos(angle)), abs(math.sin(angle))
+    return 2 * (node.rx * cos_angle + node.ry * sin_angle), 2 * (node.rx * sin_angle + node.ry * cos_angle)
+
+
+def label_lines(group_category):
+    # Long group names are split onto two lines at the first space, as with the Graphviz engines
+    if len(group_category) > 15:
+        return group_category.replace(" ", "\n", 1).split("\n")
+    return [group_category]
+
+
+def compute_radial_layout(config, logo_sizes=None):
+    """
+    Lays out the diagram as a hub and spokes directly from its structure, without Graphviz: the central tool is at the
+    centre, each group gets an angular sector in proportion to its number of tools with its label on a ring around the
+    central tool, and the group's tools fan out beyond its label in rings across its sector. Each tool's node is sized
+    to its logo (at the tool's scale), so rings are spaced by the logos they actually hold. Any nodes which still
+    overlap, e.g. wide labels of neighbouring groups with few tools, are pushed outwards using a spatial grid.
+    :param logo_sizes: Optional dict of tool name slug -> (width, height) each logo is drawn at before scaling, from
+        logo_index.fitted_logo_sizes; tools without one are sized to the nominal logo box.
+    :return: Tuple of (nodes, edges): a dict of node name -> Node, in drawing order, and a list of
+        (edge id, tail node name, head node name, color, has arrowhead) tuples. Coordinates are in points, with y down.
+    """
+    ecosystem = config["ecosystem"]
+    ecosystem_style = ecosystem.get("style", {})
+    color_palette = ecosystem_style.get("colorPalette", utils.visually_distinct_colors)
+    group_label_fontsize = float(ecosystem_style.get("groupLabelFontsize", 25))
+    group_label_margin = float(ecosystem_style.get("groupLabelMargin", 0.2)) * POINTS_PER_INCH
+    group_label_outline = "ellipse" if ecosystem_style.get("groupLabelShape", "box") in ELLIPSE_SHAPES else "box"
+    # An ellipse through the corners of the label's box, as Graphviz draws elliptical nodes around their labels
+    group_label_scale = math.sqrt(2) if group_label_outline == "ellipse" else 1
+
+    def logo_extents(tool_config):
+        logo_scale = float(logo_fragments.resolve_logo_style(tool_config, ecosystem_style)[0])
+        logo_width, logo_height = (logo_sizes or {}).get(
+            utils.slugify(tool_config.get("name")), (logo_fragments.LOGO_WIDTH, logo_fragments.LOGO_HEIGHT)
+        )
+        return logo_width * logo_scale / 2, logo_height * logo_scale / 2
+
+    central_tool = ecosystem["centralTool"]
+    central_tool_name = central_tool["name"]
+    central_tool_margin = float(central_tool.get("margin", 0.5)) * POINTS_PER_INCH
+    central_rx, central_ry = logo_extents(central_tool)
+    central_node = Node(
+        central_tool_name,
+        central_tool.get("label", central_tool_name),
+        "central",
+        central_rx + central_tool_margin,
+        central_ry + central_tool_margin,
+        "ellipse",
+        "black",
+    )
+    nodes = {central_tool_name: central_node}
+    edges = []
+
+    groups = ecosystem.get("groups") or []
+    label_nodes = []
+    for i, group in enumerate(groups):
+        group_slug = utils.slugify(group["category"])
+        lines = label_lines(group["category"])
+        label_node = Node(
+            f"label_{group_slug}",
+            "\n".join(lines),
+            "label",
+            (max(len(line) for line in lines) * CHARACTER_WIDTH * group_label_fontsize / 2 + group_label_margin) * group_label_scale,
+            (len(lines) * LINE_HEIGHT * group_label_fontsize / 2 + group_label_margin) * group_label_scale,
+            group_label_outline,
+            group.get("color", color_palette[i % len(color_palette)]),
+        )
+        label_nodes.append(label_node)
+
+    tool_extents = [logo_extents(tool) for group in groups for tool in group.get("tools") or []]
+    cell_size = 2 * max([max(extents) for extents in tool_extents] + [NODE_GAP]) + NODE_GAP
+    grid = SpatialGrid(cell_size)
+    grid.insert(central_node.box(NODE_GAP))
+
+    # Each group's sector is in proportion to its number of tools, starting at the top and going clockwise
+    weights = [max(len(group.get("tools") or []), 1) for group in groups]
+    total_weight = sum(weights)
+    sectors = []
+    sector_start = -math.pi / 2
+    for weight in weights:
+        sector_angle = 2 * math.pi * weight / total_weight
+        sectors.append((sector_start, sector_angle))
+        sector_start += sector_angle
+
+    # The labels' ring is far enough out to clear the central tool, and long enough to fit every label side by side
+    label_radii = [math.hypot(label_node.rx, label_node.ry) for label_node in label_nodes]
+    label_ring_radius = max(
+        math.hypot(central_node.rx, central_node.ry) + NODE_GAP + max(label_radii, default=0),
+        sum(2 * label_radius + NODE_GAP for label_radius in label_radii) / (2 * math.pi),
+    )
+
+    placed_label_radii = []
+    for label_node, (sector_start, sector_angle) in zip(label_nodes, sectors):
+        placed_label_radii.append(place_node(grid, label_node, label_ring_radius, sector_start + sector_angle / 2))
+        nodes[label_node.name] = label_node
+        edges.append((f"{central_tool_name}-{label_node.name}-edge", central_tool_name, label_node.name, label_node.color, False))
+
+    for group, label_node, label_radius, (sector_start, sector_angle) in zip(groups, label_nodes, placed_label_radii, sectors):
+        sector_middle = sector_start + sector_angle / 2
+        group_tools = []
+        for tool in group.get("tools") or []:
+            tool_label = tool.get("label", tool["name"])
+            edges.append((f"{label_node.name}-{tool_label}-edge", label_node.name, tool_label, label_node.color, True))
+            # A label used by more than one tool is a single node, as in Graphviz, placed with the first tool using it
+            if tool_label not in nodes:
+                # Edges end at the box the logo will fill, rather than the ellipse drawn in the text-only diagram
+                nodes[tool_label] = Node(tool_label, tool_label, "tool", *logo_extents(tool), "box", label_node.color)
+                group_tools.append(nodes[tool_label])
+        if not group_tools:
+            continue
+
+        # Rings are spaced by the group's largest logo, measured along and across the sector's middle
+        tool_radial_extent, tool_tangential_extent = (
+            max(values) for values in zip(*(extent_along(tool_node, sector_middle) for tool_node in group_tools))
+        )
+        label_radial_extent = extent_along(label_node, sector_middle)[0]
+        ring_radius = label_radius + (label_radial_extent + tool_radial_extent) / 2 + NODE_GAP
+        remaining_tools = group_tools
+        while remaining_tools:
+            capacity = max(int(sector_angle * ring_radius / (tool_tangential_extent + NODE_GAP)), 1)
+            ring_tools, remaining_tools = remaining_tools[:capacity], remaining_tools[capacity:]
+            # A partly filled ring is centred in the sector
+            slot_angle = sector_angle / capacity
+            for slot, tool_node in enumerate(ring_tools):
+                place_node(grid, tool_node, ring_radius, sector_middle + (slot - (len(ring_tools) - 1) / 2) * slot_angle)
+            ring_radius += tool_radial_extent + NODE_GAP
+
+    logging.info(f"Computed {ENGINE_NAME} layout of {len(nodes)} nodes in {len(groups)} groups")
+    return nodes, edges
+
+
+def format_number(value):
+    return f"{value:.2f}"
+
+
+def format_points(points):
+    return " ".join(f"{format_number(x)},{format_number(y)}" for x, y in points)
+
+
+def ellipse_element(node, stroke_attributes):
+    return (
+        f'<ellipse {stroke_attributes} cx="{format_number(node.x)}" cy="{format_number(node.y)}" '
+        f'rx="{format_number(node.rx)}" ry="{format_number(node.ry)}"/>'
+    )
+
+
+def label_node_outline(node, shape, style, stroke_attributes):
+    """
+    :return: The SVG element drawing a group label node's outline, for its Graphviz shape and style, or "" if none.
+    """
+    min_x, min_y, max_x, max_y = node.box()
+    if shape in ("plaintext", "plain", "none") or "invis" in style:
+        return ""
+    if node.outline == "ellipse":
+        return ellipse_element(node, stroke_attributes)
+    if "rounded" in style:
+        radius = min(node.rx, node.ry, 6)
+        return (
+            f'<rect {stroke_attributes} x="{format_number(min_x)}" y="{format_number(min_y)}" width="{format_number(max_x - min_x)}" '
+            f'height="{format_number(max_y - min_y)}" rx="{format_number(radius)}"/>'
+        )
+    corners = [(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y), (min_x, min_y)]
+    return f'<polygon {stroke_attributes} points="{format_points(corners)}"/>'
+
+
+def text_elements(node, fontname, fontsize, fontcolor=None):
+    lines = node.label.split("\n")
+    fill = f" fill={quoteattr(fontcolor)}" if fontcolor else ""
+    elements = []
+    for line_index, line in enumerate(lines):
+        # Baselines sit a third of the font size below each line's centre, centring the lines on the node vertically
+        y = node.y + (line_index - (len(lines) - 1) / 2) * LINE_HEIGHT * fontsize + fontsize / 3
+        elements.append(
+            f'<text text-anchor="middle" x="{format_number(node.x)}" y="{format_number(y)}" font-family={quoteattr(fontname)} '
+            f'font-size="{format_number(fontsize)}"{fill}>{escape(line)}</text>'
+        )
+    return "\n".join(elements)
+
+
+def render_radial_svg(config, diagram_name, logo_sizes=None):
+    """
+    Lays out the diagram with compute_radial_layout and renders it as a text-only SVG shaped like Graphviz's: the top
+    level graph element has the diagram name as its ID, and every node's <g> element has the node's name as its ID,
+    with the same IDs for edges and group clusters, and each tool's node holds an <ellipse> centred on the tool. Logos
+    are embedded into it exactly as into a diagram Graphviz rendered.
+    :param logo_sizes: Optional dict of logo sizes to size tool nodes to, as for compute_radial_layout.
+    :return: The rendered SVG, as bytes.
+    """
+    ecosystem_style = config["ecosystem"].get("style", {})
+    diagram_padding = float(ecosystem_style.get("diagramPadding", 0.5)) * POINTS_PER_INCH
+    diagram_background_color = ecosystem_style.get("diagramBackgroundColor", "#ffffff")
+    group_label_shape = ecosystem_style.get("groupLabelShape", "box")
+    group_label_style = ecosystem_style.get("groupLabelStyle", "rounded")
+    group_label_fontname = ecosystem_style.get("groupLabelFontname", "Helvetica")
+    group_label_fontcolor = ecosystem_style.get("groupLabelFontcolor", "#333333")
+    group_label_fontsize = float(ecosystem_style.get("groupLabelFontsize", 25))
+
+    nodes, edges = compute_radial_layout(config, logo_sizes)
+
+    # Nodes are moved so the diagram's top left corner is at the origin, inside the padding
+    boxes = [node.box() for node in nodes.values()]
+    min_x, min_y = min(box[0] for box in boxes), min(box[1] for box in boxes)
+    width, height = max(box[2] for box in boxes) - min_x, max(box[3] for box in boxes) - min_y
+    for node in nodes.values():
+        node.x -= min_x
+        node.y -= min_y
+    svg_width, svg_height = width + 2 * diagram_padding, height + 2 * diagram_padding
+
+    background_corners = [
+        (-diagram_padding, -diagram_padding),
+        (width + diagram_padding, -diagram_padding),
+        (width + diagram_padding, height + diagram_padding),
+        (-diagram_padding, height + diagram_padding),
+    ]
+    elements = [f'<polygon fill={quoteattr(diagram_background_color)} stroke="none" points="{format_points(background_corners)}"/>']
+    for group in config["ecosystem"].get("groups") or []:
+        cluster_name = f"cluster_{utils.slugify(group['category'])}"
+        elements.append(f'<g id={quoteattr(cluster_name)} class="cluster">\n<title>{escape(cluster_name)}</title>\n</g>')
+
+    # Edges are drawn before nodes, so group labels are on top of the edges leading to them
+    for edge_id, tail_name, head_name, color, has_arrowhead in edges:
+        tail, head = nodes[tail_name], nodes[head_name]
+        start = tail.boundary_point(head.x, head.y)
+        end = head.boundary_point(tail.x, tail.y)
+        stroke = quoteattr(color)
+        edge_elements = [f'<g id={quoteattr(edge_id)} class="edge">', f"<title>{escape(tail_name)}&#45;&gt;{escape(head_name)}</title>"]
+        length = math.hypot(end[0] - start[0], end[1] - start[1])
+        if has_arrowhead and length > ARROW_LENGTH:
+            ux, uy = (end[0] - start[0]) / length, (end[1] - start[1]) / length
+            base = (end[0] - ux * ARROW_LENGTH, end[1] - uy * ARROW_LENGTH)
+            edge_elements.append(f'<path fill="none" stroke={stroke} d="M{format_points([start])}L{format_points([base])}"/>')
+            arrowhead = [
+                (base[0] - uy * ARROW_HALF_WIDTH, base[1] + ux * ARROW_HALF_WIDTH),
+                end,
+                (base[0] + uy * ARROW_HALF_WIDTH, base[1] - ux * ARROW_HALF_WIDTH),
+            ]
+            edge_elements.append(f'<polygon fill={stroke} stroke={stroke} points="{format_points(arrowhead + arrowhead[:1])}"/>')
+        else:
+            edge_elements.append(f'<path fill="none" stroke={stroke} d="M{format_points([start])}L{format_points([end])}"/>')
+        edge_elements.append("</g>")
+        elements.append("\n".join(edge_elements))
+
+    for node in nodes.values():
+        node_elements = [f'<g id={quoteattr(node.name)} class="node">', f"<title>{escape(node.name)}</title>"]
+        stroke_attributes = f'fill="none" stroke={quoteattr(node.color)}'
+        if node.kind == "label":
+            if "filled" in group_label_style:
+                stroke_attributes = f"fill={quoteattr(node.color)} stroke={quoteattr(node.color)}"
+            if "dashed" in group_label_style:
+                stroke_attributes += ' stroke-dasharray="5,2"'
+            elif "dotted" in group_label_style:
+                stroke_attributes += ' stroke-dasharray="1,5"'
+            outline = label_node_outline(node, group_label_shape, group_label_style, stroke_attributes)
+            if outline:
+                node_elements.append(outline)
+            node_elements.append(text_elements(node, group_label_fontname, group_label_fontsize, group_label_fontcolor))
+        else:
+            node_elements.append(ellipse_element(node, stroke_attributes))
+            node_elements.append(text_elements(node, NODE_FONTNAME, NODE_FONTSIZE))
+        node_elements.append("</g>")
+        elements.append("\n".join(node_elements))
+
+    logging.info(f"Rendered {ENGINE_NAME} diagram of {format_number(svg_width)}x{format_number(svg_height)} points")
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        f'<svg width="{round(svg_width)}pt" height="{round(svg_height)}pt" '
+        f'viewBox="0.00 0.00 {format_number(svg_width)} {format_number(svg_height)}" '
+        'xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">\n'
+        f'<g id={quoteattr(diagram_name)} class="graph" '
+        f'transform="translate({format_number(diagram_padding)} {format_number(diagram_padding)})">\n'
+        + "\n".join(elements)
+        + "\n</g>\n</svg>\n"
+    ).encode("utf-8")
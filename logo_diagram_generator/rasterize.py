@@ -0,0 +1,297 @@
+import io
+import os
+import copy
+import zlib
+import struct
+import logging
+import functools
+
+from logo_diagram_generator import profiling
+
+# Raster formats which can be written, and the file extension for each. PNG is rendered by cairo, and the others are
+# converted from the rendered PNG with Pillow
+IMAGE_FORMATS = ("png", "webp", "jpeg")
+IMAGE_EXTENSIONS = {"png": "png", "webp": "webp", "jpeg": "jpg"}
+IMAGE_FORMAT_ALIASES = {"jpg": "jpeg"}
+DEFAULT_IMAGE_FORMATS = ("png",)
+
+# Quality of the lossy formats (WebP and JPEG), from 1 to 100
+DEFAULT_IMAGE_QUALITY = 90
+
+# JPEG has no alpha channel, so transparent areas (e.g. without a diagramBackgroundColor) are flattened onto white
+JPEG_BACKGROUND_COLOR = (255, 255, 255)
+
+# Rows per strip in tiled rasterization; a 12,000 pixel wide strip of 256 rows is a 12MB surface, rather than the ~900MB
+# surface of a whole 12,000x18,000 render
+DEFAULT_TILE_HEIGHT = 256
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_COLOR_TYPE_RGBA = 6
+PNG_FILTER_UP = b"\x02"
+PNG_COMPRESSION_LEVEL = 6
+
+
+def parse_widths(widths):
+    """
+    :param widths: A width, a list of widths, or a comma separated string of widths, e.g. "3000,6000,400".
+    :return: The widths as a list of ints, without duplicates, in the order given.
+    :raises ValueError: If a width isn't a positive integer, or there are none.
+    """
+    if isinstance(widths, str):
+        widths = widths.split(",")
+    elif isinstance(widths, int):
+        widths = [widths]
+
+    parsed_widths = []
+    for width in widths:
+        width = int(width)
+        if width <= 0:
+            raise ValueError(f"Image widths must be positive, got {width}")
+        if width not in parsed_widths:
+            parsed_widths.append(width)
+    if not parsed_widths:
+        raise ValueError("At least one image width is required")
+    return parsed_widths
+
+
+def parse_image_formats(image_formats):
+    """
+    :param image_formats: A list of image formats, or a comma separated string of them, e.g. "png,webp".
+    :return: The formats as a list of names from IMAGE_FORMATS, without duplicates, in the order given.
+    :raises ValueError: If a format isn't supported, or there are none.
+    """
+    if isinstance(image_formats, str):
+        image_formats = image_formats.split(",")
+
+    parsed_formats = []
+    for image_format in image_formats:
+        image_format = image_format.strip().lower()
+        image_format = IMAGE_FORMAT_ALIASES.get(image_format, image_format)
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format {image_format}, choose from {', '.join(IMAGE_FORMATS)}")
+        if image_format not in parsed_formats:
+            parsed_formats.append(image_format)
+    if not parsed_formats:
+        raise ValueError("At least one image format is required")
+    return parsed_formats
+
+
+def image_output_path(output_svg_path, width, image_format, primary_width):
+    """
+    Images at the primary (first) width are named after the SVG, e.g. diagram_logos.png, and images at other widths
+    include the width, e.g. diagram_logos_400w.png.
+    """
+    basename = os.path.splitext(output_svg_path)[0]
+    width_suffix = "" if width == primary_width else f"_{width}w"
+    return f"{basename}{width_suffix}.{IMAGE_EXTENSIONS[image_format]}"
+
+
+def parse_svg(svg_content):
+    from cairosvg.parser import Tree
+
+    return Tree(bytestring=svg_content)
+
+
+def copy_svg_tree(node, parent=None):
+    """
+    Copies a parsed cairosvg tree for one render. Rendering modifies the tree's nodes (e.g. masks and patterns are
+    rewritten into groups in place), so every render needs its own copy; only the nodes are copied, sharing the parsed
+    XML and resolved styles, which is far cheaper than parsing again.
+    """
+    node_copy = copy.copy(node)
+    if parent is not None:
+        node_copy.parent = parent
+    node_copy.children = [copy_svg_tree(child, node_copy) for child in node.children]
+    return node_copy
+
+
+def render_png(svg_tree, width):
+    """
+    Renders a parsed SVG tree to PNG at the given width, keeping its aspect ratio, like cairosvg.svg2png.
+    """
+    from cairosvg.surface import PNGSurface
+
+    output = io.BytesIO()
+    surface = PNGSurface(copy_svg_tree(svg_tree), output, 96, output_width=width)
+    surface.finish()
+    return output.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
+def strip_surface_class():
+    # Created on first use, as cairosvg (and the cairo library) is only imported once something is rasterized
+    from cairosvg.surface import PNGSurface, cairo
+
+    class StripSurface(PNGSurface):
+        """
+        A PNGSurface which only allocates the rows from strip_top to strip_top + strip_height of the full size image.
+        Drawing is shifted up by a device offset, so cairo clips away everything outside the strip, and the pixels which
+        are drawn are exactly those of the same rows in a full render.
+        """
+
+        def __init__(self, tree, output, dpi, strip_top, strip_height, **kwargs):
+            self.strip_top = strip_top
+            self.strip_height = strip_height
+            super().__init__(tree, output, dpi, **kwargs)
+
+        def _create_surface(self, width, height):
+            width = int(round(width))
+            height = int(round(height))
+            strip_height = max(min(self.strip_height, height - self.strip_top), 1)
+            cairo_surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, strip_height)
+            cairo_surface.set_device_offset(0, -self.strip_top)
+            # The full size is returned, as drawing uses it to resolve percentages and aspect ratios
+            return cairo_surface, width, height
+
+    return StripSurface
+
+
+class PngStripWriter:
+    """
+    Writes an 8-bit RGBA PNG to a binary file a strip of rows at a time, compressing each strip as it's written, so the
+    whole image is never held in memory uncompressed.
+
+    Rows use PNG's Up filter (each byte stored as its difference from the byte above), which Pillow computes for a whole
+    strip in C, and which compresses the large flat areas of a diagram far better than unfiltered rows.
+    """
+
+    def __init__(self, output_file, width, height):
+        self.output_file = output_file
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.previous_row = None
+        self.compressor = zlib.compressobj(PNG_COMPRESSION_LEVEL)
+
+        output_file.write(PNG_SIGNATURE)
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, PNG_COLOR_TYPE_RGBA, 0, 0, 0))
+
+    def write_chunk(self, chunk_type, data):
+        self.output_file.write(struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data)))
+
+    def write_strip(self, strip):
+        """
+        :param strip: A Pillow RGBA image of the next rows, as wide as the PNG.
+        """
+        from PIL import Image, ImageChops
+
+        # The rows above each row of the strip: the last row of the previous strip, then all but the strip's last row.
+        # The row above the first row of the image is all zeros, as the PNG spec defines.
+        rows_above = Image.new("RGBA", strip.size)
+        if self.previous_row is not None:
+            rows_above.paste(self.previous_row, (0, 0))
+        rows_above.paste(strip.crop((0, 0, strip.width, strip.height - 1)), (0, 1))
+        self.previous_row = strip.crop((0, strip.height - 1, strip.width, strip.height))
+
+        filtered = ImageChops.subtract_modulo(strip, rows_above).tobytes()
+        row_size = strip.width * 4
+        scanlines = b"".join(PNG_FILTER_UP + filtered[offset : offset + row_size] for offset in range(0, len(filtered), row_size))
+        compressed = self.compressor.compress(scanlines)
+        if compressed:
+            self.write_chunk(b"IDAT", compressed)
+        self.rows_written += strip.height
+
+    def close(self):
+        if self.rows_written != self.height:
+            raise ValueError(f"PNG has {self.height} rows but {self.rows_written} were written")
+        self.write_chunk(b"IDAT", self.compressor.flush())
+        self.write_chunk(b"IEND", b"")
+
+
+def render_png_tiled(svg_tree, width, output_file, tile_height=DEFAULT_TILE_HEIGHT):
+    """
+    Renders a parsed SVG tree to PNG at the given width like render_png, but one horizontal strip of tile_height rows
+    at a time, streaming each strip into the PNG as it's rendered. Peak memory is therefore bounded by the strip size
+    rather than the image size, at the cost of drawing the SVG once per strip. The pixels are identical to render_png's,
+    though the encoded bytes differ, as the PNG is compressed differently.
+    :param output_file: Binary file object to write the PNG to.
+    """
+    from PIL import Image
+
+    png_writer = None
+    strip_top = 0
+    while png_writer is None or strip_top < png_writer.height:
+        strip_png = io.BytesIO()
+        surface = strip_surface_class()(copy_svg_tree(svg_tree), strip_png, 96, strip_top, tile_height, output_width=width)
+        surface.finish()
+        if png_writer is None:
+            png_writer = PngStripWriter(output_file, surface.width, surface.height)
+
+        # cairo's surfaces hold premultiplied alpha; letting cairo encode each strip un-premultiplies it exactly as a
+        # full render would, so decoding that gives the same pixel values
+        strip = Image.open(io.BytesIO(strip_png.getvalue())).convert("RGBA")
+        png_writer.write_strip(strip)
+        strip_top += strip.height
+
+    png_writer.close()
+
+
+def convert_png(png_content, image_format, quality=DEFAULT_IMAGE_QUALITY):
+    """
+    Converts a rendered PNG to another image format.
+    """
+    if image_format == "png":
+        return png_content
+
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(png_content))
+    if image_format == "jpeg":
+        image = image.convert("RGBA")
+        flattened_image = Image.new("RGB", image.size, JPEG_BACKGROUND_COLOR)
+        flattened_image.paste(image, mask=image.getchannel("A"))
+        image = flattened_image
+
+    output = io.BytesIO()
+    image.save(output, format=image_format.upper(), quality=quality)
+    return output.getvalue()
+
+
+def rasterize_svg(
+    svg_content,
+    widths,
+    image_formats=DEFAULT_IMAGE_FORMATS,
+    quality=DEFAULT_IMAGE_QUALITY,
+    max_workers=None,
+    tile_height=None,
+    profiler=None,
+):
+    """
+    Rasterizes an SVG at several widths, in several formats, parsing it only once. Each width is rendered and converted
+    to every format in its own thread; cairo and Pillow release the GIL while drawing and encoding, so the widths are
+    rendered in parallel.
+    :param svg_content: The SVG, as bytes.
+    :param widths: The widths to render, in pixels.
+    :param image_formats: The formats to write each width in, from IMAGE_FORMATS.
+    :param quality: Quality for the lossy formats, from 1 to 100.
+    :param max_workers: Maximum number of widths to render at once (default: one thread per width, up to the CPU count).
+    :param tile_height: If set, render each width in strips of this many rows with render_png_tiled, bounding memory use
+        by the strip size. Converting to WebP or JPEG still needs the whole image in memory.
+    :param profiler: Optional profiling.Profiler to record parsing and each width's rendering in.
+    :return: A dict of (width, image format) -> image bytes.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if profiler is None:
+        profiler = profiling.null_profiler
+
+    with profiler.stage("parse_svg"):
+        svg_tree = parse_svg(svg_content)
+
+    def render_width(width):
+        with profiler.stage("rasterize_width", width=width):
+            if tile_height:
+                png_file = io.BytesIO()
+                render_png_tiled(svg_tree, width, png_file, tile_height)
+                png_content = png_file.getvalue()
+            else:
+                png_content = render_png(svg_tree, width)
+            return {(width, image_format): convert_png(png_content, image_format, quality) for image_format in image_formats}
+
+    images = {}
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(widths), os.cpu_count() or 1)) as executor:
+        for width_images in executor.map(profiler.wrap(render_width), widths):
+            images.update(width_images)
+
+    logging.info(f"Rasterized SVG at widths {', '.join(str(width) for width in widths)} as {', '.join(image_formats)}")
+    return images
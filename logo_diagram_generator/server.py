@@ -0,0 +1,469 @@
+import io
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urlsplit
+
+from logo_diagram_generator import build_manifest, generate_diagram, layout_cache
+from logo_diagram_generator import logo_index, logo_pack, rasterize, stream_embed, svg_optimizer, utils
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Render requests waiting or running at once per worker, beyond which requests are rejected with 503 until some finish
+DEFAULT_PENDING_PER_WORKER = 4
+
+# Largest config accepted in a render request body
+DEFAULT_MAX_REQUEST_BYTES = 1024 * 1024
+
+DEFAULT_RESULT_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_CACHED_RESULTS = 1024
+
+# Number of most recent render latencies the stats endpoint's percentiles are computed over
+LATENCY_WINDOW = 1000
+
+CONTENT_TYPES = {"svg": "image/svg+xml", "png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+DEFAULT_RENDER_WIDTH = 3000
+
+
+class RequestError(Exception):
+    """
+    A render request which can't be served as sent, answered with the given HTTP status and message.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResultCache:
+    """
+    In-memory LRU cache of rendered diagrams (SVG and raster image bytes), keyed by a hash of everything they were
+    rendered from, and bounded by both the number of entries and their total size.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RESULT_CACHE_BYTES, max_entries=DEFAULT_MAX_CACHED_RESULTS):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        # Results bigger than the whole cache would only evict everything else
+        if len(result) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._results:
+                self.total_bytes -= len(self._results.pop(key))
+            self._results[key] = result
+            self.total_bytes += len(result)
+            while self.total_bytes > self.max_bytes or len(self._results) > self.max_entries:
+                _, evicted = self._results.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def __len__(self):
+        return len(self._results)
+
+
+def cache_stats(cache):
+    lookups = cache.hits + cache.misses
+    return {"hits": cache.hits, "misses": cache.misses, "hit_rate": round(cache.hits / lookups, 4) if lookups else None}
+
+
+def percentile(sorted_values, fraction):
+    """
+    :return: The nearest-rank percentile of a sorted list, e.g. fraction 0.99 for the 99th percentile.
+    """
+    if not sorted_values:
+        return None
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+class RenderService:
+    """
+    Renders diagrams for the render server, keeping everything which is expensive to recompute warm in memory between
+    requests: each logo's prepared <symbol> markup (stream_embed.LogoSymbolCache), layouts (layout_cache.LayoutCache),
+    the open logo store and its logos' metadata (logo_index.LogoIndex), and rendered SVGs and images (ResultCache).
+    Renders run on a pool of worker threads sharing these caches; Graphviz runs in its own processes, and cairo and
+    Pillow release the GIL while drawing and encoding.
+
+    At most max_pending renders are queued or running at once, and any request beyond that is rejected straight away
+    rather than queued without bound, so a burst of requests can't exhaust the server's memory.
+    """
+
+    def __init__(
+        self,
+        logos_dir,
+        workers=None,
+        max_pending=None,
+        result_cache_bytes=DEFAULT_RESULT_CACHE_BYTES,
+        layout_cache_dir=None,
+    ):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.logos_dir = logos_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * DEFAULT_PENDING_PER_WORKER
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+        self.pending = threading.BoundedSemaphore(self.max_pending)
+
+        self.result_cache = ResultCache(max_bytes=result_cache_bytes)
+        self.layout_cache = layout_cache.LayoutCache(cache_dir=layout_cache_dir)
+        self.symbol_cache = stream_embed.LogoSymbolCache()
+
+        self._logo_store = None
+        self._logo_store_generation = None
+        self._logo_store_lock = threading.Lock()
+        # Index of the open logo store, and the metadata of each logo measured from it, for sizeNodesToLogos
+        self._logo_index = None
+        self._logos_metadata = {}
+        self._logo_index_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self.started = time.time()
+        self.request_counts = {"ok": 0, "failed": 0, "rejected": 0}
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def logos_generation(self):
+        """
+        :return: The modification times of the logos directory and its pack, which change whenever a logo is added,
+            replaced (e.g. downloaded, as logos are written atomically) or packed.
+        """
+        generation = []
+        for path in (self.logos_dir, os.path.join(self.logos_dir, logo_pack.PACK_FILENAME)):
+            try:
+                generation.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                generation.append(None)
+        return generation
+
+    def logo_store(self):
+        """
+        :return: Tuple of (open logo store, generation), reopening the store if the logos have changed since it was
+            opened. Replaced stores aren't closed, as renders still running may be reading from them; their pack is
+            unmapped once the last of those renders is done with it.
+        """
+        generation = self.logos_generation()
+        with self._logo_store_lock:
+            if self._logo_store is None or generation != self._logo_store_generation:
+                logging.info(f"Opening logos in {self.logos_dir}")
+                self._logo_store = logo_pack.LogoStore(self.logos_dir)
+                self._logo_store_generation = generation
+            return self._logo_store, self._logo_store_generation
+
+    def logo_sizes(self, config, logo_store):
+        """
+        :return: The fitted size of each tool's logo (see logo_index.fitted_logo_sizes) if the config sets
+            sizeNodesToLogos, otherwise None. Each logo is only measured once per logo store, as logos only change
+            when the store is reopened.
+        """
+        if not generate_diagram.sizes_nodes_to_logos(config):
+            return None
+
+        slugs = {utils.slugify(tool_config.get("name")) for tool_config in utils.list_tools(config)}
+        with self._logo_index_lock:
+            if self._logo_index is None or self._logo_index.logo_store is not logo_store:
+                self._logo_index = logo_index.LogoIndex(logo_store)
+                self._logos_metadata = {}
+            new_logos_metadata = {slug: self._logo_index.update_logo(slug) for slug in slugs.difference(self._logos_metadata)}
+            if new_logos_metadata:
+                self._logos_metadata.update(new_logos_metadata)
+                self._logo_index.save()
+                logo_index.warn_about_pathological_logos(new_logos_metadata)
+            return logo_index.fitted_logo_sizes({slug: self._logos_metadata[slug] for slug in slugs})
+
+    def render_svg(self, config, diagram_name, optimize):
+        """
+        :return: Tuple of (SVG with logos embedded, its cache key, True if it came from the result cache).
+        """
+        logo_store, logos_generation = self.logo_store()
+        logo_sizes = self.logo_sizes(config, logo_store)
+        svg_key = build_manifest.hash_inputs("svg", config, diagram_name, optimize, logos_generation, logo_sizes)
+        output_svg = self.result_cache.get(svg_key)
+        if output_svg is not None:
+            return output_svg, svg_key, True
+
+        text_diagram_svg = generate_diagram.render_text_only_svg(
+            config, diagram_name, layout_cache=self.layout_cache, logo_sizes=logo_sizes
+        )
+        # The streaming engine, as it embeds thousands of logos several times faster than the DOM engine
+        output_file = io.BytesIO()
+        stream_embed.embed_logos_streaming(
+            diagram_name, io.BytesIO(text_diagram_svg), output_file, config, logo_store, symbol_cache=self.symbol_cache
+        )
+        output_svg = output_file.getvalue()
+        if optimize:
+            output_svg = svg_optimizer.optimize_svg(output_svg)
+        self.result_cache.put(svg_key, output_svg)
+        return output_svg, svg_key, False
+
+    def render(self, config, diagram_name, image_format, width, quality, optimize):
+        """
+        Renders a diagram with logos, as SVG or as an image, using cached results wherever possible. An image reuses
+        the cached SVG it's rasterized from, so e.g. requesting another width only rasterizes again.
+        :return: Tuple of (content bytes, True if the content came from the result cache).
+        """
+        output_svg, svg_key, cached = self.render_svg(config, diagram_name, optimize)
+        if image_format == "svg":
+            return output_svg, cached
+
+        image_key = build_manifest.hash_inputs(svg_key, image_format, width, None if image_format == "png" else quality)
+        image = self.result_cache.get(image_key)
+        if image is not None:
+            return image, True
+        image = rasterize.rasterize_svg(output_svg, [width], [image_format], quality=quality)[(width, image_format)]
+        self.result_cache.put(image_key, image)
+        return image, False
+
+    def submit(self, *args):
+        """
+        Queues a render on the worker pool.
+        :return: A future of render's result.
+        :raises RequestError: With status 503, if max_pending renders are already queued or running.
+        """
+        if not self.pending.acquire(blocking=False):
+            with self._stats_lock:
+                self.request_counts["rejected"] += 1
+            raise RequestError(503, f"Server is busy, {self.max_pending} renders are already queued or running")
+
+        with self._stats_lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            future = self.executor.submit(self.render, *args)
+        except BaseException:
+            self.pending.release()
+            raise
+
+        def finished(future):
+            self.pending.release()
+            with self._stats_lock:
+                self.in_flight -= 1
+                self.request_counts["failed" if future.exception() is not None else "ok"] += 1
+                self.latencies.append(time.perf_counter() - start)
+
+        future.add_done_callback(finished)
+        return future
+
+    def stats(self):
+        with self._stats_lock:
+            latencies = sorted(self.latencies)
+            request_counts = dict(self.request_counts, in_flight=self.in_flight)
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "requests": request_counts,
+            "latency_ms": {
+                "count": len(latencies),
+                **{
+                    name: None if value is None else round(value * 1000, 2)
+                    for name, value in (
+                        ("p50", percentile(latencies, 0.5)),
+                        ("p90", percentile(latencies, 0.9)),
+                        ("p99", percentile(latencies, 0.99)),
+                        ("max", latencies[-1] if latencies else None),
+                    )
+                },
+            },
+            "caches": {
+                "results": dict(cache_stats(self.result_cache), entries=len(self.result_cache), bytes=self.result_cache.total_bytes),
+                "layouts": cache_stats(self.layout_cache),
+                "logo_symbols": cache_stats(self.symbol_cache),
+            },
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def find_config_structure_problem(ecosystem):
+    """
+    Checks the parts of an ecosystem config which rendering walks: the central tool, the style, the list of groups,
+    each group's list of tools, and every tool's name.
+    :return: A description of the first part which doesn't have the structure rendering expects, or None.
+    """
+    for key in ("centralTool", "style"):
+        if key in ecosystem and not isinstance(ecosystem[key], dict):
+            return f"{key} must be a mapping"
+    groups = ecosystem.get("groups", [])
+    if not isinstance(groups, list):
+        return "groups must be a list"
+    for group_index, group in enumerate(groups):
+        if not isinstance(group, dict):
+            return f"group {group_index} must be a mapping"
+        tools = group.get("tools", [])
+        if not isinstance(tools, list) or not all(isinstance(tool, dict) for tool in tools):
+            return f"tools of group {group_index} must be a list of mappings"
+    for tool_config in utils.list_tools({"ecosystem": ecosystem}):
+        if isinstance(tool_config.get("name"), (dict, list)):
+            return f"tool name {tool_config['name']} must be a single value"
+    return None
+
+
+def parse_render_request(query, body):
+    """
+    Parses a render request: the config YAML as the request body, and the options as query parameters, e.g.
+    /render?name=platform&theme=dark&override=style.diagramPadding=1&format=png&width=1200
+    :return: The arguments for RenderService.render: (config, diagram name, image format, width, quality, optimize).
+    :raises RequestError: With status 400, if the config or an option is invalid.
+    """
+    import yaml
+
+    params = parse_qs(query)
+
+    def param(name, default=None):
+        return params[name][-1] if name in params else default
+
+    try:
+        config = yaml.safe_load(body)
+    except yaml.YAMLError as e:
+        raise RequestError(400, f"Invalid config YAML: {e}")
+    if not isinstance(config, dict) or not isinstance(config.get("ecosystem"), dict):
+        raise RequestError(400, "The config must be a mapping with an ecosystem section")
+
+    theme = param("theme")
+    if theme is not None and theme not in utils.theme_overrides:
+        raise RequestError(400, f"Unknown theme {theme}, choose from {', '.join(sorted(utils.theme_overrides))}")
+    try:
+        override_configs = [dict([override.split("=", 1)]) for override in params.get("override", [])] or None
+    except ValueError:
+        raise RequestError(400, "Overrides must be given as key=value")
+    override_configs = utils.merge_theme_overrides(override_configs, theme)
+    if override_configs:
+        try:
+            config["ecosystem"] = utils.override_config(config=config["ecosystem"], override_configs=override_configs)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise RequestError(400, f"Invalid override: {e}")
+    # Checked after the overrides, as an override path through a list or value (e.g. groups.tools=x) replaces it
+    problem = find_config_structure_problem(config["ecosystem"])
+    if problem is not None:
+        raise RequestError(400, f"Invalid config{' after overrides' if override_configs else ''}: {problem}")
+
+    image_format = param("format", "svg").lower()
+    try:
+        if image_format != "svg":
+            image_format = rasterize.parse_image_formats(image_format)[0]
+        width = rasterize.parse_widths(param("width", str(DEFAULT_RENDER_WIDTH)))[0]
+        quality = int(param("quality", rasterize.DEFAULT_IMAGE_QUALITY))
+    except ValueError as e:
+        raise RequestError(400, str(e))
+
+    optimize = param("optimize", "false").lower() in ("1", "true", "yes")
+    return config, utils.slugify(param("name", "diagram")), image_format, width, quality, optimize
+
+
+def create_request_handler(service, max_request_bytes):
+    from http.server import BaseHTTPRequestHandler
+
+    class RenderRequestHandler(BaseHTTPRequestHandler):
+        """
+        Serves POST /render, which renders the config in the request body (see parse_render_request), and GET /stats.
+        """
+
+        protocol_version = "HTTP/1.1"
+
+        def send_content(self, status, content_type, content, headers=()):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            for header in headers:
+                self.send_header(*header)
+            self.end_headers()
+            self.wfile.write(content)
+
+        def send_error_message(self, status, message, headers=()):
+            self.send_content(status, "application/json", json.dumps({"error": message}).encode("utf-8"), headers)
+
+        def do_GET(self):
+            if urlsplit(self.path).path == "/stats":
+                self.send_content(200, "application/json", json.dumps(service.stats(), indent=2).encode("utf-8"))
+            else:
+                self.send_error_message(404, "Not found, use POST /render or GET /stats")
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path != "/render":
+                self.send_error_message(404, "Not found, use POST /render or GET /stats")
+                return
+
+            content_length = self.headers.get("Content-Length", "")
+            if not content_length.isdigit():
+                self.close_connection = True
+                self.send_error_message(411, "A Content-Length header is required")
+                return
+            if int(content_length) > max_request_bytes:
+                self.close_connection = True
+                self.send_error_message(413, f"The config must be at most {max_request_bytes} bytes")
+                return
+            body = self.rfile.read(int(content_length))
+
+            try:
+                render_args = parse_render_request(url.query, body)
+                content, cached = service.submit(*render_args).result()
+            except RequestError as e:
+                headers = [("Retry-After", "1")] if e.status == 503 else []
+                self.send_error_message(e.status, str(e), headers)
+                return
+            except Exception as e:
+                logging.exception(f"Failed to render diagram for request {self.path}")
+                self.send_error_message(500, f"{type(e).__name__}: {e}")
+                return
+
+            self.send_content(200, CONTENT_TYPES[render_args[2]], content, [("X-Render-Cache", "hit" if cached else "miss")])
+
+        def log_message(self, format, *args):
+            logging.info(f"{self.address_string()} - {format % args}")
+
+    return RenderRequestHandler
+
+
+def serve(
+    logos_dir,
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    workers=None,
+    max_pending=None,
+    max_request_bytes=DEFAULT_MAX_REQUEST_BYTES,
+    result_cache_bytes=DEFAULT_RESULT_CACHE_BYTES,
+    layout_cache_dir=None,
+):
+    """
+    Runs the render server until interrupted with Ctrl+C. Logos are read from logos_dir and never downloaded, so every
+    tool rendered needs its logo there already (e.g. from a normal run or the batch subcommand).
+    """
+    from http.server import ThreadingHTTPServer
+
+    service = RenderService(
+        logos_dir, workers=workers, max_pending=max_pending, result_cache_bytes=result_cache_bytes, layout_cache_dir=layout_cache_dir
+    )
+    http_server = ThreadingHTTPServer((host, port), create_request_handler(service, max_request_bytes))
+    http_server.daemon_threads = True
+    logging.info(
+        f"Serving diagrams on http://{host}:{http_server.server_port} with {service.workers} workers (at most {service.max_pending} "
+        f"pending renders), logos from {logos_dir}; POST /render, GET /stats, press Ctrl+C to stop"
+    )
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Stopping server")
+    finally:
+        http_server.server_close()
+        service.shutdown()
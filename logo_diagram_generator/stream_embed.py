@@ -0,0 +1,349 @@
+import io
+import hashlib
+import logging
+import threading
+import xml.parsers.expat
+from collections import OrderedDict
+
+from logo_diagram_generator import logo_fragments, logo_pack, profiling, utils
+
+# Serialized output is buffered up to this many characters before being written to the output file
+WRITE_BUFFER_SIZE = 64 * 1024
+
+DEFAULT_MAX_CACHED_SYMBOLS = 4096
+
+
+def escape(value):
+    # Matches minidom's escaping, so the stream and DOM engines produce the same markup
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace('"', "&quot;").replace(">", "&gt;")
+
+
+def set_attribute(attributes, name, value):
+    """
+    Sets an attribute in a list of (name, value) pairs, replacing it in place if present or appending it otherwise,
+    like minidom's setAttribute.
+    """
+    for index, (attribute_name, _) in enumerate(attributes):
+        if attribute_name == name:
+            attributes[index] = (name, value)
+            return
+    attributes.append((name, value))
+
+
+def is_namespace_declaration(attribute):
+    return attribute[0] == "xmlns" or attribute[0].startswith("xmlns:")
+
+
+def pair_attributes(ordered_attributes):
+    """
+    Converts expat's flat [name, value, name, value, ...] attribute list into (name, value) pairs. Namespace
+    declarations are moved before the other attributes (keeping their order), as minidom does.
+    """
+    attributes = list(zip(ordered_attributes[::2], ordered_attributes[1::2]))
+    return sorted(attributes, key=lambda attribute: not is_namespace_declaration(attribute))
+
+
+class SvgStreamWriter:
+    """
+    Serializes XML parse events to a binary output file as UTF-8, in the same form as minidom's toxml(). Start tags are
+    held back until the element's first child, so elements without children are written as <tag/>.
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.buffer = []
+        self.buffered = 0
+        self.open_start_tag = None
+        self.in_cdata = False
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= WRITE_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.output_file.write("".join(self.buffer).encode("utf-8"))
+        self.buffer = []
+        self.buffered = 0
+
+    def close_start_tag(self):
+        if self.open_start_tag is not None:
+            self.buffer.append(self.open_start_tag + ">")
+            self.open_start_tag = None
+
+    def start_element(self, name, attributes):
+        self.close_start_tag()
+        self.open_start_tag = f"<{name}" + "".join(f' {attribute_name}="{escape(value)}"' for attribute_name, value in attributes)
+
+    def end_element(self, name):
+        if self.open_start_tag is not None:
+            self.buffer.append(self.open_start_tag + "/>")
+            self.open_start_tag = None
+        else:
+            self.write(f"</{name}>")
+
+    def characters(self, data):
+        self.close_start_tag()
+        self.write(data if self.in_cdata else escape(data))
+
+    def start_cdata(self):
+        self.close_start_tag()
+        self.write("<![CDATA[")
+        self.in_cdata = True
+
+    def end_cdata(self):
+        self.write("]]>")
+        self.in_cdata = False
+
+    def comment(self, data):
+        self.close_start_tag()
+        self.write(f"<!--{data}-->")
+
+    def processing_instruction(self, target, data):
+        self.close_start_tag()
+        self.write(f"<?{target} {data}?>")
+
+    def doctype(self, name, system_id, public_id):
+        if public_id:
+            self.write(f"<!DOCTYPE {name}  PUBLIC '{public_id}'  '{system_id}'>")
+        elif system_id:
+            self.write(f"<!DOCTYPE {name}  SYSTEM '{system_id}'>")
+        else:
+            self.write(f"<!DOCTYPE {name}>")
+
+
+def create_parser():
+    parser = xml.parsers.expat.ParserCreate()
+    parser.ordered_attributes = True
+    parser.buffer_text = True
+    return parser
+
+
+def stream_logo_symbol(writer, logo_svg_bytes, prefix, stroke_color, stroke_width):
+    """
+    Namespaces a logo SVG and copies it into the output stream as a <symbol>, setting the root's ID and size and adding
+    the stroke to every shape, exactly as LogoFragmentCache, apply_stroke and create_logo_symbol do for the DOM engine.
+    Only the logo being copied is ever held in memory, as markup rather than as DOM nodes.
+    """
+    logo_svg_content = logo_fragments.namespace_logo_svg(logo_svg_bytes.decode("utf-8"), prefix)
+    add_stroke = logo_fragments.has_stroke(stroke_color, stroke_width)
+    stroke_width = str(stroke_width)
+    depth = 0
+
+    def start_element(name, ordered_attributes):
+        nonlocal depth
+        attributes = pair_attributes(ordered_attributes)
+        if depth == 0:
+            set_attribute(attributes, "id", f"{prefix}-logo")
+            set_attribute(attributes, "width", str(logo_fragments.LOGO_WIDTH))
+            set_attribute(attributes, "height", str(logo_fragments.LOGO_HEIGHT))
+        if add_stroke and name in logo_fragments.SHAPE_TAGS:
+            set_attribute(attributes, "stroke", stroke_color)
+            set_attribute(attributes, "stroke-width", stroke_width)
+        writer.start_element("symbol" if depth == 0 else name, attributes)
+        depth += 1
+
+    def end_element(name):
+        nonlocal depth
+        depth -= 1
+        writer.end_element("symbol" if depth == 0 else name)
+
+    # Anything outside the root element (the XML declaration, DOCTYPE and top-level comments) is left out
+    def inside_root(handler):
+        return lambda *args: handler(*args) if depth > 0 else None
+
+    parser = create_parser()
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = inside_root(writer.characters)
+    parser.StartCdataSectionHandler = inside_root(writer.start_cdata)
+    parser.EndCdataSectionHandler = inside_root(writer.end_cdata)
+    parser.CommentHandler = inside_root(writer.comment)
+    parser.ProcessingInstructionHandler = inside_root(writer.processing_instruction)
+    parser.Parse(logo_svg_content, True)
+
+
+class LogoSymbolCache:
+    """
+    In-memory LRU cache of the serialized <symbol> markup stream_logo_symbol writes for each logo, keyed by the hash
+    of the raw logo content, the namespace prefix and the stroke. A long-running process embedding the same logos into
+    many diagrams (e.g. the render server) then namespaces and tokenizes each logo once, and copies its markup after
+    that. Only used when passed to embed_logos_streaming, as one-off runs would only hold the markup for nothing.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_CACHED_SYMBOLS):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._symbols = OrderedDict()
+        self._lock = threading.Lock()
+
+    def write_symbol(self, writer, logo_svg_bytes, prefix, stroke_color, stroke_width):
+        """
+        Writes a logo's <symbol> to the output stream like stream_logo_symbol, from the cached markup if there is any.
+        """
+        key = (hashlib.sha256(logo_svg_bytes).hexdigest(), prefix, stroke_color, str(stroke_width))
+        with self._lock:
+            symbol_markup = self._symbols.get(key)
+            if symbol_markup is not None:
+                self._symbols.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if symbol_markup is None:
+            symbol_file = io.BytesIO()
+            symbol_writer = SvgStreamWriter(symbol_file)
+            stream_logo_symbol(symbol_writer, logo_svg_bytes, prefix, stroke_color, stroke_width)
+            symbol_writer.flush()
+            symbol_markup = symbol_file.getvalue().decode("utf-8")
+            with self._lock:
+                self._symbols[key] = symbol_markup
+                while len(self._symbols) > self.max_entries:
+                    self._symbols.popitem(last=False)
+
+        # The markup is complete elements, so it follows on from whatever the writer last wrote
+        writer.close_start_tag()
+        writer.write(symbol_markup)
+
+
+def embed_logos_streaming(diagram_name, diagram_svg_file, output_file, config, logos_dir, profiler=None, symbol_cache=None):
+    """
+    Embeds each tool's logo into a rendered diagram like embed_logos_in_dom, but streams the diagram from one file to
+    another instead of parsing it into a DOM: each tool's node is dropped as it is read (keeping only the position of
+    its ellipse), and once the diagram's graph element ends, every logo is copied into the output one at a time.
+    Memory use therefore scales with the largest single logo, rather than with the whole diagram plus every logo.
+    :param diagram_name: The diagram name, which is the ID of the top level graph element in the SVG.
+    :param diagram_svg_file: Binary file object to read the rendered text-only diagram from.
+    :param output_file: Binary file object to write the diagram with embedded logos to.
+    :param config: The ecosystem configuration.
+    :param logos_dir: The directory containing each tool's logo SVG (loose or in its pack), or an open
+        logo_pack.LogoStore for it.
+    :param profiler: Optional profiling.Profiler to record each tool's embedding in.
+    :param symbol_cache: Optional LogoSymbolCache to reuse each logo's <symbol> markup from, across diagrams.
+    :return: The labels of the tools whose logos were embedded.
+    """
+    logging.info(f"Streaming logos into diagram {diagram_name}")
+
+    if profiler is None:
+        profiler = profiling.null_profiler
+
+    ecosystem_style = config["ecosystem"].get("style", {})
+    logo_store = logo_pack.open_logo_store(logos_dir)
+
+    # Only the first tool with each label is embedded, matching the DOM engine
+    tools_by_label = {}
+    for tool_config in utils.list_tools(config):
+        tool_label = tool_config.get("label", tool_config.get("name"))
+        if tool_label in tools_by_label:
+            logging.warning(f"No node found in diagram for tool: {tool_config.get('name')}")
+            continue
+        tools_by_label[tool_label] = tool_config
+
+    writer = SvgStreamWriter(output_file)
+    # Tool label -> (cx, cy) of the ellipse in the tool's node, or None until the node's ellipse has been read
+    tool_positions = {}
+    # The label of the tool node currently being dropped, and how deep inside it the parser is
+    dropping_label = None
+    dropping_depth = 0
+    depth = 0
+    graph_depth = None
+
+    def embed_logos():
+        # Each distinct logo is written once as a <symbol> in a <defs> element, then every tool's logo is placed with <use>
+        symbol_table = logo_fragments.LogoSymbolTable()
+        logo_placements = []
+        for tool_label, tool_config in tools_by_label.items():
+            if tool_label not in tool_positions:
+                logging.warning(f"No node found in diagram for tool: {tool_config.get('name')}")
+                continue
+            if tool_positions[tool_label] is None:
+                raise ValueError(f"No ellipse found in the diagram node for tool: {tool_label}")
+
+            tool_name_slug = utils.slugify(tool_config.get("name"))
+            with profiler.stage("embed_logo", tool=tool_name_slug):
+                logging.info(f"Found node in diagram for tool: {tool_label}, streaming logo SVG")
+                cx, cy = tool_positions[tool_label]
+                logo_scale, logo_position_adjust_x, logo_position_adjust_y, stroke_color, stroke_width = logo_fragments.resolve_logo_style(
+                    tool_config, ecosystem_style
+                )
+                logo_svg_bytes = logo_store.read(tool_name_slug)
+
+                if not logo_placements:
+                    writer.start_element("defs", [])
+                logo_prefix, new_logo = symbol_table.get_symbol(tool_name_slug, logo_svg_bytes, stroke_color, stroke_width)
+                if new_logo and symbol_cache is not None:
+                    symbol_cache.write_symbol(writer, logo_svg_bytes, logo_prefix, stroke_color, stroke_width)
+                elif new_logo:
+                    stream_logo_symbol(writer, logo_svg_bytes, logo_prefix, stroke_color, stroke_width)
+
+                transform = logo_fragments.logo_transform(cx, cy, logo_scale, logo_position_adjust_x, logo_position_adjust_y)
+                logo_placements.append((tool_name_slug, transform, logo_prefix))
+
+        if logo_placements:
+            writer.end_element("defs")
+        for tool_name_slug, transform, logo_prefix in logo_placements:
+            writer.start_element("g", [("id", f"{tool_name_slug}-logo-parent"), ("transform", transform)])
+            writer.start_element("use", logo_fragments.logo_use_attributes(logo_prefix))
+            writer.end_element("use")
+            writer.end_element("g")
+
+    def start_element(name, ordered_attributes):
+        nonlocal dropping_label, dropping_depth, depth, graph_depth
+        if dropping_label is not None:
+            dropping_depth += 1
+            if name == "ellipse" and tool_positions[dropping_label] is None:
+                attributes = dict(pair_attributes(ordered_attributes))
+                tool_positions[dropping_label] = (attributes.get("cx"), attributes.get("cy"))
+            return
+
+        attributes = pair_attributes(ordered_attributes)
+        element_id = dict(attributes).get("id")
+        if element_id in tools_by_label and element_id not in tool_positions:
+            dropping_label = element_id
+            dropping_depth = 1
+            tool_positions[element_id] = None
+            return
+        if element_id == diagram_name and graph_depth is None:
+            graph_depth = depth
+
+        writer.start_element(name, attributes)
+        depth += 1
+
+    def end_element(name):
+        nonlocal dropping_label, dropping_depth, depth
+        if dropping_label is not None:
+            dropping_depth -= 1
+            if dropping_depth == 0:
+                dropping_label = None
+            return
+
+        depth -= 1
+        if depth == graph_depth:
+            embed_logos()
+        writer.end_element(name)
+
+    # Like minidom, whitespace outside the root element isn't kept, and nothing inside a dropped node is written
+    def outside_dropped_node(handler, at_top_level=True):
+        return lambda *args: handler(*args) if dropping_label is None and (at_top_level or depth > 0) else None
+
+    parser = create_parser()
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = outside_dropped_node(writer.characters, at_top_level=False)
+    parser.StartCdataSectionHandler = outside_dropped_node(writer.start_cdata)
+    parser.EndCdataSectionHandler = outside_dropped_node(writer.end_cdata)
+    parser.CommentHandler = outside_dropped_node(writer.comment)
+    parser.ProcessingInstructionHandler = outside_dropped_node(writer.processing_instruction)
+    parser.StartDoctypeDeclHandler = lambda name, system_id, public_id, has_internal_subset: writer.doctype(name, system_id, public_id)
+
+    writer.write('<?xml version="1.0" ?>')
+    parser.ParseFile(diagram_svg_file)
+    writer.flush()
+
+    if graph_depth is None:
+        raise ValueError(f"No graph element with ID {diagram_name} found in the diagram")
+
+    logging.info("Logos embedded into diagram")
+    return [tool_label for tool_label, position in tool_positions.items() if position is not None]
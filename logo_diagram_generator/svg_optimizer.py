@@ -0,0 +1,330 @@
+import re
+import logging
+import xml.etree.ElementTree as ElementTree
+
+from logo_diagram_generator.constants import DEFAULT_OPTIMIZE_PRECISION
+
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
+XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+
+XLINK_HREF = f"{{{XLINK_NAMESPACE}}}href"
+
+# Number of decimal places coordinates are rounded to by default
+DEFAULT_PRECISION = DEFAULT_OPTIMIZE_PRECISION
+
+# SVG elements which only describe the document (Graphviz adds a <title> to every node, edge and cluster)
+METADATA_TAGS = frozenset(["metadata", "title", "desc"])
+
+# Elements which are never drawn themselves, only when referenced by ID, so are dropped if nothing references them
+REFERENCED_ONLY_TAGS = frozenset(["linearGradient", "radialGradient", "pattern", "clipPath", "mask", "marker", "filter", "symbol"])
+
+# Elements whose text is rendered or parsed, so whitespace in and around their content is kept
+TEXT_CONTENT_TAGS = frozenset(["text", "tspan", "textPath", "style", "script"])
+
+# Content in other namespaces is only kept within these (e.g. XHTML in a <foreignObject>)
+FOREIGN_CONTENT_TAGS = frozenset(["foreignObject"])
+
+# Attributes holding coordinates or lengths, which are rounded to the configured precision (path data and transforms
+# are handled separately, as path data is also rewritten more compactly, and only some transform terms are lengths)
+NUMERIC_ATTRIBUTES = frozenset(
+    ["x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r", "rx", "ry", "fx", "fy", "width", "height"]
+    + ["points", "viewBox", "stroke-width", "font-size"]
+)
+
+TRANSFORM_FUNCTION_PATTERN = re.compile(r"([A-Za-z]+)\s*\(([^)]*)\)")
+
+# Arguments of each transform function which are translations, so are lengths which can be rounded like coordinates
+TRANSLATION_ARGUMENTS = {"translate": (0, 1), "matrix": (4, 5), "rotate": (1, 2)}
+
+NUMBER_PATTERN = re.compile(r"[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?")
+ARC_FLAG_PATTERN = re.compile(r"[01]")
+PATH_SEPARATOR_PATTERN = re.compile(r"[\s,]*")
+
+# Number of arguments taken by each path command; arcs' 4th and 5th arguments are single character flags
+PATH_COMMAND_ARGUMENTS = {"m": 2, "l": 2, "h": 1, "v": 1, "c": 6, "s": 4, "q": 4, "t": 2, "a": 7, "z": 0}
+ARC_FLAG_ARGUMENTS = (3, 4)
+
+# ID references: url(#id) in attributes and CSS, and #id in href attributes and CSS selectors
+URL_REFERENCE_PATTERN = re.compile(r"url\(\s*['\"]?#([^'\")\s]+)")
+CSS_ID_PATTERN = re.compile(r"#([\w.:-]+)")
+
+ElementTree.register_namespace("", SVG_NAMESPACE)
+ElementTree.register_namespace("xlink", XLINK_NAMESPACE)
+
+
+def split_tag(tag):
+    """
+    :return: Tuple of (namespace, local name) for an ElementTree tag, with an empty namespace for unqualified tags.
+    """
+    if tag.startswith("{"):
+        namespace, local_name = tag[1:].split("}", 1)
+        return namespace, local_name
+    return "", tag
+
+
+def is_svg_tag(tag):
+    return split_tag(tag)[0] in ("", SVG_NAMESPACE)
+
+
+def local_name(tag):
+    return split_tag(tag)[1]
+
+
+def round_number(number, precision):
+    """
+    Rounds a number with a fractional part or exponent to `precision` decimal places, dropping trailing zeros.
+    Integers are returned unchanged.
+    """
+    if "." not in number and "e" not in number.lower():
+        return number
+    rounded = f"{float(number):.{precision}f}".rstrip("0").rstrip(".")
+    return "0" if rounded in ("-0", "") else rounded
+
+
+def trim_number(number):
+    """
+    Drops trailing zeros from a number's fractional part, without changing its value, e.g. "1.500" -> "1.5".
+    """
+    if "." not in number or "e" in number.lower():
+        return number
+    trimmed = number.rstrip("0").rstrip(".")
+    return "0" if trimmed in ("-0", "+0", "-", "+", "") else trimmed
+
+
+def round_transform(transform, precision):
+    """
+    Rounds the translations in a transform list to `precision` decimal places. Scale, rotation and skew terms multiply
+    every coordinate they apply to, so rounding them would distort or even collapse the content (e.g. the 0.0004 in
+    matrix(0.0004 0 0 0.0004 10 10) rounding to 0); they only have trailing zeros dropped.
+    """
+
+    def round_function(match):
+        name, arguments = match.group(1), NUMBER_PATTERN.findall(match.group(2))
+        translation_arguments = TRANSLATION_ARGUMENTS.get(name, ())
+        rounded = [
+            round_number(argument, precision) if index in translation_arguments else trim_number(argument)
+            for index, argument in enumerate(arguments)
+        ]
+        return f"{name}({' '.join(rounded)})"
+
+    return TRANSFORM_FUNCTION_PATTERN.sub(round_function, " ".join(transform.split()))
+
+
+def round_numbers(value, precision):
+    """
+    Rounds every number in an attribute value, e.g. a transform or points list.
+    """
+    return NUMBER_PATTERN.sub(lambda match: round_number(match.group(0), precision), value)
+
+
+def parse_path_data(path_data):
+    """
+    Parses SVG path data into a list of (command, arguments) tuples, where arguments holds the number strings for
+    every repetition of the command, e.g. "M1 2 3 4z" -> [("M", ["1", "2", "3", "4"]), ("z", [])].
+    :raises ValueError: If the path data is malformed.
+    """
+    segments = []
+    position = PATH_SEPARATOR_PATTERN.match(path_data).end()
+    while position < len(path_data):
+        command = path_data[position]
+        if command.lower() not in PATH_COMMAND_ARGUMENTS:
+            raise ValueError(f"Invalid path command {command!r} at position {position}")
+        argument_count = PATH_COMMAND_ARGUMENTS[command.lower()]
+        position = PATH_SEPARATOR_PATTERN.match(path_data, position + 1).end()
+
+        arguments = []
+        # A command's arguments can repeat for as long as numbers follow it
+        while argument_count and position < len(path_data) and not path_data[position].isalpha():
+            for index in range(argument_count):
+                is_flag = command in "aA" and index in ARC_FLAG_ARGUMENTS
+                match = (ARC_FLAG_PATTERN if is_flag else NUMBER_PATTERN).match(path_data, position)
+                if match is None:
+                    raise ValueError(f"Invalid path data at position {position}")
+                arguments.append(match.group(0))
+                position = PATH_SEPARATOR_PATTERN.match(path_data, match.end()).end()
+        segments.append((command, arguments))
+    return segments
+
+
+def compact_path_data(path_data, precision):
+    """
+    Rewrites path data with every number rounded to `precision` decimal places, without leading zeros, and with
+    separators only where needed (none before a minus sign, or before a decimal point following another fraction).
+    Malformed path data is only rounded, as renderers draw it up to the first error.
+    """
+    try:
+        segments = parse_path_data(path_data)
+    except ValueError:
+        return round_numbers(" ".join(path_data.split()), precision)
+
+    compact = []
+    for command, arguments in segments:
+        compact.append(command)
+        previous = None
+        for index, argument in enumerate(arguments):
+            is_flag = command in "aA" and index % 7 in ARC_FLAG_ARGUMENTS
+            number = argument if is_flag else round_number(argument, precision).lstrip("+")
+            if number.startswith("0."):
+                number = number[1:]
+            elif number.startswith("-0."):
+                number = "-" + number[2:]
+
+            # Arc flags are always separated, as some renderers don't parse them compacted
+            needs_separator = previous is not None and (
+                is_flag
+                or previous[1]
+                or not (number.startswith("-") or (number.startswith(".") and "." in previous[0] and "e" not in previous[0].lower()))
+            )
+            if needs_separator:
+                compact.append(" ")
+            compact.append(number)
+            previous = (number, is_flag)
+    return "".join(compact)
+
+
+def remove_metadata(root):
+    """
+    Removes editor metadata: comments and processing instructions (already dropped by the parser), <metadata>, <title>
+    and <desc> elements, and every element or attribute in a non-SVG namespace, e.g. sodipodi:namedview or
+    inkscape:label. Content inside a <foreignObject> is kept as is.
+    """
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        for attribute in list(element.attrib):
+            if split_tag(attribute)[0] not in ("", XLINK_NAMESPACE, XML_NAMESPACE):
+                del element.attrib[attribute]
+
+        for child in list(element):
+            if not isinstance(child.tag, str):
+                element.remove(child)
+            elif not is_svg_tag(child.tag) or local_name(child.tag) in METADATA_TAGS:
+                element.remove(child)
+            elif local_name(child.tag) not in FOREIGN_CONTENT_TAGS:
+                stack.append(child)
+
+
+def find_references(root):
+    """
+    :return: The set of IDs referenced anywhere in the document, by href, url(#...) or in a <style> element's CSS.
+    """
+    references = set()
+    for element in root.iter():
+        for attribute, value in element.attrib.items():
+            if attribute in (XLINK_HREF, "href") and value.startswith("#"):
+                references.add(value[1:])
+            elif "url(" in value:
+                references.update(URL_REFERENCE_PATTERN.findall(value))
+        if local_name(element.tag) == "style" and element.text:
+            references.update(CSS_ID_PATTERN.findall(element.text))
+    return references
+
+
+def is_referenced(element, references):
+    # Any referenced descendant keeps an element, e.g. a <defs> nested inside another <defs>
+    return any(descendant.get("id") in references for descendant in element.iter())
+
+
+def remove_unreferenced_definitions(root):
+    """
+    Removes gradients, clip paths, symbols etc. which nothing references, and any other unreferenced content of <defs>
+    elements (except styles). Repeats until nothing changes, as removing one definition can leave another (e.g. a
+    gradient it inherited from) unreferenced.
+    """
+    removed = True
+    while removed:
+        removed = False
+        references = find_references(root)
+        for parent in root.iter():
+            parent_is_defs = local_name(parent.tag) == "defs"
+            for child in list(parent):
+                child_tag = local_name(child.tag)
+                if child_tag == "style" or not (child_tag in REFERENCED_ONLY_TAGS or parent_is_defs):
+                    continue
+                if not is_referenced(child, references):
+                    parent.remove(child)
+                    removed = True
+
+
+def remove_empty_containers(root):
+    """
+    Removes <g> and <defs> elements with no content and nothing referencing them, e.g. Graphviz clusters which only had
+    a title. Repeats until nothing changes, as removing a container can leave its parent empty.
+    """
+    references = find_references(root)
+    removed = True
+    while removed:
+        removed = False
+        for parent in root.iter():
+            for child in list(parent):
+                if (
+                    local_name(child.tag) in ("g", "defs")
+                    and len(child) == 0
+                    and not (child.text or "").strip()
+                    and child.get("id") not in references
+                ):
+                    parent.remove(child)
+                    removed = True
+
+
+def remove_unreferenced_ids(root):
+    references = find_references(root)
+    for element in root.iter():
+        if element.get("id") is not None and element.get("id") not in references:
+            del element.attrib["id"]
+
+
+def compact_element(element, precision, in_text_content=False):
+    """
+    Rounds coordinates, collapses whitespace in attribute values and drops whitespace-only text between elements,
+    for an element and all of its descendants.
+    """
+    stack = [(element, in_text_content)]
+    while stack:
+        current, in_text_content = stack.pop()
+        for attribute, value in current.attrib.items():
+            if attribute == "d":
+                current.set(attribute, compact_path_data(value, precision))
+            elif attribute == "transform":
+                current.set(attribute, round_transform(value, precision))
+            elif attribute in NUMERIC_ATTRIBUTES:
+                current.set(attribute, round_numbers(" ".join(value.split()), precision))
+            elif attribute == "style":
+                current.set(attribute, " ".join(value.split()))
+
+        in_text_content = in_text_content or local_name(current.tag) in TEXT_CONTENT_TAGS
+        if not in_text_content:
+            if current.text is not None and not current.text.strip():
+                current.text = None
+            for child in current:
+                if child.tail is not None and not child.tail.strip():
+                    child.tail = None
+        stack.extend((child, in_text_content) for child in current)
+
+
+def optimize_svg(svg_content, precision=DEFAULT_PRECISION):
+    """
+    Optimizes a diagram SVG for serving on the web, without changing how it renders: strips editor metadata, comments
+    and titles, drops definitions and IDs which nothing references, rounds coordinates to `precision` decimal places
+    and removes insignificant whitespace.
+    :param svg_content: The SVG, as bytes or a string.
+    :param precision: Number of decimal places to round coordinates to.
+    :return: The optimized SVG, as UTF-8 encoded bytes.
+    """
+    root = ElementTree.fromstring(svg_content)
+
+    remove_metadata(root)
+    remove_unreferenced_definitions(root)
+    remove_empty_containers(root)
+    remove_unreferenced_ids(root)
+    compact_element(root, precision)
+
+    # ElementTree writes empty elements as "<tag />", and text content can't contain a raw ">" (it's escaped)
+    optimized_svg = ElementTree.tostring(root, encoding="unicode").replace(" />", "/>").encode("utf-8")
+    input_size = len(svg_content.encode("utf-8") if isinstance(svg_content, str) else svg_content)
+    logging.info(
+        f"Optimized SVG from {input_size} to {len(optimized_svg)} bytes "
+        f"({(1 - len(optimized_svg) / max(input_size, 1)) * 100:.1f}% smaller)"
+    )
+    return optimized_svg
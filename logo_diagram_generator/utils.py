@@ -1,7 +1,9 @@
 import os
+import stat
 import string
+import tempfile
 import logging
-import yaml
+from collections.abc import Mapping
 
 visually_distinct_colors = [
     "darkgreen",
@@ -16,6 +18,22 @@ visually_distinct_colors = [
     "yellow",
 ]
 
+# Config overrides applied by each --theme option, on top of any explicit overrides
+theme_overrides = {
+    "dark": {
+        "style.groupLabelFontcolor": "#ffffff",
+        "style.colorPalette": "aqua,purple3,maroon3,orangered,yellow,lime,fuchsia,#6495ed,peachpuff,forestgreen",
+        "style.defaultLogoStrokeColor": "white",
+        "style.defaultLogoStrokeWidth": "0.5",
+    },
+    "light": {
+        "style.groupLabelFontcolor": "#222222",
+        "style.colorPalette": "seagreen,maroon,midnightblue,olive,red,mediumblue,darksalmon,darkgreen,orange",
+        "style.defaultLogoStrokeColor": "#333333",
+        "style.defaultLogoStrokeWidth": "0.2",
+    },
+}
+
 
 def override_config(config, override_configs):
     """
@@ -59,40 +77,93 @@ def override_config(config, override_configs):
     return config
 
 
+def copy_config(config):
+    """
+    Copies a configuration into plain dicts and lists, so overrides can be applied without changing the caller's copy.
+    :param config: The configuration as a mapping (e.g. a dict loaded from YAML), or a parsed model with a model_dump
+        method (e.g. a pydantic model, dumped by alias so the keys match the YAML).
+    :return: The configuration dictionary.
+    """
+    if hasattr(config, "model_dump"):
+        config = config.model_dump(by_alias=True, exclude_none=True)
+    if isinstance(config, Mapping):
+        return {key: copy_config(value) for key, value in config.items()}
+    if isinstance(config, (list, tuple)):
+        return [copy_config(value) for value in config]
+    return config
+
+
+def merge_theme_overrides(override_configs, theme):
+    """
+    Merges the overrides for the given theme into a list of override configuration dictionaries.
+    Theme overrides take precedence over explicit overrides for the same key.
+    :param override_configs: A list of override configuration dictionaries, or None.
+    :param theme: The theme name, e.g. dark or light, or None for no theme.
+    :return: The list of override configuration dictionaries to apply, or the original value if no theme is set.
+    """
+    if theme is None:
+        return override_configs
+
+    overrides = override_configs if override_configs is not None else []
+    # Merge all dictionaries in the list into a single dictionary
+    combined_overrides = {k: v for d in overrides for k, v in d.items()}
+    combined_overrides.update(theme_overrides[theme])
+    return [combined_overrides]
+
+
+def load_config(config_filepath, override_configs=None):
+    """
+    Reads the configuration file and applies any overrides to its ecosystem section.
+    :param config_filepath: Path to the configuration file.
+    :param override_configs: A list of override configuration dictionaries, or None.
+    :return: The configuration dictionary.
+    """
+    logging.info(f"Reading configuration from file: {config_filepath}")
+    config = read_config(config_filepath)
+
+    if override_configs:
+        logging.info(f"Override configuration provided, replacing config keys as specified")
+        config["ecosystem"] = override_config(config=config["ecosystem"], override_configs=override_configs)
+    else:
+        logging.info(f"No configuration overrides set, using values from specified config file")
+
+    return config
+
+
+def list_tools(config):
+    """
+    Lists every tool in the ecosystem configuration: the central tool (if it has a name) followed by each group's tools.
+    :param config: The configuration dictionary.
+    :return: A list of tool config dictionaries.
+    """
+    ecosystem = config.get("ecosystem", {})
+    tools = []
+
+    central_tool = ecosystem.get("centralTool", {})
+    if central_tool.get("name"):
+        tools.append(central_tool)
+
+    for group in ecosystem.get("groups", []):
+        for tool in group.get("tools", []):
+            tools.append(tool)
+
+    return tools
+
+
 def update_config(config_filepath, tool_name, updates):
     """
-    Updates the configuration file with the given updates for the specified tool.
+    Updates the configuration file with the given updates for the specified tool, keeping its comments and formatting.
+    To update several tools, use a config_editor.ConfigEditor, which reads the file once and writes it once.
     :param config_filepath: Path to the configuration file.
     :param tool_name: Name of the tool to update.
     :param updates: Dictionary of updates to apply.
     """
-    logging.debug(f"Updating config file {config_filepath} for tool {tool_name} with updates: {updates}")
-
-    with open(config_filepath, "r") as file:
-        config = yaml.safe_load(file)
+    from logo_diagram_generator import config_editor
 
-    updated = False
-    if "centralTool" in config["ecosystem"] and config["ecosystem"]["centralTool"].get("name") == tool_name:
-        config["ecosystem"]["centralTool"].update(updates)
-        updated = True
-        logging.info(f"Successfully updated central tool in config file with new values: {updates}")
-    else:
-        for category in config["ecosystem"]["groups"]:
-            for tool in category.get("tools", []):
-                if tool.get("name") == tool_name:
-                    tool.update(updates)
-                    updated = True
-                    logging.info(f"Successfully updated tool {tool_name} in config file with new values: {updates}")
-                    break
-            if updated:
-                break
-
-    if updated:
-        with open(config_filepath, "w") as file:
-            yaml.safe_dump(config, file)
-            logging.info(f"Successfully wrote updated YAML back to config file: {config_filepath}")
-    else:
-        logging.error(f"Failed to update config file for tool {tool_name} with updates: {updates}")
+    logging.debug(f"Updating config file {config_filepath} for tool {tool_name} with updates: {updates}")
+    config_document = config_editor.ConfigDocument(config_filepath)
+    if config_document.update_tool(tool_name, updates):
+        config_document.flush()
 
 
 def slugify(text):
@@ -112,7 +183,38 @@ def ensure_directory_exists(directory_path):
         os.makedirs(directory_path)
 
 
+def default_cache_dir():
+    """
+    Returns the default directory for the persistent logo and layout caches, following the XDG base directory convention.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "logo-diagram-generator")
+
+
+def write_file_atomically(path, content, mode=None):
+    """
+    Writes bytes to a temporary file in the same directory, then renames it over the target path,
+    so concurrent readers never see a partially written file.
+    :param mode: Permission bits for the file (e.g. an existing file's st_mode, to keep them); by default the file is
+        only readable and writable by its owner, as created by mkstemp.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        if mode is not None:
+            os.chmod(temp_path, stat.S_IMODE(mode))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 def read_config(config_filepath):
+    # Imported here so that CLI invocations which never read a config (e.g. --help) don't pay for it
+    import yaml
+
     logging.debug(f"Reading configuration from {config_filepath}")
     with open(config_filepath, "r") as file:
         return yaml.safe_load(file)
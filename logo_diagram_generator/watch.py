@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import logging
+import xml.dom.minidom
+
+from logo_diagram_generator import generate_diagram, logo_fragments, logo_index, logo_pack, profiling, rasterize, svg_optimizer, utils
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+
+class DiagramWatcher:
+    """
+    Keeps a diagram's parsed config, rendered layout and embedded logo DOM in memory, and regenerates only the affected
+    stages when the config file or a logo changes:
+
+    - Changes to anything in the text-only diagram (tools, groups, layout or label styles) re-render the diagram,
+      reusing the cached layout where only colors changed, and re-embed every logo.
+    - Changes which only affect logos (e.g. a tool's positionAdjustX, scale or stroke, or a logo file) re-embed just
+      the logos of the affected tools into the existing diagram, without any Graphviz call.
+
+    The SVG and image outputs are rewritten after every update.
+    """
+
+    def __init__(
+        self,
+        config_filepath,
+        diagram_name,
+        output_dir,
+        logos_dir,
+        png_width,
+        override_configs=None,
+        layout_cache=None,
+        on_config_change=None,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        image_formats=rasterize.DEFAULT_IMAGE_FORMATS,
+        image_quality=rasterize.DEFAULT_IMAGE_QUALITY,
+        raster_tile_height=None,
+        write_text_svg=False,
+        profiler=None,
+        optimize_svg=False,
+        optimize_precision=svg_optimizer.DEFAULT_PRECISION,
+    ):
+        """
+        :param png_width: The image width in pixels, or a list of widths, as for generate_diagram_from_config.
+        :param image_quality: Quality of the lossy image formats, from 1 to 100.
+        :param raster_tile_height: If set, rasterize in horizontal strips of this many rows, as for rasterize_svg.
+        :param write_text_svg: Also write the text-only diagram to <name>_text.svg whenever it's rendered.
+        :param profiler: Optional profiling.Profiler to record the stages of every update in.
+        :param optimize_svg: Run the output SVG through svg_optimizer.optimize_svg after every update, before rasterizing.
+        :param optimize_precision: Number of decimal places the optimizer rounds coordinates to.
+        :param on_config_change: Optional callable run whenever the config file changes, before the diagram is updated,
+            e.g. to download logos for newly added tools.
+        """
+        self.config_filepath = config_filepath
+        self.diagram_name = utils.slugify(diagram_name)
+        self.logos_dir = logos_dir
+        self.png_widths = rasterize.parse_widths(png_width)
+        self.image_formats = rasterize.parse_image_formats(image_formats)
+        self.image_quality = image_quality
+        self.raster_tile_height = raster_tile_height
+        self.override_configs = override_configs
+        self.layout_cache = layout_cache
+        self.on_config_change = on_config_change
+        self.poll_interval = poll_interval
+        self.fragment_cache = logo_fragments.LogoFragmentCache()
+        self.profiler = profiler if profiler is not None else profiling.null_profiler
+        self.optimize_svg = optimize_svg
+        self.optimize_precision = optimize_precision
+
+        self.text_svg_path = os.path.join(output_dir, f"{self.diagram_name}_text.svg") if write_text_svg else None
+        self.output_svg_path = os.path.join(output_dir, f"{self.diagram_name}_logos.svg")
+        self.image_paths = {
+            (width, image_format): rasterize.image_output_path(self.output_svg_path, width, image_format, self.png_widths[0])
+            for width in self.png_widths
+            for image_format in self.image_formats
+        }
+
+        self.config = None
+        # The logos, reopened on every update so logos (or a pack) written since the last one are seen
+        self.logo_store = None
+        # Sizes of the logos tool nodes are sized to, if the config sets sizeNodesToLogos
+        self.logo_sizes = None
+        self.diagram_svg_dom = None
+        self.diagram_graph_node = None
+        # Tool label -> (tool node from the text-only diagram, embedded logo <g> element, logo signature)
+        self.embedded_logos = {}
+
+    def logo_signature(self, tool_config):
+        """
+        Summarises everything that determines how a tool's logo is embedded, so changed logos can be detected.
+        """
+        logo_hash = self.logo_store.sha256(utils.slugify(tool_config.get("name")))
+
+        logo_style = {key: self.config["ecosystem"].get("style", {}).get(key) for key in generate_diagram.LOGO_ONLY_STYLE_KEYS}
+        return json.dumps([tool_config, logo_style, logo_hash], sort_keys=True, default=str)
+
+    def rebuild(self):
+        """
+        Renders the text-only diagram and embeds every logo from scratch.
+        """
+        logging.info("Rendering text-only diagram and embedding all logos")
+        with self.profiler.stage("layout"):
+            diagram_svg = generate_diagram.render_text_only_svg(
+                self.config, self.diagram_name, layout_cache=self.layout_cache, logo_sizes=self.logo_sizes
+            )
+        if self.text_svg_path is not None:
+            with open(self.text_svg_path, "wb") as file:
+                file.write(diagram_svg)
+            logging.info(f"Text only diagram SVG written to: {self.text_svg_path}")
+
+        self.diagram_svg_dom = xml.dom.minidom.parseString(diagram_svg)
+        self.diagram_graph_node = generate_diagram.index_svg_elements_by_id(self.diagram_svg_dom.documentElement).get(self.diagram_name)
+        with self.profiler.stage("embed_logos", engine="dom"):
+            embedded_logos = generate_diagram.embed_logos_in_dom(
+                self.diagram_name,
+                self.diagram_svg_dom,
+                self.config,
+                self.logo_store,
+                fragment_cache=self.fragment_cache,
+                profiler=self.profiler,
+                use_symbols=False,
+            )
+
+        tools_by_label = self.tools_by_label()
+        self.embedded_logos = {
+            tool_label: (tool_node, logo_element, self.logo_signature(tools_by_label[tool_label]))
+            for tool_label, (tool_node, logo_element) in embedded_logos.items()
+        }
+
+    def tools_by_label(self):
+        """
+        Maps each tool label to its config. Only the first tool with a given label has its logo embedded, so only that
+        one is tracked.
+        """
+        tools_by_label = {}
+        for tool_config in utils.list_tools(self.config):
+            tools_by_label.setdefault(tool_config.get("label", tool_config.get("name")), tool_config)
+        return tools_by_label
+
+    def reembed_changed_logos(self):
+        """
+        Re-embeds the logo of every tool whose logo signature has changed, in place in the existing diagram.
+        :return: The number of logos re-embedded.
+        """
+        ecosystem_style = self.config["ecosystem"].get("style", {})
+        reembedded = 0
+        for tool_label, tool_config in self.tools_by_label().items():
+            if tool_label not in self.embedded_logos:
+                continue
+
+            tool_node, logo_element, signature = self.embedded_logos[tool_label]
+            new_signature = self.logo_signature(tool_config)
+            if new_signature == signature:
+                continue
+
+            logging.info(f"Re-embedding logo for tool: {tool_label}")
+            new_logo_element = generate_diagram.create_logo_element(
+                self.diagram_svg_dom, tool_node, tool_config, ecosystem_style, self.logo_store, self.fragment_cache
+            )
+            self.diagram_graph_node.replaceChild(new_logo_element, logo_element)
+            self.embedded_logos[tool_label] = (tool_node, new_logo_element, new_signature)
+            reembedded += 1
+        return reembedded
+
+    def update(self, config_changed=True):
+        """
+        Reloads the config (if it changed) and brings the outputs up to date, doing as little work as possible.
+        """
+        start = time.perf_counter()
+        if self.logo_store is not None:
+            self.logo_store.close()
+        self.logo_store = logo_pack.LogoStore(self.logos_dir)
+
+        if config_changed or self.config is None:
+            if self.on_config_change is not None:
+                self.on_config_change()
+            with self.profiler.stage("load_config"):
+                new_config = utils.load_config(self.config_filepath, self.override_configs)
+        else:
+            new_config = self.config
+
+        needs_rebuild = self.config is None or generate_diagram.text_diagram_config(new_config) != generate_diagram.text_diagram_config(
+            self.config
+        )
+        # A logo whose size changed moves its node, so the diagram is laid out again rather than only re-embedded
+        logo_sizes = None
+        if generate_diagram.sizes_nodes_to_logos(new_config):
+            logo_sizes = logo_index.fitted_logo_sizes(logo_index.index_config_logos(new_config, self.logo_store))
+        needs_rebuild = needs_rebuild or logo_sizes != self.logo_sizes
+        self.config = new_config
+        self.logo_sizes = logo_sizes
+
+        if needs_rebuild:
+            try:
+                self.rebuild()
+            except Exception:
+                # Without a complete diagram in memory, the next update has to start from scratch
+                self.config = None
+                raise
+        else:
+            with self.profiler.stage("reembed_logos"):
+                reembedded = self.reembed_changed_logos()
+            if reembedded == 0:
+                logging.info("No changes affecting the diagram")
+                return
+
+        output_svg = self.diagram_svg_dom.toxml().encode("utf-8")
+        if self.optimize_svg:
+            # The DOM in memory is kept as embedded, so single logos can still be replaced in it
+            with self.profiler.stage("optimize_svg", precision=self.optimize_precision):
+                output_svg = svg_optimizer.optimize_svg(output_svg, precision=self.optimize_precision)
+        with open(self.output_svg_path, "wb") as file:
+            file.write(output_svg)
+        with self.profiler.stage("rasterize", widths=self.png_widths, formats=self.image_formats, tile_height=self.raster_tile_height):
+            images = rasterize.rasterize_svg(
+                output_svg,
+                self.png_widths,
+                self.image_formats,
+                quality=self.image_quality,
+                tile_height=self.raster_tile_height,
+                profiler=self.profiler,
+            )
+        for image, image_path in self.image_paths.items():
+            with open(image_path, "wb") as file:
+                file.write(images[image])
+        logging.info(
+            f"Diagram updated in {time.perf_counter() - start:.2f}s: {self.output_svg_path}, {', '.join(self.image_paths.values())}"
+        )
+
+    def snapshot(self):
+        """
+        Returns the modification times of the config file and every logo (and the logo pack), to detect changes by polling.
+        """
+        config_mtime = os.stat(self.config_filepath).st_mtime_ns
+        logo_mtimes = {}
+        if os.path.isdir(self.logos_dir):
+            with os.scandir(self.logos_dir) as entries:
+                logo_mtimes = {
+                    entry.name: entry.stat().st_mtime_ns
+                    for entry in entries
+                    if entry.name.endswith(".svg") or entry.name == logo_pack.PACK_FILENAME
+                }
+        return config_mtime, logo_mtimes
+
+    def run(self):
+        """
+        Builds the diagram, then watches the config file and logos directory, updating the diagram on every change
+        until interrupted with Ctrl+C. Errors in an update are logged and the watch continues.
+        """
+        try:
+            self.update()
+        except Exception:
+            logging.exception("Failed to build diagram, waiting for the next change")
+        last_config_mtime, last_logo_mtimes = self.snapshot()
+        logging.info(f"Watching {self.config_filepath} and {self.logos_dir} for changes, press Ctrl+C to stop")
+
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                try:
+                    config_mtime, logo_mtimes = self.snapshot()
+                except OSError as e:
+                    # The config file may briefly not exist while an editor replaces it
+                    logging.debug(f"Unable to check for changes: {e}")
+                    continue
+
+                if config_mtime == last_config_mtime and logo_mtimes == last_logo_mtimes:
+                    continue
+
+                config_changed = config_mtime != last_config_mtime
+                logging.info(f"Change detected in {self.config_filepath if config_changed else self.logos_dir}, updating diagram")
+                last_config_mtime, last_logo_mtimes = config_mtime, logo_mtimes
+                try:
+                    self.update(config_changed=config_changed)
+                except Exception:
+                    logging.exception("Failed to update diagram, waiting for the next change")
+        except KeyboardInterrupt:
+            logging.info("Stopped watching")
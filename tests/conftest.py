@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture
+def cairosvg():
+    """
+    cairosvg, for tests which actually rasterize; skipped where it or the cairo library it loads isn't installed.
+    """
+    try:
+        import cairosvg
+    except (ImportError, OSError) as e:
+        pytest.skip(f"cairosvg isn't usable: {e}")
+    return cairosvg
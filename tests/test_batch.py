@@ -0,0 +1,142 @@
+import os
+import json
+import multiprocessing
+
+import yaml
+import pytest
+
+from logo_diagram_generator import batch, cli, download_logos, rasterize, utils
+
+CONFIG = {
+    "ecosystem": {
+        "centralTool": {"name": "Kubernetes"},
+        "groups": [{"category": "Cluster Management", "tools": [{"name": "Rancher"}]}],
+        "style": {"diagramEngine": "radial-native"},
+    }
+}
+
+LOGO_SVG = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 10"><rect width="20" height="10"/></svg>'
+
+# Worker processes only see the stubbed rasterizer if they are forked from the test process
+requires_fork = pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="needs forked worker processes")
+
+
+def write_manifest(tmp_path, manifest):
+    manifest_path = tmp_path / "manifest.yml"
+    manifest_path.write_text(yaml.safe_dump(manifest))
+    return str(manifest_path)
+
+
+def test_read_manifest_applies_defaults_and_themes(tmp_path):
+    manifest_path = write_manifest(
+        tmp_path,
+        {
+            "defaults": {"output_dir": "diagrams", "image_formats": "png,webp"},
+            "jobs": [
+                {"config": "team-a.yml"},
+                {"config": "team-a.yml", "theme": "dark", "overrides": {"style.diagramPadding": 1}},
+                {"config": "configs/team-b.yml", "name": "Team B Print", "png_width": "12000,400", "image_quality": 70},
+            ],
+        },
+    )
+
+    plain, dark, print_job = batch.read_manifest(manifest_path, image_quality=85)
+
+    assert plain["config"] == os.path.join(str(tmp_path), "team-a.yml")
+    assert plain["logos_dir"] == os.path.join(str(tmp_path), "logos")
+    assert plain["output_dir"] == os.path.join(str(tmp_path), "diagrams")
+    assert (plain["name"], plain["theme"], plain["override_configs"]) == ("team-a", None, None)
+    assert (plain["png_width"], plain["image_formats"], plain["image_quality"]) == ([3000], ["png", "webp"], 85)
+
+    assert dark["name"] == "team-a.dark"
+    assert dark["override_configs"] == [dict({"style.diagramPadding": "1"}, **utils.theme_overrides["dark"])]
+
+    assert print_job["name"] == "Team B Print"
+    assert (print_job["png_width"], print_job["image_quality"]) == ([12000, 400], 70)
+
+
+@pytest.mark.parametrize(
+    "job, error",
+    [
+        ({"name": "no-config"}, "missing the required config key"),
+        ({"config": "a.yml", "theme": "sepia"}, "Unknown theme"),
+        ({"config": "a.yml", "image_quality": 101}, "Image quality"),
+        ({"config": "a.yml", "image_quality": "high"}, "Image quality"),
+        ({"config": "a.yml", "png_width": 0}, "positive"),
+        ({"config": "a.yml", "image_formats": ["gif"]}, "Unsupported image format"),
+    ],
+)
+def test_read_manifest_rejects_invalid_jobs(tmp_path, job, error):
+    with pytest.raises(ValueError, match=error):
+        batch.read_manifest(write_manifest(tmp_path, {"jobs": [job]}))
+
+
+def test_read_manifest_rejects_jobs_writing_the_same_output(tmp_path):
+    manifest_path = write_manifest(tmp_path, {"jobs": [{"config": "a.yml"}, {"config": "other/a.yml"}]})
+
+    with pytest.raises(ValueError, match="unique name"):
+        batch.read_manifest(manifest_path)
+
+
+@pytest.fixture
+def batch_dir(tmp_path, monkeypatch):
+    """
+    A manifest with a job which renders, and one whose config has a tool without a logo, which fails.
+    Rasterization is stubbed to write each image's quality, as cairo isn't needed to check what reaches it.
+    """
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    for slug in ("kubernetes", "rancher"):
+        (logos_dir / f"{slug}.svg").write_text(LOGO_SVG)
+    (tmp_path / "good.yml").write_text(yaml.safe_dump(CONFIG))
+    broken_config = {"ecosystem": dict(CONFIG["ecosystem"], groups=[{"category": "Other", "tools": [{"name": "No Logo"}]}])}
+    (tmp_path / "broken.yml").write_text(yaml.safe_dump(broken_config))
+    write_manifest(
+        tmp_path,
+        {
+            "defaults": {"output_dir": "out", "png_width": 100},
+            "jobs": [
+                {"config": "broken.yml"},
+                {"config": "good.yml", "image_formats": ["webp"]},
+                {"config": "good.yml", "theme": "dark", "image_formats": ["jpeg"], "image_quality": 40},
+            ],
+        },
+    )
+    monkeypatch.setattr(
+        rasterize,
+        "rasterize_svg",
+        lambda svg, widths, formats, quality=None, **kwargs: {(w, f): f"{f} {quality}".encode() for w in widths for f in formats},
+    )
+    return tmp_path
+
+
+@requires_fork
+def test_failed_job_does_not_stop_the_others(batch_dir):
+    jobs = batch.read_manifest(str(batch_dir / "manifest.yml"), image_quality=55)
+    results = batch.run_batch(jobs, workers=2, skip_download=True, force=True)
+
+    assert [(result["name"], result["status"]) for result in results] == [
+        ("broken", "failed"),
+        ("good", "ok"),
+        ("good.dark", "ok"),
+    ]
+    assert "FileNotFoundError" in results[0]["error"]
+    assert (batch_dir / "out" / "good_logos.webp").read_bytes() == b"webp 55"
+    assert (batch_dir / "out" / "good.dark_logos.jpg").read_bytes() == b"jpeg 40"
+
+
+@requires_fork
+def test_batch_subcommand_threads_options_and_exits_non_zero_on_failure(batch_dir, monkeypatch):
+    downloads = []
+    monkeypatch.setattr(download_logos, "download_tool_logos", lambda **kwargs: downloads.append(kwargs))
+    summary_path = batch_dir / "summary.json"
+
+    with pytest.raises(SystemExit) as exit:
+        cli.batch_main(
+            [str(batch_dir / "manifest.yml"), "--image_quality", "65", "--download_timeout", "2.5", "--summary_json", str(summary_path)]
+        )
+
+    assert exit.value.code == 1
+    assert [download["timeout"] for download in downloads] == [2.5]
+    assert [result["status"] for result in json.loads(summary_path.read_text())] == ["failed", "ok", "ok"]
+    assert (batch_dir / "out" / "good_logos.webp").read_bytes() == b"webp 65"
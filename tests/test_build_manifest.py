@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+from logo_diagram_generator import build_manifest, generate_diagram, rasterize
+
+CONFIG = {
+    "ecosystem": {
+        "centralTool": {"name": "Kubernetes"},
+        "groups": [{"category": "Cluster Management", "tools": [{"name": "Rancher"}]}],
+        "style": {"diagramEngine": "radial-native"},
+    }
+}
+
+LOGO_SVG = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 10"><rect width="20" height="10"/></svg>'
+
+
+def write_output(path, content):
+    with open(path, "wb") as file:
+        file.write(content)
+
+
+def test_stage_is_up_to_date_until_inputs_or_output_change(tmp_path):
+    output_path = str(tmp_path / "diagram_logos.svg")
+    write_output(output_path, b"<svg/>")
+    manifest = build_manifest.BuildManifest(str(tmp_path), "diagram")
+    inputs_hash = build_manifest.hash_inputs("diagram", {"a": 1})
+    manifest.record("logos_svg", inputs_hash, output_path, b"<svg/>")
+    manifest.save()
+
+    manifest = build_manifest.BuildManifest(str(tmp_path), "diagram")
+    assert manifest.is_up_to_date("logos_svg", inputs_hash, output_path)
+    assert not manifest.is_up_to_date("logos_svg", build_manifest.hash_inputs("diagram", {"a": 2}), output_path)
+    assert not manifest.is_up_to_date("image_3000_png", inputs_hash, output_path)
+
+    write_output(output_path, b"<svg>edited</svg>")
+    assert not manifest.is_up_to_date("logos_svg", inputs_hash, output_path)
+    os.remove(output_path)
+    assert not manifest.is_up_to_date("logos_svg", inputs_hash, output_path)
+
+
+def test_manifest_from_another_version_is_ignored(tmp_path):
+    (tmp_path / ".diagram.build.json").write_text('{"version": 0, "stages": {"logos_svg": {}}}')
+    assert build_manifest.BuildManifest(str(tmp_path), "diagram").stages == {}
+
+
+def test_hash_inputs_is_independent_of_key_order():
+    assert build_manifest.hash_inputs({"a": 1, "b": 2}) == build_manifest.hash_inputs({"b": 2, "a": 1})
+    assert build_manifest.hash_inputs({"a": 1}) != build_manifest.hash_inputs({"a": 2})
+
+
+def test_hash_logo_files_changes_with_logo_content(tmp_path):
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    (logos_dir / "rancher.svg").write_text(LOGO_SVG)
+
+    hashes = build_manifest.hash_logo_files(CONFIG, str(logos_dir))
+    assert hashes["kubernetes"] is None
+    (logos_dir / "rancher.svg").write_text(LOGO_SVG.replace("20", "30"))
+    assert build_manifest.hash_logo_files(CONFIG, str(logos_dir))["rancher"] != hashes["rancher"]
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    """
+    Builds the diagram like the CLI, with rasterization stubbed out, and returns the stages which ran.
+    """
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    for slug in ("kubernetes", "rancher"):
+        (logos_dir / f"{slug}.svg").write_text(LOGO_SVG)
+
+    stages = []
+    render_text_only_svg = generate_diagram.render_text_only_svg
+    monkeypatch.setattr(
+        generate_diagram, "render_text_only_svg", lambda *args, **kwargs: stages.append("layout") or render_text_only_svg(*args, **kwargs)
+    )
+    monkeypatch.setattr(
+        rasterize,
+        "rasterize_svg",
+        lambda svg, widths, formats, **kwargs: stages.append("rasterize")
+        or {(width, image_format): b"image" for width in widths for image_format in formats},
+    )
+
+    def build(config=CONFIG, png_width=100, force=False, embed_engine=generate_diagram.DEFAULT_EMBED_ENGINE):
+        del stages[:]
+        generate_diagram.generate_diagram_from_config_dict(
+            config, "diagram", str(tmp_path), str(logos_dir), png_width, layout_cache=None, force=force, embed_engine=embed_engine
+        )
+        return list(stages)
+
+    build.logos_dir = logos_dir
+    return build
+
+
+def test_unchanged_build_skips_every_stage(build):
+    assert build() == ["layout", "rasterize"]
+    assert build() == []
+    assert build(force=True) == ["layout", "rasterize"]
+
+
+def test_only_stale_stages_are_rebuilt(build):
+    build()
+    # A new width only rasterizes again
+    assert build(png_width=[100, 50]) == ["rasterize"]
+    # A changed logo embeds again, and so rasterizes again
+    (build.logos_dir / "rancher.svg").write_text(LOGO_SVG.replace("20", "40"))
+    assert build(png_width=[100, 50]) == ["layout", "rasterize"]
+
+
+def test_changing_embed_engine_embeds_again(build):
+    build(embed_engine="dom")
+    assert "layout" in build(embed_engine="stream")
+    assert build(embed_engine="stream") == []
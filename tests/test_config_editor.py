@@ -0,0 +1,91 @@
+import os
+import stat
+
+import yaml
+import pytest
+
+from logo_diagram_generator import config_editor
+
+CONFIG_TEXT = """\
+# Our ecosystem
+ecosystem:
+  centralTool:
+    name: Kubernetes  # the hub
+  groups:
+    - category: Cluster Management
+      tools:
+        - name: Rancher
+          alias: rancher-old
+
+        - {name: Lens}
+        - name: Portainer
+          alias:
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.yml"
+    path.write_text(CONFIG_TEXT)
+    return path
+
+
+def test_updates_are_patched_in_keeping_comments_and_layout(config_path):
+    document = config_editor.ConfigDocument(str(config_path))
+    assert document.update_tool("Rancher", {"alias": "rancher", "svgURL": "https://example.com/rancher.svg"})
+    assert document.update_tool("Lens", {"alias": "lens, the IDE"})
+    assert document.update_tool("Portainer", {"alias": "portainer-io"})
+    assert document.update_tool("Kubernetes", {"alias": "k8s"})
+    assert not document.update_tool("Missing", {"alias": "missing"})
+    document.flush()
+
+    assert config_path.read_text() == """\
+# Our ecosystem
+ecosystem:
+  centralTool:
+    name: Kubernetes  # the hub
+    alias: k8s
+  groups:
+    - category: Cluster Management
+      tools:
+        - name: Rancher
+          alias: rancher
+          svgURL: https://example.com/rancher.svg
+
+        - {name: Lens, alias: 'lens, the IDE'}
+        - name: Portainer
+          alias: portainer-io
+"""
+
+
+def test_changes_made_since_reading_are_kept(config_path):
+    document = config_editor.ConfigDocument(str(config_path))
+    document.update_tool("Lens", {"alias": "lens"})
+    config_path.write_text(CONFIG_TEXT.replace("rancher-old", "rancher-new") + "        - name: Helm\n")
+    document.flush()
+
+    tools = yaml.safe_load(config_path.read_text())["ecosystem"]["groups"][0]["tools"]
+    assert tools[0]["alias"] == "rancher-new"
+    assert tools[1] == {"name": "Lens", "alias": "lens"}
+    assert tools[3] == {"name": "Helm"}
+
+
+def test_file_permissions_are_kept(config_path):
+    os.chmod(config_path, 0o640)
+    document = config_editor.ConfigDocument(str(config_path))
+    document.update_tool("Lens", {"alias": "lens"})
+    document.flush()
+
+    assert stat.S_IMODE(os.stat(config_path).st_mode) == 0o640
+
+
+def test_symlinked_config_updates_its_target(config_path, tmp_path):
+    link_path = tmp_path / "link.yml"
+    link_path.symlink_to(config_path)
+
+    editor = config_editor.ConfigEditor()
+    editor.update_tool(str(link_path), "Lens", {"alias": "lens"})
+    editor.flush()
+
+    assert link_path.is_symlink()
+    assert "{name: Lens, alias: lens}" in config_path.read_text()
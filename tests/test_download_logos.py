@@ -0,0 +1,151 @@
+import json
+import time
+import threading
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from logo_diagram_generator import download_logos, missing_logos
+
+BASE_URL = "https://logos.test"
+
+
+class FakeAdapter(BaseAdapter):
+    """
+    Transport adapter answering from a dict of URL -> logo body (or an exception to raise), recording the thread each
+    request was sent from. Earlier tools are answered more slowly, so downloads finish out of order.
+    """
+
+    def __init__(self, bodies, delays=None):
+        super().__init__()
+        self.bodies = bodies
+        self.delays = delays or {}
+        self.threads = set()
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self.lock:
+            self.threads.add(threading.get_ident())
+            self.urls.append(request.url)
+        time.sleep(self.delays.get(request.url, 0))
+        body = self.bodies.get(request.url)
+        if isinstance(body, Exception):
+            raise body
+
+        response = requests.Response()
+        response.status_code = 404 if body is None else 200
+        response._content = body or b""
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def logo_url(slug):
+    return f"{BASE_URL}/logos/{slug}/{slug}-ar21.svg"
+
+
+def logo_body(slug):
+    return f'<svg xmlns="http://www.w3.org/2000/svg" id="{slug}"/>'.encode("utf-8")
+
+
+class SessionRecorder:
+    def __init__(self):
+        self.adapter = None
+        self.sessions = []
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    """
+    Replaces create_session with one mounting the recorder's FakeAdapter, and records every session created.
+    """
+    monkeypatch.setattr(download_logos, "VECTORLOGOZONE_BASE_URL", BASE_URL)
+    monkeypatch.setattr(requests, "get", lambda *args, **kwargs: pytest.fail("Downloads must use the shared session"))
+    recorder = SessionRecorder()
+    create_session = download_logos.create_session
+
+    def create_fake_session(**kwargs):
+        session = create_session(**kwargs)
+        session.mount("https://", recorder.adapter)
+        recorder.sessions.append(session)
+        return session
+
+    monkeypatch.setattr(download_logos, "create_session", create_fake_session)
+    return recorder
+
+
+def test_concurrent_downloads_keep_each_result_with_its_tool(sessions, tmp_path):
+    slugs = [f"tool_{index}" for index in range(12)]
+    failing_slugs = {"tool_3", "tool_8"}
+    bodies = {logo_url(slug): logo_body(slug) for slug in slugs if slug not in failing_slugs}
+    # One tool's server is unreachable, which mustn't stop any other download
+    bodies[logo_url("tool_8")] = requests.exceptions.ConnectionError("unreachable")
+    delays = {logo_url(slug): (len(slugs) - index) * 0.005 for index, slug in enumerate(slugs)}
+    sessions.adapter = FakeAdapter(bodies, delays)
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+
+    download_logos.download_tool_logos(
+        [("config.yml", {"name": slug}) for slug in slugs],
+        str(logos_dir),
+        concurrency=4,
+        cache_dir=str(tmp_path / "cache"),
+        interactive=False,
+    )
+
+    for slug in slugs:
+        logo = (logos_dir / f"{slug}.svg").read_bytes()
+        if slug in failing_slugs:
+            assert missing_logos.is_placeholder_svg(logo)
+        else:
+            assert logo == logo_body(slug)
+    report = json.loads((logos_dir / missing_logos.MISSING_LOGOS_REPORT_FILENAME).read_text())
+    assert sorted(report["tools"]) == sorted(failing_slugs)
+
+    # Every download shares one session (and so one connection pool), across several threads
+    assert len(sessions.sessions) == 1
+    assert len(sessions.adapter.threads) > 1
+    assert sorted(sessions.adapter.urls) == sorted(logo_url(slug) for slug in slugs)
+
+
+def test_tools_sharing_a_logo_are_downloaded_once(sessions, tmp_path):
+    sessions.adapter = FakeAdapter({logo_url("kubernetes"): logo_body("kubernetes")})
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+
+    download_logos.download_tool_logos(
+        [("a.yml", {"name": "Kubernetes"}), ("b.yml", {"name": "Kubernetes", "label": "K8s"})],
+        str(logos_dir),
+        cache_dir=str(tmp_path / "cache"),
+        interactive=False,
+    )
+
+    assert sessions.adapter.urls == [logo_url("kubernetes")]
+
+
+def test_create_session_pools_and_retries_transient_errors():
+    session = download_logos.create_session(pool_size=16, retries=5, backoff_factor=0.25)
+
+    for scheme in ("http://", "https://"):
+        adapter = session.get_adapter(f"{scheme}logos.test")
+        assert isinstance(adapter, HTTPAdapter)
+        assert adapter._pool_connections == 16
+        assert adapter._pool_maxsize == 16
+        retry = adapter.max_retries
+        assert retry.total == 5
+        assert retry.backoff_factor == 0.25
+        assert set(retry.status_forcelist) == {429, 500, 502, 503, 504}
+        assert list(retry.allowed_methods) == ["GET"]
+        # The last response is returned rather than raised, so a 503 is handled like any other failed status
+        assert retry.raise_on_status is False
+        assert retry.is_retry("GET", 503)
+        assert not retry.is_retry("GET", 404)
+        assert not retry.is_retry("POST", 503)
+    session.close()
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+graphviz = pytest.importorskip("graphviz")
+
+from logo_diagram_generator import generate_diagram, layout_cache
+
+CONFIG = {
+    "ecosystem": {
+        "centralTool": {"name": "Kubernetes"},
+        "groups": [
+            {"category": "Cluster Management", "tools": [{"name": "Rancher"}, {"name": "Lens"}]},
+            {"category": "Monitoring", "tools": [{"name": "Prometheus"}]},
+        ],
+    }
+}
+
+
+def with_style(**style):
+    return {"ecosystem": dict(CONFIG["ecosystem"], style=style)}
+
+
+@pytest.fixture
+def pipe_calls(monkeypatch):
+    """
+    Stands in for the Graphviz binaries: layouts (json) place every node at the origin, and renders (svg) return a
+    stub; every call's format, engine and options are recorded.
+    """
+    calls = []
+
+    def pipe(dot, format=None, engine=None, neato_no_op=None, **kwargs):
+        calls.append((format, engine or dot.engine, neato_no_op))
+        if format == "json":
+            names = [line.split()[0].strip('"') for line in dot.body if "[" in line and "->" not in line and "=" in line]
+            return json.dumps({"bb": "0,0,100,100", "objects": [{"name": name, "pos": "0,0"} for name in names]}).encode("utf-8")
+        return b"<svg/>"
+
+    monkeypatch.setattr(graphviz.Digraph, "pipe", pipe)
+    return calls
+
+
+def test_layout_key_ignores_style_only_attributes():
+    dot_source = 'digraph { a [color=red id=a] b [fontcolor="#fff"] a -> b [color=blue] }'
+    restyled_source = 'digraph { a [color=green id=x] b [fontcolor="#000"] a -> b [color=red] }'
+    assert layout_cache.compute_layout_key(dot_source, "neato") == layout_cache.compute_layout_key(restyled_source, "neato")
+
+    assert layout_cache.compute_layout_key(dot_source, "neato") != layout_cache.compute_layout_key(dot_source, "fdp")
+    moved_source = 'digraph { a [color=red id=a margin=1] b [fontcolor="#fff"] a -> b [color=blue] }'
+    assert layout_cache.compute_layout_key(dot_source, "neato") != layout_cache.compute_layout_key(moved_source, "neato")
+
+
+def test_layout_cache_persists_and_evicts(tmp_path):
+    cache = layout_cache.LayoutCache(cache_dir=str(tmp_path), max_entries=1)
+    cache.put("a", {"nodes": {"x": "1,1"}})
+    cache.put("b", {"nodes": {}})
+
+    # Evicted from memory, but read back from disk by this or any other cache on the same directory
+    assert cache.get("a") == {"nodes": {"x": "1,1"}}
+    assert layout_cache.LayoutCache(cache_dir=str(tmp_path)).get("b") == {"nodes": {}}
+    assert layout_cache.LayoutCache(cache_dir=str(tmp_path)).get("c") is None
+
+
+def test_themes_share_one_neato_layout(pipe_calls):
+    cache = layout_cache.LayoutCache()
+    generate_diagram.render_text_only_svg(with_style(diagramBackgroundColor="#ffffff"), "light", layout_cache=cache)
+    generate_diagram.render_text_only_svg(with_style(diagramBackgroundColor="#111111"), "dark", layout_cache=cache)
+
+    assert [call for call in pipe_calls if call[0] == "json"] == [("json", "neato", None)]
+    assert [call for call in pipe_calls if call[0] == "svg"] == [("svg", "neato", 2)] * 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.parametrize("engine", ["dot", "fdp", "circo"])
+def test_other_engines_render_with_their_own_routing(pipe_calls, engine):
+    cache = layout_cache.LayoutCache()
+    generate_diagram.render_text_only_svg(with_style(diagramEngine=engine), "diagram", layout_cache=cache)
+
+    assert pipe_calls == [("svg", engine, None)]
+    assert (cache.hits, cache.misses) == (0, 0)
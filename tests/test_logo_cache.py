@@ -0,0 +1,143 @@
+import os
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from logo_diagram_generator import download_logos, logo_cache
+
+
+class StandInServer:
+    """
+    Local stand-in for VectorLogoZone, serving logos with ETags and answering conditional requests with 304.
+    """
+
+    def __init__(self):
+        self.logos = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match")))
+                body = server.logos.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                etag = f'"{hashlib.sha256(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "image/svg+xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def add_logo(self, slug, body):
+        self.logos[f"/logos/{slug}/{slug}-ar21.svg"] = body
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = StandInServer()
+    monkeypatch.setattr(download_logos, "VECTORLOGOZONE_BASE_URL", server.base_url)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def logos_dir(tmp_path):
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    return str(logos_dir)
+
+
+def fetch(logos_dir, cache, name, **kwargs):
+    return download_logos.fetch_svg({"name": name}, logos_dir, cache=cache, timeout=5, **kwargs)
+
+
+def read_logo(logos_dir, slug):
+    with open(os.path.join(logos_dir, f"{slug}.svg"), "rb") as file:
+        return file.read()
+
+
+def test_refresh_revalidates_with_etag(server, logos_dir, tmp_path):
+    server.add_logo("rancher", b"<svg>v1</svg>")
+    cache = logo_cache.LogoCache(cache_dir=str(tmp_path / "cache"))
+
+    assert fetch(logos_dir, cache, "Rancher")
+    assert server.requests == [("/logos/rancher/rancher-ar21.svg", None)]
+
+    # Unchanged on the server: a conditional request, answered with 304, and the logo is kept
+    assert fetch(logos_dir, cache, "Rancher", refresh=True)
+    etag = f'"{hashlib.sha256(b"<svg>v1</svg>").hexdigest()}"'
+    assert server.requests[-1] == ("/logos/rancher/rancher-ar21.svg", etag)
+    assert read_logo(logos_dir, "rancher") == b"<svg>v1</svg>"
+
+    # Changed on the server: the conditional request gets the new logo
+    server.add_logo("rancher", b"<svg>v2</svg>")
+    assert fetch(logos_dir, cache, "Rancher", refresh=True)
+    assert read_logo(logos_dir, "rancher") == b"<svg>v2</svg>"
+
+
+def test_cleared_logos_dir_is_restored_from_cache(server, logos_dir, tmp_path):
+    server.add_logo("rancher", b"<svg>rancher</svg>")
+    cache = logo_cache.LogoCache(cache_dir=str(tmp_path / "cache"))
+    assert fetch(logos_dir, cache, "Rancher")
+    cache.save()
+
+    # A new run with the logos directory cleared restores the logo without any request
+    os.remove(os.path.join(logos_dir, "rancher.svg"))
+    cache = logo_cache.LogoCache(cache_dir=str(tmp_path / "cache"))
+    assert fetch(logos_dir, cache, "Rancher")
+    assert len(server.requests) == 1
+    assert read_logo(logos_dir, "rancher") == b"<svg>rancher</svg>"
+
+    # With refresh, it's revalidated first, and the cached body is used on 304
+    os.remove(os.path.join(logos_dir, "rancher.svg"))
+    assert fetch(logos_dir, cache, "Rancher", refresh=True)
+    assert len(server.requests) == 2
+    assert server.requests[-1][1] is not None
+    assert read_logo(logos_dir, "rancher") == b"<svg>rancher</svg>"
+
+
+def test_not_found_is_skipped_until_ttl_expires(server, logos_dir, tmp_path, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(logo_cache.time, "time", lambda: now[0])
+    cache = logo_cache.LogoCache(cache_dir=str(tmp_path / "cache"), not_found_ttl=60)
+
+    assert not fetch(logos_dir, cache, "Unknown")
+    assert len(server.requests) == 1
+
+    now[0] += 30
+    assert not fetch(logos_dir, cache, "Unknown")
+    assert len(server.requests) == 1
+
+    # Once the TTL has passed the URL is tried again, and found if the logo has since been added
+    now[0] += 31
+    server.add_logo("unknown", b"<svg>found</svg>")
+    assert fetch(logos_dir, cache, "Unknown")
+    assert len(server.requests) == 2
+    assert read_logo(logos_dir, "unknown") == b"<svg>found</svg>"
@@ -0,0 +1,82 @@
+import xml.dom.minidom
+
+from logo_diagram_generator import logo_fragments
+
+LOGO_SVG = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 10 10">'
+    b'<defs><linearGradient id="grad"/><style>.st0{fill:red}</style></defs>'
+    b'<path id="shape" class="st0" fill="url(#grad)" d="M0 0h10v10z"/>'
+    b'<use xlink:href="#shape"/><a href="https://example.com"/></svg>'
+)
+
+
+def test_namespace_logo_svg_prefixes_ids_references_and_classes():
+    namespaced = logo_fragments.namespace_logo_svg(LOGO_SVG.decode("utf-8"), "tool")
+
+    assert 'id="tool-grad"' in namespaced
+    assert 'id="tool-shape"' in namespaced
+    assert 'fill="url(#tool-grad)"' in namespaced
+    assert 'xlink:href="#tool-shape"' in namespaced
+    assert ".tool-st0{fill:red}" in namespaced
+    assert 'class="tool-st0"' in namespaced
+    # External references are left alone
+    assert 'href="https://example.com"' in namespaced
+
+
+def test_fragment_cache_parses_each_logo_once():
+    cache = logo_fragments.LogoFragmentCache()
+
+    logo_node = cache.get_logo_node(LOGO_SVG, "tool")
+    assert cache.get_logo_node(LOGO_SVG, "tool") is logo_node
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    assert logo_node.getAttribute("id") == "tool-logo"
+    assert logo_node.getAttribute("width") == str(logo_fragments.LOGO_WIDTH)
+    assert logo_node.getAttribute("height") == str(logo_fragments.LOGO_HEIGHT)
+
+    # Another prefix for the same content is a separate fragment
+    assert cache.get_logo_node(LOGO_SVG, "other").getAttribute("id") == "other-logo"
+    assert cache.misses == 2
+
+
+def test_fragment_cache_evicts_least_recently_used():
+    cache = logo_fragments.LogoFragmentCache(max_entries=2)
+    first = cache.get_logo_node(LOGO_SVG, "a")
+    cache.get_logo_node(LOGO_SVG, "b")
+    cache.get_logo_node(LOGO_SVG, "a")
+    cache.get_logo_node(LOGO_SVG, "c")
+
+    assert cache.get_logo_node(LOGO_SVG, "a") is first
+    assert cache.misses == 3
+    cache.get_logo_node(LOGO_SVG, "b")
+    assert cache.misses == 4
+
+
+def test_apply_stroke_sets_stroke_on_shapes_only():
+    logo_node = xml.dom.minidom.parseString(LOGO_SVG).documentElement
+    logo_fragments.apply_stroke(logo_node, "white", 2)
+
+    path = logo_node.getElementsByTagName("path")[0]
+    assert (path.getAttribute("stroke"), path.getAttribute("stroke-width")) == ("white", "2")
+    assert not logo_node.getElementsByTagName("use")[0].hasAttribute("stroke")
+
+
+def test_resolve_logo_style_falls_back_to_ecosystem_defaults():
+    ecosystem_style = {"defaultLogoScale": 2, "defaultLogoStrokeColor": "black", "defaultLogoStrokeWidth": 1}
+    assert logo_fragments.resolve_logo_style({"name": "a"}, ecosystem_style) == (2, 0, 0, "black", 1)
+    assert logo_fragments.resolve_logo_style({"name": "a", "scale": 1, "positionAdjustX": 5}, {}) == (1, 5, 0, None, 0)
+
+
+def test_logo_transform_centres_scaled_logo():
+    assert logo_fragments.logo_transform("100", "50", 1, 0, 0) == "translate(40.0, 20.0) scale(1)"
+
+
+def test_symbol_table_emits_each_logo_variant_once():
+    symbol_table = logo_fragments.LogoSymbolTable()
+
+    assert symbol_table.get_symbol("tool", LOGO_SVG, None, 0) == ("tool", True)
+    assert symbol_table.get_symbol("tool", LOGO_SVG, None, 0) == ("tool", False)
+    # A stroke override is set on the logo's own shapes, so needs a symbol of its own
+    assert symbol_table.get_symbol("tool", LOGO_SVG, "white", 2) == ("tool--2", True)
+    assert symbol_table.get_symbol("tool", LOGO_SVG, "white", 2) == ("tool--2", False)
+    assert symbol_table.get_symbol("other", LOGO_SVG, None, 0) == ("other", True)
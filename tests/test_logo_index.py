@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from logo_diagram_generator import generate_diagram, logo_index, logo_pack
+
+WIDE_LOGO = b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 40 10"><path d="M0 0h40v10z"/><path d="M0 0h1z"/></svg>'
+SQUARE_LOGO = b'<svg xmlns="http://www.w3.org/2000/svg" width="1in" height="72pt" viewBox="0,0,10,10"><rect/></svg>'
+
+
+def test_measure_logo():
+    metadata = logo_index.measure_logo(SQUARE_LOGO)
+
+    assert metadata["viewBox"] == [0, 0, 10, 10]
+    assert (metadata["width"], metadata["height"]) == (96, 96)
+    assert (metadata["elements"], metadata["paths"], metadata["bytes"]) == (2, 0, len(SQUARE_LOGO))
+
+    metadata = logo_index.measure_logo(WIDE_LOGO)
+    assert (metadata["width"], metadata["height"], metadata["paths"]) == (40, 10, 2)
+
+    metadata = logo_index.measure_logo(b"<svg><unclosed></svg>")
+    assert metadata["elements"] is None and metadata["paths"] is None
+    assert metadata["sha256"] is not None
+
+
+def test_fitted_logo_size():
+    assert logo_index.fitted_logo_size(logo_index.measure_logo(WIDE_LOGO)) == (120, 30)
+    assert logo_index.fitted_logo_size(logo_index.measure_logo(SQUARE_LOGO)) == (60, 60)
+    # Without a viewBox a logo isn't scaled, so covers its intrinsic size within the box
+    no_view_box = logo_index.measure_logo(b'<svg xmlns="http://www.w3.org/2000/svg" width="200" height="20"/>')
+    assert logo_index.fitted_logo_size(no_view_box) == (120, 20)
+    assert logo_index.fitted_logo_size(None) == (120, 60)
+
+
+def test_index_only_measures_changed_logos(tmp_path, monkeypatch):
+    (tmp_path / "wide.svg").write_bytes(WIDE_LOGO)
+    (tmp_path / "square.svg").write_bytes(SQUARE_LOGO)
+    measured = []
+    measure_logo = logo_index.measure_logo
+    monkeypatch.setattr(logo_index, "measure_logo", lambda content: measured.append(content) or measure_logo(content))
+
+    index = logo_index.LogoIndex(str(tmp_path))
+    assert index.update()["wide"]["paths"] == 2
+    index.save()
+    assert len(measured) == 2
+    assert (tmp_path / logo_index.INDEX_FILENAME).exists()
+
+    # A fresh index loads the saved metadata; only the rewritten logo is measured again, and removed logos are dropped
+    (tmp_path / "square.svg").write_bytes(WIDE_LOGO)
+    os.utime(tmp_path / "square.svg", ns=(1, 1))
+    (tmp_path / "wide.svg").unlink()
+    index = logo_index.LogoIndex(str(tmp_path))
+    logos_metadata = index.update()
+    assert list(logos_metadata) == ["square"]
+    assert logos_metadata["square"]["paths"] == 2
+    assert len(measured) == 3
+    assert index.update_logo("missing") is None
+
+
+def test_packed_logos_are_indexed_from_the_pack(tmp_path):
+    (tmp_path / "wide.svg").write_bytes(WIDE_LOGO)
+    logo_pack.pack_logos(str(tmp_path), remove_loose=True)
+
+    config = {"ecosystem": {"groups": [{"tools": [{"name": "Wide"}, {"name": "Gone"}]}]}}
+    logos_metadata = logo_index.index_config_logos(config, str(tmp_path))
+
+    assert logos_metadata["wide"]["viewBox"] == [0, 0, 40, 10]
+    assert logos_metadata["gone"] is None
+    assert logo_index.fitted_logo_sizes(logos_metadata) == {"wide": (120, 30)}
+
+
+def test_find_pathological_logos():
+    logos_metadata = {"wide": logo_index.measure_logo(WIDE_LOGO), "square": logo_index.measure_logo(SQUARE_LOGO), "gone": None}
+
+    assert logo_index.find_pathological_logos(logos_metadata, max_paths=1, max_bytes=len(SQUARE_LOGO) - 1) == {
+        "wide": ["2 paths", f"{len(WIDE_LOGO)} bytes"],
+        "square": [f"{len(SQUARE_LOGO)} bytes"],
+    }
+    assert logo_index.find_pathological_logos(logos_metadata) == {}
+
+
+@pytest.mark.parametrize("size_nodes_to_logos, scale_is_layout_input", [("false", False), ("true", True)])
+def test_logo_scales_are_layout_inputs_when_sizing_nodes_to_logos(size_nodes_to_logos, scale_is_layout_input):
+    config = {
+        "ecosystem": {
+            "groups": [{"category": "A", "tools": [{"name": "Wide", "scale": 1}]}],
+            "style": {"diagramEngine": "neato", "sizeNodesToLogos": size_nodes_to_logos, "defaultLogoScale": 1},
+        }
+    }
+    scaled_config = {
+        "ecosystem": {
+            "groups": [{"category": "A", "tools": [{"name": "Wide", "scale": 2}]}],
+            "style": {"diagramEngine": "neato", "sizeNodesToLogos": size_nodes_to_logos, "defaultLogoScale": 2},
+        }
+    }
+
+    texts_differ = generate_diagram.text_diagram_config(config) != generate_diagram.text_diagram_config(scaled_config)
+    assert texts_differ == scale_is_layout_input
+
+
+@pytest.mark.parametrize("size_nodes_to_logos, index_is_written", [("false", False), ("true", True)])
+def test_builds_only_index_logos_when_sizing_nodes_to_logos(tmp_path, monkeypatch, size_nodes_to_logos, index_is_written):
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    (logos_dir / "kubernetes.svg").write_bytes(SQUARE_LOGO)
+    (logos_dir / "wide.svg").write_bytes(WIDE_LOGO)
+    config = {
+        "ecosystem": {
+            "centralTool": {"name": "Kubernetes"},
+            "groups": [{"category": "A", "tools": [{"name": "Wide"}]}],
+            "style": {"diagramEngine": "radial-native", "sizeNodesToLogos": size_nodes_to_logos},
+        }
+    }
+    monkeypatch.setattr(
+        generate_diagram.rasterize,
+        "rasterize_svg",
+        lambda svg, widths, formats, **kwargs: {(width, image_format): b"image" for width in widths for image_format in formats},
+    )
+
+    generate_diagram.generate_diagram_from_config_dict(config, "diagram", str(tmp_path), str(logos_dir), 100)
+
+    assert (logos_dir / logo_index.INDEX_FILENAME).exists() == index_is_written
+    assert (tmp_path / "diagram_logos.svg").exists()
@@ -0,0 +1,102 @@
+import pytest
+
+from logo_diagram_generator import logo_pack
+
+LOGOS = {
+    "kubernetes": b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"><circle r="5"/></svg>',
+    "rancher": b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 10"><rect width="20" height="10"/></svg>',
+    "lens": b'<svg xmlns="http://www.w3.org/2000/svg"/>',
+}
+
+
+@pytest.fixture
+def logos_dir(tmp_path):
+    for slug, content in LOGOS.items():
+        (tmp_path / f"{slug}.svg").write_bytes(content)
+    return tmp_path
+
+
+def test_pack_and_unpack_round_trip(logos_dir):
+    assert logo_pack.pack_logos(str(logos_dir), remove_loose=True) == len(LOGOS)
+    assert sorted(path.name for path in logos_dir.iterdir()) == [logo_pack.PACK_FILENAME]
+
+    store = logo_pack.LogoStore(str(logos_dir))
+    assert store.slugs() == sorted(LOGOS)
+    assert all(store.is_packed(slug) and store.read(slug) == content for slug, content in LOGOS.items())
+    store.close()
+
+    assert logo_pack.unpack_logos(str(logos_dir), remove_pack=True) == len(LOGOS)
+    assert {path.stem: path.read_bytes() for path in logos_dir.iterdir()} == LOGOS
+
+
+def test_loose_logo_takes_precedence_over_packed(logos_dir):
+    logo_pack.pack_logos(str(logos_dir))
+    edited_logo = b'<svg xmlns="http://www.w3.org/2000/svg"><rect/></svg>'
+    (logos_dir / "rancher.svg").write_bytes(edited_logo)
+    (logos_dir / "kubernetes.svg").unlink()
+
+    store = logo_pack.LogoStore(str(logos_dir))
+    assert not store.is_packed("rancher")
+    assert store.read("rancher") == edited_logo
+    assert store.is_packed("kubernetes")
+    assert store.read("kubernetes") == LOGOS["kubernetes"]
+    store.close()
+
+    # Unpacking keeps the edited loose file, unless told to overwrite it
+    assert logo_pack.unpack_logos(str(logos_dir)) == 1
+    assert (logos_dir / "rancher.svg").read_bytes() == edited_logo
+    logo_pack.unpack_logos(str(logos_dir), overwrite=True)
+    assert (logos_dir / "rancher.svg").read_bytes() == LOGOS["rancher"]
+
+
+def test_unpack_detects_corrupt_logo(logos_dir):
+    logo_pack.pack_logos(str(logos_dir), remove_loose=True)
+    pack_path = logos_dir / logo_pack.PACK_FILENAME
+    pack_content = bytearray(pack_path.read_bytes())
+    pack_content[logo_pack.PACK_HEADER.size + 1] ^= 0xFF
+    pack_path.write_bytes(bytes(pack_content))
+
+    with pytest.raises(ValueError, match="corrupt"):
+        logo_pack.unpack_logos(str(logos_dir))
+
+
+def test_invalid_pack_is_rejected(tmp_path):
+    pack_path = tmp_path / logo_pack.PACK_FILENAME
+    pack_path.write_bytes(b"not a pack at all, but long enough for a header")
+
+    with pytest.raises(ValueError, match="Invalid logo pack"):
+        logo_pack.LogoPack(str(pack_path))
+
+
+def test_pack_file_on_its_own_is_a_store(tmp_path):
+    pack_path = tmp_path / "shipped.pack"
+    logo_pack.write_pack(str(pack_path), iter(LOGOS.items()))
+
+    store = logo_pack.open_logo_store(str(pack_path))
+    assert store.pack_only
+    assert store.read("lens") == LOGOS["lens"]
+    assert "missing" not in store
+    assert store.sha256("missing") is None
+    with pytest.raises(FileNotFoundError):
+        store.read("missing")
+    store.close()
+
+
+def test_callable_logo_store_reads_each_logo_once():
+    requests = []
+
+    def read_logo(slug):
+        requests.append(slug)
+        content = LOGOS.get(slug)
+        return content.decode("utf-8") if slug == "lens" else content
+
+    store = logo_pack.open_logo_store(read_logo)
+    assert isinstance(store, logo_pack.CallableLogoStore)
+    assert store.read("lens") == LOGOS["lens"]
+    assert store.sha256("lens") == store.sha256("lens")
+    assert "missing" not in store
+    with pytest.raises(FileNotFoundError):
+        store.read("missing")
+    assert requests == ["lens", "missing"]
+    assert store.slugs() == ["lens"]
+    assert logo_pack.open_logo_store(store) is store
@@ -0,0 +1,83 @@
+import json
+import xml.dom.minidom
+
+import pytest
+
+pytest.importorskip("requests")
+
+from logo_diagram_generator import download_logos, missing_logos, utils
+
+
+def test_placeholder_is_valid_svg_labelled_with_the_tool():
+    placeholder = missing_logos.create_placeholder_svg("R&D <Tools>")
+
+    document = xml.dom.minidom.parseString(placeholder)
+    assert document.documentElement.getAttribute("viewBox") == "0 0 120 60"
+    assert document.getElementsByTagName("text")[0].firstChild.data == "R&D <Tools>"
+    assert missing_logos.is_placeholder_svg(placeholder)
+    assert not missing_logos.is_placeholder_svg(b'<svg xmlns="http://www.w3.org/2000/svg"/>')
+
+
+def test_report_is_saved_and_removed_once_resolved(tmp_path):
+    report_path = tmp_path / missing_logos.MISSING_LOGOS_REPORT_FILENAME
+    report = missing_logos.MissingLogoReport(str(report_path))
+    report.add("config.yml", {"name": "Obscure Tool", "label": "Obscure"}, ["https://example.com/obscure.svg"])
+    report.save()
+
+    saved = json.loads(report_path.read_text())["tools"]
+    assert saved == {
+        "obscure_tool": {
+            "name": "Obscure Tool",
+            "label": "Obscure",
+            "config": "config.yml",
+            "urls_tried": ["https://example.com/obscure.svg"],
+        }
+    }
+
+    report = missing_logos.MissingLogoReport(str(report_path))
+    assert "obscure_tool" in report and len(report) == 1
+    report.remove("obscure_tool")
+    report.save()
+    assert not report_path.exists()
+
+
+def test_unreadable_report_is_ignored(tmp_path):
+    report_path = tmp_path / missing_logos.MISSING_LOGOS_REPORT_FILENAME
+    report_path.write_text("{not json")
+
+    assert len(missing_logos.MissingLogoReport(str(report_path))) == 0
+
+
+def test_non_interactive_download_uses_placeholders_then_replaces_them(tmp_path, monkeypatch):
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    tool_sources = [("config.yml", {"name": "Kubernetes"}), ("config.yml", {"name": "Obscure Tool", "label": "Obscure"})]
+    found_slugs = {"kubernetes"}
+    replaced_placeholders = []
+
+    def fetch_svg(tool_config, logos_dir, replace_placeholder=False, **kwargs):
+        slug = utils.slugify(tool_config["name"])
+        if replace_placeholder:
+            replaced_placeholders.append(slug)
+        if slug not in found_slugs:
+            return False
+        (tmp_path / "logos" / f"{slug}.svg").write_bytes(b'<svg xmlns="http://www.w3.org/2000/svg"/>')
+        return True
+
+    monkeypatch.setattr(download_logos, "fetch_svg", fetch_svg)
+
+    download_logos.download_tool_logos(tool_sources, str(logos_dir), cache_dir=str(tmp_path / "cache"), interactive=False)
+
+    report_path = logos_dir / missing_logos.MISSING_LOGOS_REPORT_FILENAME
+    assert list(json.loads(report_path.read_text())["tools"]) == ["obscure_tool"]
+    assert missing_logos.is_placeholder_svg((logos_dir / "obscure_tool.svg").read_bytes())
+    assert download_logos.has_real_logo(str(logos_dir), "kubernetes")
+    assert not download_logos.has_real_logo(str(logos_dir), "obscure_tool")
+
+    # Tools in the report are retried on the next run, and leave it once a real logo is found
+    found_slugs.add("obscure_tool")
+    download_logos.download_tool_logos(tool_sources, str(logos_dir), cache_dir=str(tmp_path / "cache"), interactive=False)
+
+    assert replaced_placeholders == ["obscure_tool"]
+    assert not report_path.exists()
+    assert download_logos.has_real_logo(str(logos_dir), "obscure_tool")
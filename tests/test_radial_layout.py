@@ -0,0 +1,127 @@
+import re
+import shutil
+import xml.dom.minidom
+
+import pytest
+
+from logo_diagram_generator import radial_layout
+
+
+def ecosystem_config(tool_count, group_count=10, **style):
+    """
+    A synthetic ecosystem with tool_count tools spread over group_count groups, some with long (two line) group names,
+    and every third tool drawn at a larger scale.
+    """
+    groups = [
+        {"category": f"Group {group_index} of the ecosystem" if group_index % 2 else f"Group {group_index}", "tools": []}
+        for group_index in range(group_count)
+    ]
+    for tool_index in range(tool_count):
+        tool = {"name": f"Tool {tool_index}"}
+        if tool_index % 3 == 0:
+            tool["scale"] = "2"
+        groups[tool_index % group_count]["tools"].append(tool)
+    return {
+        "ecosystem": {
+            "centralTool": {"name": "Kubernetes"},
+            "groups": groups,
+            "style": dict(style, diagramEngine=radial_layout.ENGINE_NAME),
+        }
+    }
+
+
+def overlapping_pairs(nodes):
+    boxes = [(name, node.box()) for name, node in nodes.items()]
+    return [
+        (name, other_name)
+        for index, (name, box) in enumerate(boxes)
+        for other_name, other in boxes[index + 1 :]
+        if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]
+    ]
+
+
+def test_layout_is_deterministic():
+    config = ecosystem_config(50)
+    nodes, edges = radial_layout.compute_radial_layout(config)
+    other_nodes, other_edges = radial_layout.compute_radial_layout(ecosystem_config(50))
+
+    assert list(nodes) == list(other_nodes)
+    assert [(node.x, node.y, node.rx, node.ry) for node in nodes.values()] == [
+        (node.x, node.y, node.rx, node.ry) for node in other_nodes.values()
+    ]
+    assert edges == other_edges
+    assert radial_layout.render_radial_svg(config, "diagram") == radial_layout.render_radial_svg(ecosystem_config(50), "diagram")
+
+
+def test_node_names_match_the_graphviz_graph():
+    nodes, edges = radial_layout.compute_radial_layout(ecosystem_config(4, group_count=2))
+
+    assert list(nodes) == ["Kubernetes", "label_group_0", "label_group_1_of_the_ecosystem", "Tool 0", "Tool 2", "Tool 1", "Tool 3"]
+    assert nodes["Kubernetes"].kind == "central"
+    assert (nodes["Kubernetes"].x, nodes["Kubernetes"].y) == (0, 0)
+    assert ("Kubernetes-label_group_0-edge", "Kubernetes", "label_group_0") in [edge[:3] for edge in edges]
+    assert ("label_group_0-Tool 0-edge", "label_group_0", "Tool 0") in [edge[:3] for edge in edges]
+
+
+@pytest.mark.parametrize("tool_count", [50, 200])
+def test_nodes_do_not_overlap(tool_count):
+    nodes, _ = radial_layout.compute_radial_layout(ecosystem_config(tool_count, groupLabelShape="ellipse"))
+
+    assert len(nodes) == 1 + 10 + tool_count
+    assert overlapping_pairs(nodes) == []
+
+
+def test_tools_are_sized_to_their_logos():
+    config = ecosystem_config(2, group_count=1)
+    nodes, _ = radial_layout.compute_radial_layout(config, logo_sizes={"tool_1": (300, 50)})
+
+    # Tool 0 is the nominal logo box at its own scale of 2, Tool 1 its logo's size at the default scale of 1.5
+    assert (nodes["Tool 0"].rx, nodes["Tool 0"].ry) == (120, 60)
+    assert (nodes["Tool 1"].rx, nodes["Tool 1"].ry) == (225, 37.5)
+
+
+def test_svg_has_the_ids_the_embedder_expects():
+    config = ecosystem_config(3, group_count=2)
+    document = xml.dom.minidom.parseString(radial_layout.render_radial_svg(config, "my diagram"))
+
+    groups = {group.getAttribute("id"): group for group in document.getElementsByTagName("g")}
+    assert groups["my diagram"].getAttribute("class") == "graph"
+    for tool_name in ("Kubernetes", "Tool 0", "Tool 1", "Tool 2"):
+        assert groups[tool_name].getAttribute("class") == "node"
+        assert len(groups[tool_name].getElementsByTagName("ellipse")) == 1
+    assert groups["cluster_group_0"].getAttribute("class") == "cluster"
+    assert groups["label_group_0-Tool 0-edge"].getAttribute("class") == "edge"
+
+
+def test_positions_can_be_pinned_for_neato():
+    """
+    The layout's positions, in Graphviz's coordinates (points, with y up), pin every node of the diagram's Graphviz
+    graph, so it can be rendered with neato -n2; actually rendered only where Graphviz is installed.
+    """
+    pytest.importorskip("graphviz")
+    from logo_diagram_generator import generate_diagram
+
+    config = ecosystem_config(20, group_count=4)
+    nodes, _ = radial_layout.compute_radial_layout(config)
+    del config["ecosystem"]["style"]["diagramEngine"]
+    dot, _ = generate_diagram.build_diagram_graph(config, "diagram")
+
+    layout = {"bb": None, "clusters": {}, "nodes": {name: radial_layout.format_points([(node.x, -node.y)]) for name, node in nodes.items()}}
+    min_x, min_y, max_x, max_y = (
+        min(node.box()[0] for node in nodes.values()),
+        min(-node.box()[3] for node in nodes.values()),
+        max(node.box()[2] for node in nodes.values()),
+        max(-node.box()[1] for node in nodes.values()),
+    )
+    layout["bb"] = ",".join(radial_layout.format_number(value) for value in (min_x, min_y, max_x, max_y))
+    generate_diagram.apply_layout(dot, layout)
+
+    # Every node of the graph is pinned: Graphviz nodes without a position would be laid out at the origin
+    node_statements = re.findall(r'^\s*("[^"]*"|\w+) \[([^\]]*)\]', dot.source, flags=re.MULTILINE)
+    assert {name.strip('"') for name, attributes in node_statements if "id=" in attributes} == set(nodes)
+    assert {name.strip('"') for name, attributes in node_statements if re.fullmatch(r'pos="-?[\d.]+,-?[\d.]+"', attributes)} == set(nodes)
+
+    if shutil.which("neato") is None:
+        pytest.skip("Graphviz isn't installed")
+    svg = dot.pipe(format="svg", engine="neato", neato_no_op=2)
+    assert b'id="Tool 0"' in svg
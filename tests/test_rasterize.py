@@ -0,0 +1,94 @@
+import io
+
+import pytest
+from PIL import Image
+
+from logo_diagram_generator import rasterize
+
+
+def test_parse_widths():
+    assert rasterize.parse_widths(3000) == [3000]
+    assert rasterize.parse_widths("3000,400,3000") == [3000, 400]
+    assert rasterize.parse_widths([800, "400"]) == [800, 400]
+    with pytest.raises(ValueError):
+        rasterize.parse_widths("0")
+    with pytest.raises(ValueError):
+        rasterize.parse_widths([])
+
+
+def test_parse_image_formats():
+    assert rasterize.parse_image_formats("PNG, jpg,jpeg,webp") == ["png", "jpeg", "webp"]
+    with pytest.raises(ValueError):
+        rasterize.parse_image_formats("gif")
+
+
+def test_image_output_path():
+    assert rasterize.image_output_path("out/diagram_logos.svg", 3000, "png", 3000) == "out/diagram_logos.png"
+    assert rasterize.image_output_path("out/diagram_logos.svg", 400, "jpeg", 3000) == "out/diagram_logos_400w.jpg"
+
+
+def render_test_png():
+    # Half opaque red, half transparent
+    image = Image.new("RGBA", (20, 10), (0, 0, 0, 0))
+    image.paste((255, 0, 0, 255), (0, 0, 10, 10))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_convert_png_to_jpeg_flattens_transparency_onto_white():
+    jpeg = Image.open(io.BytesIO(rasterize.convert_png(render_test_png(), "jpeg")))
+
+    assert jpeg.format == "JPEG"
+    assert jpeg.mode == "RGB"
+    assert all(abs(a - b) <= 8 for a, b in zip(jpeg.getpixel((2, 5)), (255, 0, 0)))
+    assert all(channel >= 247 for channel in jpeg.getpixel((17, 5)))
+
+
+def test_convert_png_quality_applies_to_lossy_formats():
+    png = render_test_png()
+
+    assert rasterize.convert_png(png, "png", quality=10) == png
+    webp = rasterize.convert_png(png, "webp", quality=80)
+    assert Image.open(io.BytesIO(webp)).format == "WEBP"
+    assert rasterize.convert_png(png, "webp", quality=1) != webp
+
+
+def test_png_strip_writer_round_trips_pixels():
+    image = Image.effect_noise((37, 23), 64).convert("RGBA")
+    output = io.BytesIO()
+    png_writer = rasterize.PngStripWriter(output, image.width, image.height)
+    for strip_top in range(0, image.height, 5):
+        png_writer.write_strip(image.crop((0, strip_top, image.width, min(strip_top + 5, image.height))))
+    png_writer.close()
+
+    assert Image.open(io.BytesIO(output.getvalue())).tobytes() == image.tobytes()
+
+
+def test_png_strip_writer_requires_every_row():
+    png_writer = rasterize.PngStripWriter(io.BytesIO(), 4, 4)
+    png_writer.write_strip(Image.new("RGBA", (4, 3)))
+    with pytest.raises(ValueError):
+        png_writer.close()
+
+
+TILED_SVG = b"""<svg xmlns="http://www.w3.org/2000/svg" width="300" height="170" viewBox="0 0 300 170">
+  <defs>
+    <linearGradient id="fade"><stop offset="0" stop-color="#f00"/><stop offset="1" stop-color="#00f" stop-opacity="0.2"/></linearGradient>
+  </defs>
+  <rect x="5.5" y="3.25" width="280" height="160" rx="20" fill="url(#fade)"/>
+  <circle cx="150" cy="85" r="61.3" fill="none" stroke="#000" stroke-width="3.7"/>
+  <text x="40" y="100" font-size="31">Tiled</text>
+</svg>"""
+
+
+@pytest.mark.parametrize("tile_height", [1, 7, 64, 1000])
+def test_tiled_rendering_matches_untiled_pixels(cairosvg, tile_height):
+    svg_tree = rasterize.parse_svg(TILED_SVG)
+    untiled = Image.open(io.BytesIO(rasterize.render_png(svg_tree, 450))).convert("RGBA")
+    tiled_png = io.BytesIO()
+    rasterize.render_png_tiled(svg_tree, 450, tiled_png, tile_height)
+    tiled = Image.open(io.BytesIO(tiled_png.getvalue())).convert("RGBA")
+
+    assert tiled.size == untiled.size
+    assert tiled.tobytes() == untiled.tobytes()
@@ -0,0 +1,101 @@
+import copy
+import xml.dom.minidom
+
+import pytest
+
+from logo_diagram_generator import generate_diagram, rasterize, utils
+
+CONFIG = {
+    "ecosystem": {
+        "centralTool": {"name": "Kubernetes"},
+        "groups": [
+            {"category": "Cluster Management", "tools": [{"name": "Rancher"}, {"name": "Lens"}]},
+            {"category": "Monitoring", "tools": [{"name": "Prometheus"}]},
+        ],
+        "style": {"diagramEngine": "radial-native", "groupLabelFontcolor": "#333333"},
+    }
+}
+
+
+def logo_svg(color):
+    return f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 10"><rect width="20" height="10" fill="{color}"/></svg>'
+
+
+# Each logo in a distinct color, so it can be found in the rendered diagram
+LOGOS = {"kubernetes": logo_svg("#000001"), "rancher": logo_svg("#000002"), "lens": logo_svg("#000003"), "prometheus": logo_svg("#000004")}
+
+
+@pytest.fixture
+def rasterized(monkeypatch):
+    """
+    Stands in for cairosvg: each image is its width and format, and the SVG of every call is recorded.
+    """
+    svgs = []
+
+    def rasterize_svg(svg, widths, formats, **kwargs):
+        svgs.append(svg)
+        return {(width, image_format): f"{image_format} {width}".encode("utf-8") for width in widths for image_format in formats}
+
+    monkeypatch.setattr(rasterize, "rasterize_svg", rasterize_svg)
+    return svgs
+
+
+def test_config_is_not_changed_by_overrides_or_themes():
+    config = copy.deepcopy(CONFIG)
+    override_configs = utils.merge_theme_overrides([{"style.diagramBackgroundColor": "#111111"}], "dark")
+
+    result = generate_diagram.render_diagram(config, "diagram", logos=LOGOS.get, override_configs=override_configs)
+
+    assert config == CONFIG
+    # The overrides and theme were applied to the rendered diagram all the same
+    assert b'fill="#111111"' in result["text_svg"]
+    assert b'fill="#ffffff"' in result["text_svg"]
+    assert b'fill="#333333"' not in result["text_svg"]
+
+
+def test_callable_logos_are_embedded():
+    requested_slugs = []
+
+    def read_logo(slug):
+        requested_slugs.append(slug)
+        return LOGOS.get(slug)
+
+    result = generate_diagram.render_diagram(CONFIG, "diagram", logos=read_logo)
+
+    assert sorted(set(requested_slugs)) == ["kubernetes", "lens", "prometheus", "rancher"]
+    # Each logo is read once, however many times it's used
+    assert len(requested_slugs) == len(set(requested_slugs))
+    for color in ("#000001", "#000002", "#000003", "#000004"):
+        assert f'fill="{color}"'.encode("utf-8") in result["svg"]
+    xml.dom.minidom.parseString(result["svg"])
+
+
+def test_missing_in_memory_logo_is_reported():
+    with pytest.raises(FileNotFoundError, match="kubernetes"):
+        generate_diagram.render_diagram(CONFIG, "diagram", logos={"rancher": LOGOS["rancher"]}.get)
+
+
+def test_returned_bytes_match_the_written_files(tmp_path, rasterized):
+    result = generate_diagram.render_diagram(
+        CONFIG, "My Diagram", logos=LOGOS.get, png_width=[200, 100], image_formats="png,webp", output_dir=str(tmp_path)
+    )
+
+    assert rasterized == [result["svg"]]
+    written = {path.name: path.read_bytes() for path in tmp_path.iterdir()}
+    assert written == {
+        "my_diagram_text.svg": result["text_svg"],
+        "my_diagram_logos.svg": result["svg"],
+        "my_diagram_logos.png": result["images"][(200, "png")],
+        "my_diagram_logos.webp": result["images"][(200, "webp")],
+        "my_diagram_logos_100w.png": result["images"][(100, "png")],
+        "my_diagram_logos_100w.webp": result["images"][(100, "webp")],
+    }
+
+
+def test_nothing_is_written_without_an_output_dir(tmp_path, monkeypatch, rasterized):
+    monkeypatch.chdir(tmp_path)
+
+    result = generate_diagram.render_diagram(CONFIG, "diagram", logos=LOGOS.get, png_width=100)
+
+    assert list(tmp_path.iterdir()) == []
+    assert result["images"] == {(100, "png"): b"png 100"}
@@ -0,0 +1,126 @@
+import json
+import threading
+import http.client
+from http.server import ThreadingHTTPServer
+
+import yaml
+import pytest
+
+from logo_diagram_generator import server
+
+CONFIG = {
+    "ecosystem": {
+        "centralTool": {"name": "Kubernetes"},
+        "groups": [{"category": "Cluster Management", "tools": [{"name": "Rancher"}, {"name": "Lens"}]}],
+        "style": {"diagramEngine": "radial-native"},
+    }
+}
+CONFIG_BODY = yaml.safe_dump(CONFIG).encode("utf-8")
+
+LOGO_SVG = b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 10"><rect width="20" height="10"/></svg>'
+
+
+def test_parse_render_request():
+    config, diagram_name, image_format, width, quality, optimize = server.parse_render_request(
+        "name=My Platform&theme=dark&override=style.diagramPadding=1&format=jpg&width=800&quality=70&optimize=yes", CONFIG_BODY
+    )
+
+    assert config["ecosystem"]["style"]["diagramPadding"] == "1"
+    assert config["ecosystem"]["style"]["diagramEngine"] == "radial-native"
+    assert (diagram_name, image_format, width, quality, optimize) == ("my_platform", "jpeg", 800, 70, True)
+
+
+@pytest.mark.parametrize(
+    "query, body",
+    [
+        ("", b"ecosystem: [unclosed"),
+        ("", b"- not a mapping"),
+        ("theme=sepia", CONFIG_BODY),
+        ("override=noequals", CONFIG_BODY),
+        ("override=groups=x", CONFIG_BODY),
+        ("override=groups.tools.name=x", CONFIG_BODY),
+        ("override=centralTool.name.x=1", CONFIG_BODY),
+        ("override=style=dark", CONFIG_BODY),
+        ("format=gif", CONFIG_BODY),
+        ("width=-1", CONFIG_BODY),
+        ("", b"ecosystem:\n  groups:\n    - category: A\n      tools:\n"),
+    ],
+)
+def test_invalid_requests_are_rejected(query, body):
+    with pytest.raises(server.RequestError) as error:
+        server.parse_render_request(query, body)
+    assert error.value.status == 400
+
+
+@pytest.fixture
+def render_server(tmp_path):
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    for slug in ("kubernetes", "rancher", "lens"):
+        (logos_dir / f"{slug}.svg").write_bytes(LOGO_SVG)
+
+    service = server.RenderService(str(logos_dir), workers=2, layout_cache_dir=str(tmp_path / "layouts"))
+    http_server = ThreadingHTTPServer(("127.0.0.1", 0), server.create_request_handler(service, server.DEFAULT_MAX_REQUEST_BYTES))
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+    service.shutdown()
+
+
+def post(render_server, path, body):
+    connection = http.client.HTTPConnection("127.0.0.1", render_server.server_port, timeout=30)
+    try:
+        connection.request("POST", path, body=body)
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def test_render_serves_svg_from_the_result_cache(render_server):
+    status, headers, first_svg = post(render_server, "/render?name=platform", CONFIG_BODY)
+    assert status == 200
+    assert headers["Content-Type"] == "image/svg+xml"
+    assert headers["X-Render-Cache"] == "miss"
+    assert first_svg.count(b"<symbol") == 3
+
+    status, headers, second_svg = post(render_server, "/render?name=platform", CONFIG_BODY)
+    assert (status, headers["X-Render-Cache"], second_svg) == (200, "hit", first_svg)
+
+
+def test_invalid_override_is_a_bad_request(render_server):
+    status, _, content = post(render_server, "/render?override=groups.tools=x", CONFIG_BODY)
+
+    assert status == 400
+    assert "groups must be a list" in json.loads(content)["error"]
+
+
+def test_nodes_are_sized_to_logos(tmp_path, monkeypatch):
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    (logos_dir / "kubernetes.svg").write_bytes(LOGO_SVG)
+    (logos_dir / "lens.svg").write_bytes(LOGO_SVG)
+    (logos_dir / "rancher.svg").write_bytes(b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"/>')
+    service = server.RenderService(str(logos_dir), workers=1, layout_cache_dir=str(tmp_path / "layouts"))
+    rendered_logo_sizes = []
+    render_text_only_svg = server.generate_diagram.render_text_only_svg
+
+    def record_logo_sizes(*args, logo_sizes=None, **kwargs):
+        rendered_logo_sizes.append(logo_sizes)
+        return render_text_only_svg(*args, logo_sizes=logo_sizes, **kwargs)
+
+    monkeypatch.setattr(server.generate_diagram, "render_text_only_svg", record_logo_sizes)
+
+    config = yaml.safe_load(CONFIG_BODY)
+    config["ecosystem"]["style"]["sizeNodesToLogos"] = "true"
+    _, sized_key, _ = service.render_svg(config, "platform", False)
+    assert rendered_logo_sizes == [{"kubernetes": (120, 60), "lens": (120, 60), "rancher": (60, 60)}]
+    assert (logos_dir / server.logo_index.INDEX_FILENAME).exists()
+
+    config["ecosystem"]["style"]["sizeNodesToLogos"] = "false"
+    _, unsized_key, _ = service.render_svg(config, "platform", False)
+    assert rendered_logo_sizes[-1] is None
+    assert unsized_key != sized_key
+    service.shutdown()
@@ -0,0 +1,159 @@
+import re
+import json
+
+import pytest
+
+graphviz = pytest.importorskip("graphviz")
+
+from logo_diagram_generator import generate_diagram, layout_cache
+
+CONFIG = {
+    "ecosystem": {
+        "centralTool": {"name": "Kubernetes"},
+        "groups": [
+            {"category": "Cluster Management", "tools": [{"name": "Rancher"}, {"name": "Lens"}, {"name": "k9s"}]},
+            {"category": "Monitoring", "tools": [{"name": "Prometheus"}]},
+            {"category": "Service Mesh", "tools": [{"name": "Istio"}, {"name": "Linkerd"}]},
+        ],
+    }
+}
+
+
+def with_style(**style):
+    return {"ecosystem": dict(CONFIG["ecosystem"], style=style)}
+
+
+def graph_node_names(dot):
+    return [name.strip('"') for name in re.findall(r'^\s*("[^"]*"|\w+) \[', dot.source, flags=re.MULTILINE)]
+
+
+@pytest.fixture
+def pipe_calls(monkeypatch):
+    """
+    Stands in for the Graphviz binaries: layouts (json) place a graph's nodes 100 points apart in a row, and renders
+    (svg) return a stub; every call's format, engine, options and laid out node names are recorded.
+    """
+    calls = []
+
+    def pipe(dot, format=None, engine=None, neato_no_op=None, **kwargs):
+        names = graph_node_names(dot)
+        calls.append((format, engine or dot.engine, neato_no_op, names))
+        if format == "json":
+            objects = [{"name": name, "pos": f"{index * 100 + 50},50"} for index, name in enumerate(names)]
+            return json.dumps({"bb": f"0,0,{len(names) * 100},100", "objects": objects}).encode("utf-8")
+        return b"<svg/>"
+
+    monkeypatch.setattr(graphviz.Digraph, "pipe", pipe)
+    return calls
+
+
+def parse_box(bb):
+    return tuple(float(value) for value in bb.split(","))
+
+
+def parse_pos(pos):
+    return tuple(float(value) for value in pos.split(","))
+
+
+def row_layout(node_names, height=100):
+    return {
+        "bb": f"0,0,{len(node_names) * 100},{height}",
+        "clusters": {},
+        "nodes": {name: f"{index * 100 + 50},{height / 2}" for index, name in enumerate(node_names)},
+    }
+
+
+GROUP_LAYOUTS = [
+    row_layout(["label_cluster_management", "Rancher", "Lens", "k9s"]),
+    row_layout(["label_monitoring", "Prometheus"], height=300),
+    row_layout(["label_service_mesh", "Istio", "Linkerd"]),
+]
+
+
+def test_composed_group_boxes_do_not_overlap():
+    layout = generate_diagram.compose_group_layouts(CONFIG, GROUP_LAYOUTS)
+
+    boxes = [parse_box(layout["clusters"][name]) for name in ("cluster_cluster_management", "cluster_monitoring", "cluster_service_mesh")]
+    for index, box in enumerate(boxes):
+        for other in boxes[index + 1 :]:
+            assert not (box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3])
+
+    # Each box keeps its group layout's size
+    assert [value for box in boxes for value in (box[2] - box[0], box[3] - box[1])] == pytest.approx(
+        [400, 100, 200, 300, 300, 100], abs=0.01
+    )
+
+
+def test_composed_nodes_are_offset_into_their_group_box():
+    layout = generate_diagram.compose_group_layouts(CONFIG, GROUP_LAYOUTS)
+
+    for cluster_name, group_layout in zip(("cluster_cluster_management", "cluster_monitoring", "cluster_service_mesh"), GROUP_LAYOUTS):
+        min_x, min_y, max_x, max_y = parse_box(layout["clusters"][cluster_name])
+        for node_name, node_pos in group_layout["nodes"].items():
+            x, y = parse_pos(layout["nodes"][node_name])
+            original_x, original_y = parse_pos(node_pos)
+            # Every node of a group moves by the same offset, from its group layout's box to the group's composed box
+            assert (x - original_x, y - original_y) == pytest.approx((min_x, min_y), abs=0.01)
+            assert min_x <= x <= max_x and min_y <= y <= max_y
+
+
+def test_composed_layout_starts_at_the_origin():
+    layout = generate_diagram.compose_group_layouts(CONFIG, GROUP_LAYOUTS)
+
+    min_x, min_y, max_x, max_y = parse_box(layout["bb"])
+    assert (min_x, min_y) == (0, 0)
+    boxes = [parse_box(bb) for bb in layout["clusters"].values()]
+    assert min(box[0] for box in boxes) >= 0 and min(box[1] for box in boxes) >= 0
+    assert max(box[2] for box in boxes) <= max_x and max(box[3] for box in boxes) <= max_y
+    # The central tool is inside the diagram, clear of every group
+    central_x, central_y = parse_pos(layout["nodes"]["Kubernetes"])
+    assert 0 < central_x < max_x and 0 < central_y < max_y
+    assert not any(box[0] <= central_x <= box[2] and box[1] <= central_y <= box[3] for box in boxes)
+
+
+def test_sharded_layout_lays_out_each_group_on_its_own(pipe_calls):
+    generate_diagram.render_text_only_svg(with_style(diagramShardedLayout=True), "diagram", layout_cache=layout_cache.LayoutCache())
+
+    layout_calls = [call for call in pipe_calls if call[0] == "json"]
+    assert sorted(names for _, _, _, names in layout_calls) == [
+        ["label_cluster_management", "Rancher", "Lens", "k9s"],
+        ["label_monitoring", "Prometheus"],
+        ["label_service_mesh", "Istio", "Linkerd"],
+    ]
+    # The composed layout is rendered pinned, with every node of the whole diagram
+    render_calls = [call for call in pipe_calls if call[0] == "svg"]
+    assert [call[:3] for call in render_calls] == [("svg", "neato", 2)]
+    assert set(render_calls[0][3]) == {"Kubernetes"} | {name for _, _, _, names in layout_calls for name in names}
+
+
+def test_sharded_layout_reuses_unchanged_groups(pipe_calls):
+    cache = layout_cache.LayoutCache()
+    generate_diagram.render_text_only_svg(with_style(diagramShardedLayout=True), "diagram", layout_cache=cache)
+    changed_config = with_style(diagramShardedLayout=True)
+    changed_config["ecosystem"]["groups"] = CONFIG["ecosystem"]["groups"][:1] + [
+        {"category": "Monitoring", "tools": [{"name": "Prometheus"}, {"name": "Grafana"}]}
+    ]
+    generate_diagram.render_text_only_svg(changed_config, "diagram", layout_cache=cache)
+
+    assert [names for format, _, _, names in pipe_calls if format == "json"][3:] == [["label_monitoring", "Prometheus", "Grafana"]]
+
+
+@pytest.mark.parametrize("style", [{}, {"diagramShardedLayout": "false"}])
+def test_without_sharding_the_whole_diagram_is_one_layout(pipe_calls, style):
+    generate_diagram.render_text_only_svg(with_style(**style), "diagram", layout_cache=layout_cache.LayoutCache())
+
+    layout_calls = [call for call in pipe_calls if call[0] == "json"]
+    assert len(layout_calls) == 1
+    assert set(layout_calls[0][3]) == {
+        "Kubernetes",
+        "label_cluster_management",
+        "Rancher",
+        "Lens",
+        "k9s",
+        "label_monitoring",
+        "Prometheus",
+        "label_service_mesh",
+        "Istio",
+        "Linkerd",
+    }
+    assert [call[:3] for call in pipe_calls if call[0] == "svg"] == [("svg", "neato", 2)]
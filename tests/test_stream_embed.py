@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from logo_diagram_generator import generate_diagram, radial_layout, stream_embed
+
+CONFIG = {
+    "ecosystem": {
+        "centralTool": {"name": "Kubernetes"},
+        "groups": [
+            {
+                "category": "Cluster Management",
+                "tools": [{"name": "Rancher", "strokeColor": "white", "strokeWidth": 2}, {"name": "Lens", "label": "Lens IDE", "scale": 2}],
+            },
+            {"category": "Monitoring", "tools": [{"name": "Prometheus", "positionAdjustX": 5}, {"name": "Grafana"}]},
+        ],
+        "style": {"diagramEngine": "radial-native"},
+    }
+}
+
+LOGOS = {
+    "kubernetes": '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"><circle cx="5" cy="5" r="5"/></svg>',
+    "rancher": (
+        '<?xml version="1.0"?>\n<!-- exported by an editor -->\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 20 10">'
+        '<defs><linearGradient id="g"><stop offset="0"/></linearGradient><style><![CDATA[.st0{fill:url(#g)}]]></style></defs>'
+        '<path id="p" class="st0" d="M0 0h20v10z"/><use xlink:href="#p"/><text>R &amp; D &lt;3</text></svg>'
+    ),
+    "lens": '<svg xmlns="http://www.w3.org/2000/svg" width="40" height="40"><rect width="40" height="40" fill="#123"/></svg>',
+    "prometheus": '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"><g class="cls-1"><path d="M1 1"/></g></svg>',
+    "grafana": '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"><path d="M0 0"/></svg>',
+}
+
+
+def read_logo(slug):
+    return LOGOS.get(slug)
+
+
+@pytest.fixture(scope="module")
+def diagram_svg():
+    return radial_layout.render_radial_svg(CONFIG, "diagram")
+
+
+def embed_streaming(diagram_svg, **kwargs):
+    output_file = io.BytesIO()
+    stream_embed.embed_logos_streaming("diagram", io.BytesIO(diagram_svg), output_file, CONFIG, read_logo, **kwargs)
+    return output_file.getvalue()
+
+
+def test_stream_engine_matches_dom_engine(diagram_svg):
+    dom_svg = generate_diagram.embed_logos_in_svg("diagram", diagram_svg, CONFIG, read_logo).encode("utf-8")
+    assert embed_streaming(diagram_svg) == dom_svg
+
+    # Every logo is embedded once, namespaced and with its stroke override applied
+    assert dom_svg.count(b"<symbol") == len(LOGOS)
+    assert b'id="rancher-g"' in dom_svg and b"url(#rancher-g)" in dom_svg
+    assert b'stroke="white"' in dom_svg
+
+
+def test_symbol_cache_output_matches_uncached(diagram_svg):
+    symbol_cache = stream_embed.LogoSymbolCache()
+    uncached_svg = embed_streaming(diagram_svg)
+
+    assert embed_streaming(diagram_svg, symbol_cache=symbol_cache) == uncached_svg
+    assert embed_streaming(diagram_svg, symbol_cache=symbol_cache) == uncached_svg
+    assert (symbol_cache.hits, symbol_cache.misses) == (len(LOGOS), len(LOGOS))
+
+
+def test_embed_logos_with_engine_matches_between_engines(diagram_svg):
+    assert generate_diagram.embed_logos_with_engine("diagram", diagram_svg, CONFIG, read_logo, engine="stream") == (
+        generate_diagram.embed_logos_with_engine("diagram", diagram_svg, CONFIG, read_logo, engine="dom")
+    )
@@ -0,0 +1,98 @@
+import io
+
+import pytest
+
+from logo_diagram_generator import svg_optimizer
+
+DIAGRAM_SVG = b"""<?xml version="1.0" encoding="UTF-8"?>
+<!-- Generated by graphviz -->
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" width="200pt" height="100pt" viewBox="0.00 0.00 200.00 100.00">
+  <metadata><rdf/></metadata>
+  <defs>
+    <linearGradient id="used"><stop offset="0" stop-color="red"/></linearGradient>
+    <linearGradient id="unused"><stop offset="0" stop-color="blue"/></linearGradient>
+  </defs>
+  <g id="graph0" inkscape:label="Layer 1" transform="scale(1.0 1.0) rotate(0) translate(4.000000 96.000000)">
+    <title>diagram</title>
+    <g id="cluster_empty"><title>cluster</title></g>
+    <rect x="10.123456" y="20.000001" width="50.5000" height="30" fill="url(#used)"/>
+    <path d="M 10.000000 -20.500000 C 0.25 -0.5 , 30.1234567 -40 50 -60 z" stroke="black"/>
+    <text x="100.5" y="50" font-size="14.00">  Two  spaces  </text>
+  </g>
+</svg>
+"""
+
+
+def test_removes_metadata_and_unreferenced_content():
+    optimized = svg_optimizer.optimize_svg(DIAGRAM_SVG).decode("utf-8")
+
+    assert "Generated by graphviz" not in optimized
+    assert "<metadata" not in optimized and "<title" not in optimized
+    assert "inkscape" not in optimized
+    assert 'id="used"' in optimized
+    assert "unused" not in optimized
+    # The cluster only had a title, so is empty once it's removed, and nothing references its or the graph's ID
+    assert "cluster_empty" not in optimized
+    assert "graph0" not in optimized
+
+
+def test_rounds_coordinates_and_compacts_path_data():
+    optimized = svg_optimizer.optimize_svg(DIAGRAM_SVG, precision=2).decode("utf-8")
+
+    assert 'x="10.12"' in optimized
+    assert 'y="20"' in optimized
+    assert 'width="50.5"' in optimized
+    assert 'transform="scale(1 1) rotate(0) translate(4 96)"' in optimized
+    assert 'd="M10-20.5C.25-.5 30.12-40 50-60z"' in optimized
+
+
+def test_keeps_whitespace_in_text():
+    optimized = svg_optimizer.optimize_svg(DIAGRAM_SVG).decode("utf-8")
+
+    assert ">  Two  spaces  </text>" in optimized
+
+
+@pytest.mark.parametrize(
+    "path_data",
+    ["M1 2 3 4z", "m-1.5-.5.5.5", "M0,0 A 10 10 0 0 1 20 20", "M1e2 1E-2L3 4"],
+)
+def test_compact_path_data_parses_back_to_the_same_numbers(path_data):
+    compacted = svg_optimizer.compact_path_data(path_data, precision=3)
+
+    def numbers(segments):
+        return [(command, [float(argument) for argument in arguments]) for command, arguments in segments]
+
+    assert numbers(svg_optimizer.parse_path_data(compacted)) == numbers(svg_optimizer.parse_path_data(path_data))
+
+
+def test_malformed_path_data_is_only_rounded():
+    assert svg_optimizer.compact_path_data("M 1.23456 2 X 3", precision=2) == "M 1.23 2 X 3"
+
+
+def test_optimized_svg_renders_the_same(cairosvg):
+    Image = pytest.importorskip("PIL.Image")
+    ImageChops = pytest.importorskip("PIL.ImageChops")
+
+    def render(svg):
+        return Image.open(io.BytesIO(cairosvg.svg2png(bytestring=svg, output_width=400))).convert("RGBA")
+
+    original, optimized = render(DIAGRAM_SVG), render(svg_optimizer.optimize_svg(DIAGRAM_SVG))
+
+    assert original.size == optimized.size
+    # Rounding to a thousandth of a point can only move antialiased edges by a tiny fraction of a pixel
+    assert max(high for _, high in ImageChops.difference(original, optimized).getextrema()) <= 2
+
+
+def test_only_translations_in_transforms_are_rounded():
+    assert svg_optimizer.round_transform("matrix(0.0004,0,0,0.00040 10.12345 -3.00001)", 3) == "matrix(0.0004 0 0 0.0004 10.123 -3)"
+    assert svg_optimizer.round_transform("translate(1.23456, 2) scale(0.00012) rotate(12.34567 5.55555 1)", 2) == (
+        "translate(1.23 2) scale(0.00012) rotate(12.34567 5.56 1)"
+    )
+    assert svg_optimizer.round_transform("skewX(0.0001)", 2) == "skewX(0.0001)"
+
+
+def test_small_scales_are_not_collapsed():
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg"><g transform="matrix(0.0004 0 0 0.0004 1.23456 0)"><rect width="1e4"/></g></svg>'
+
+    assert b'transform="matrix(0.0004 0 0 0.0004 1.235 0)"' in svg_optimizer.optimize_svg(svg)
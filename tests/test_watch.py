@@ -0,0 +1,90 @@
+import yaml
+import pytest
+
+from logo_diagram_generator import generate_diagram, profiling, rasterize, svg_optimizer, watch
+
+CONFIG = {
+    "ecosystem": {
+        "centralTool": {"name": "Kubernetes"},
+        "groups": [{"category": "Cluster Management", "tools": [{"name": "Rancher"}, {"name": "Lens"}]}],
+        "style": {"diagramEngine": "radial-native"},
+    }
+}
+
+LOGO_SVG = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 20 10"><rect width="20" height="10"/></svg>'
+
+
+@pytest.fixture
+def watcher(tmp_path, monkeypatch):
+    logos_dir = tmp_path / "logos"
+    logos_dir.mkdir()
+    for slug in ("kubernetes", "rancher", "lens"):
+        (logos_dir / f"{slug}.svg").write_text(LOGO_SVG)
+    config_path = tmp_path / "config.yml"
+    config_path.write_text(yaml.safe_dump(CONFIG))
+
+    renders = []
+    render_text_only_svg = generate_diagram.render_text_only_svg
+    monkeypatch.setattr(
+        generate_diagram, "render_text_only_svg", lambda *args, **kwargs: renders.append(1) or render_text_only_svg(*args, **kwargs)
+    )
+    monkeypatch.setattr(
+        rasterize, "rasterize_svg", lambda svg, widths, formats, **kwargs: {(w, f): b"image" for w in widths for f in formats}
+    )
+
+    watcher = watch.DiagramWatcher(str(config_path), "diagram", str(tmp_path), str(logos_dir), 100, write_text_svg=True)
+    watcher.renders = renders
+    watcher.config_path = config_path
+    watcher.tmp_path = tmp_path
+    return watcher
+
+
+def test_logo_only_change_reembeds_without_layout(watcher):
+    watcher.update()
+    assert len(watcher.renders) == 1
+    assert (watcher.tmp_path / "diagram_text.svg").exists()
+
+    before = watcher.embedded_logos["Rancher"][1].getAttribute("transform")
+    config = yaml.safe_load(watcher.config_path.read_text())
+    config["ecosystem"]["groups"][0]["tools"][0]["positionAdjustX"] = 7
+    watcher.config_path.write_text(yaml.safe_dump(config))
+    watcher.update()
+
+    assert len(watcher.renders) == 1
+    assert watcher.embedded_logos["Rancher"][1].getAttribute("transform") != before
+
+
+def test_structural_change_renders_again(watcher):
+    watcher.update()
+    config = yaml.safe_load(watcher.config_path.read_text())
+    config["ecosystem"]["groups"][0]["tools"].pop()
+    watcher.config_path.write_text(yaml.safe_dump(config))
+    watcher.update()
+
+    assert len(watcher.renders) == 2
+    assert "lens-logo" not in (watcher.tmp_path / "diagram_logos.svg").read_text()
+
+
+def test_updates_are_profiled(watcher):
+    watcher.profiler = profiling.Profiler()
+    watcher.update()
+    watcher.update(config_changed=False)
+
+    stage_seconds = watcher.profiler.report()["stage_seconds"]
+    assert {"load_config", "layout", "embed_logos", "rasterize", "reembed_logos"} <= set(stage_seconds)
+
+
+def test_optimized_output_keeps_the_dom_for_reembedding(watcher):
+    watcher.optimize_svg = True
+    watcher.update()
+
+    output_svg = (watcher.tmp_path / "diagram_logos.svg").read_bytes()
+    assert output_svg == svg_optimizer.optimize_svg(watcher.diagram_svg_dom.toxml().encode("utf-8"))
+
+    config = yaml.safe_load(watcher.config_path.read_text())
+    config["ecosystem"]["groups"][0]["tools"][0]["positionAdjustX"] = 5
+    watcher.config_path.write_text(yaml.safe_dump(config))
+    watcher.update()
+
+    assert len(watcher.renders) == 1
+    assert (watcher.tmp_path / "diagram_logos.svg").read_bytes() != output_svg